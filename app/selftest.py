@@ -0,0 +1,78 @@
+"""Smoke runs and startup budget checks that used to happen at import time.
+
+    python -m app.selftest                      # profile startup, then run the smoke queries
+    python -m app.selftest --startup-only --budget total=30 --budget sentence_embedding_model=10
+
+Exits non-zero when a smoke query raises or a startup phase is over budget.
+"""
+import argparse
+import sys
+
+from utils.startup_profiler import startup_profiler
+
+# The example inputs default_chain.py and product_chain.py used to run on import
+SMOKE_RUNS = [
+    ("default_chain", {"message": "How do I reset my password?"}),
+    ("product_chain", {"message": "show me product with width more than 10"}),
+    ("product_chain", {"message": "what is my last order", "customer_id": "12345"}),
+]
+
+
+def parse_budgets(values):
+    budgets = {}
+    for value in values:
+        name, _, seconds = value.partition("=")
+        if not seconds:
+            raise argparse.ArgumentTypeError(f"Budget must look like name=seconds, got {value!r}")
+        budgets[name] = float(seconds)
+    return budgets
+
+
+def profile_startup(warmup_models):
+    # Same order as uvicorn: import the app, then warm the models
+    startup_profiler.import_module("app.server")
+    from llm.chain.sub_chain.default_chain import load_faq_index
+    from llm.model import model_registry
+
+    model_registry.warm_up(warmup_models)
+    with startup_profiler.phase("init", "faq_index"):
+        load_faq_index()
+
+
+def run_smoke_tests():
+    from llm.chain.sub_chain.default_chain import default_chain
+    from llm.chain.sub_chain.product_chain import product_chain
+
+    chains = {"default_chain": default_chain, "product_chain": product_chain}
+    failures = 0
+    for name, input_data in SMOKE_RUNS:
+        try:
+            result = chains[name].invoke(input_data)
+            print(f"[ok] {name} {input_data}: {result}")
+        except Exception as e:
+            failures += 1
+            print(f"[failed] {name} {input_data}: {e}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--startup-only", action="store_true", help="skip the smoke queries (no LLM or DB calls)")
+    parser.add_argument("--budget", action="append", default=[], metavar="NAME=SECONDS",
+                        help="fail if a startup phase (or 'total') takes longer; repeatable")
+    parser.add_argument("--warmup-models", default="sentence_embedding_model,intent_classifier")
+    args = parser.parse_args()
+    budgets = parse_budgets(args.budget)
+
+    profile_startup([name for name in args.warmup_models.split(",") if name])
+    print(startup_profiler.report())
+    violations = startup_profiler.over_budget(budgets)
+    for violation in violations:
+        print(f"[over budget] {violation}")
+
+    failures = 0 if args.startup_only else run_smoke_tests()
+    sys.exit(1 if violations or failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,45 @@
 import asyncio
-from typing import Optional
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import RedirectResponse
+import json
+import os
+from typing import List, Optional
+from utils.startup_profiler import startup_profiler
+
+# Time the heavy imports individually so the boot report shows where startup goes
+for module in ("fastapi", "langchain_core", "langserve", "llm.chain.full_chain"):
+    startup_profiler.import_module(module)
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from langserve import add_routes
-from llm.chain.full_chain import full_chain
+from sse_starlette.sse import EventSourceResponse
+from llm.chain.batch_chain import BATCH_MAX_ITEMS, run_batch
+from llm.chain.full_chain import astream_full_chain, coalesced_full_chain, full_chain
+from llm.chain.sub_chain.default_chain import load_faq_index
+from llm.chain.sub_chain.product_chain import catalog_index, price_quotes
+from llm.model import model_registry
+from llm.model_registry import WARM
+from llm.retriever.faq_index import current_faq_index
+from utils import metrics, tracing
+from utils.logger import get_logger
+from utils.async_db_pool import async_pool_status, close_async_pool
+from utils.db_pool import get_pool
 
 app = FastAPI()
 
+log = get_logger("server")
+
 class QueryInput(BaseModel):
     message: str
     customer_id: Optional[str] = None  # Add customer_id to the model
 
+class BatchQueryInput(BaseModel):
+    queries: List[QueryInput]
+    # At least 1 (anything lower is a 422); capped by BATCH_MAX_CONCURRENCY
+    max_concurrency: Optional[int] = Field(None, ge=1)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -21,29 +48,165 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Models loaded and exercised before /readyz reports ready; everything else loads on first use
+WARMUP_MODELS = [name.strip() for name in os.getenv('WARMUP_MODELS', 'sentence_embedding_model,intent_classifier').split(',') if name.strip()]
+
+# "1" runs /query with full_chain.ainvoke (LLM and Postgres awaited on the event loop; without
+# the optional 'async' extra, queries fall back to the psycopg2 pool on a worker thread);
+# "0" offloads the synchronous full_chain.invoke to a worker thread per request
+ASYNC_PIPELINE = os.getenv('ASYNC_PIPELINE', '0') != '0'
+
+# "1" lets clients send "X-Debug-Timings: 1" to get the per-stage breakdown back. Off by default,
+# so internal stage latencies are only exposed where an operator turns it on
+DEBUG_TIMINGS = os.getenv('DEBUG_TIMINGS', '0') != '0'
+
+warmup_error = None
+
+async def warm_up():
+    global warmup_error
+    try:
+        await asyncio.to_thread(model_registry.warm_up, WARMUP_MODELS)
+        # Open DB_POOL_MIN_SIZE connections now so the first query doesn't pay for the connect
+        with startup_profiler.phase("init", "db_pool"):
+            await asyncio.to_thread(get_pool().fill)
+        # Embed the FAQ table once per process instead of on every FAQ request
+        with startup_profiler.phase("init", "faq_index"):
+            await asyncio.to_thread(load_faq_index)
+    except Exception as e:
+        warmup_error = str(e)
+        log.exception("warmup_failed")
+    if os.getenv('STARTUP_PROFILE', '1') != '0':
+        log.info("startup_profile", report=startup_profiler.report(), max_chars=None)
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Run in the background so the server binds right away and /readyz can report progress
+    app.state.warmup_task = asyncio.create_task(warm_up())
+
+@app.get("/readyz")
+async def readyz():
+    faq_index = current_faq_index()
+    models_warm = all(model_registry.state(name) == WARM for name in WARMUP_MODELS)
+    ready = models_warm and faq_index is not None
+    body = {
+        "ready": ready,
+        "models": model_registry.status(),
+        "faq_index": faq_index.info() if faq_index else None,
+        "db_pool": get_pool().status(),
+        "async_db_pool": async_pool_status(),
+        "error": warmup_error,
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
 @app.get("/")
 async def redirect_root_to_docs():
     return RedirectResponse("/docs")
 
+@app.get("/stats")
+async def stats():
+    return metrics.snapshot()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    get_pool().close()
+    await close_async_pool()
+
+@app.post("/faq/reload")
+async def reload_faq_index():
+    try:
+        faq_index = await asyncio.to_thread(load_faq_index)
+        return faq_index.info()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/catalog/reload")
+async def reload_price_quotes():
+    try:
+        prices = await asyncio.to_thread(price_quotes.refresh)
+        catalog = await asyncio.to_thread(catalog_index.refresh)
+        return {
+            "price_variants": len(prices),
+            "products": len(catalog),
+            "loaded_at": min(prices.loaded_at, catalog.loaded_at),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 add_routes(app, full_chain, path='/full')
 
 @app.post("/query")
-async def query(input: QueryInput):
+async def query(input: QueryInput, x_debug_timings: Optional[str] = Header(None)):
     try:
-        print(input.message, 'mess')
+        log.debug("query_received", message=input.message, customer_id=input.customer_id)
         # Prepare parameters for `full_chain.invoke`
         params = {"message": input.message}
         if input.customer_id:
             params["customer_id"] = input.customer_id
         # print(input.customer_id, 'customer_id')
-        result = await asyncio.to_thread(full_chain.invoke, params)
-        # result = full_chain.invoke({"message": input.message, "customer_id": input.customer_id})
+        with tracing.trace_request() as trace:
+            # Concurrent copies of the same question share one run
+            if ASYNC_PIPELINE:
+                result = await coalesced_full_chain.ainvoke(params)
+            else:
+                result = await asyncio.to_thread(coalesced_full_chain.invoke, params)
+            # result = full_chain.invoke({"message": input.message, "customer_id": input.customer_id})
 
-        return {"result": result}
+            body = {"result": result}
+            if DEBUG_TIMINGS and x_debug_timings == "1":
+                body["timings"] = trace.breakdown()
+            with tracing.span("serialization"):
+                response = JSONResponse(jsonable_encoder(body))
+        return response
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/query/batch")
+async def query_batch(input: BatchQueryInput):
+    """Many /query calls in one request: {"results": [...]} in input order, each
+    {"result": ...} or {"error": ...}. Duplicate messages are answered once."""
+    if len(input.queries) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} queries per batch")
+    items = []
+    for item in input.queries:
+        params = {"message": item.message}
+        if item.customer_id:
+            params["customer_id"] = item.customer_id
+        items.append(params)
+    results = await asyncio.to_thread(run_batch, items, input.max_concurrency)
+    return {"results": results}
+
+@app.post("/query/stream")
+async def query_stream(input: QueryInput, x_debug_timings: Optional[str] = Header(None)):
+    """Server-sent events: "decision" once the message is routed, "metadata" (link, image,
+    type) and "token" chunks while a product answer is generated, then "result" with the
+    same body /query returns (and "timings" with X-Debug-Timings: 1). Always runs the
+    async pipeline; its queries use psycopg 3's async pool when the 'async' extra is
+    installed and otherwise run on the psycopg2 pool in a worker thread."""
+    params = {"message": input.message}
+    if input.customer_id:
+        params["customer_id"] = input.customer_id
+
+    async def events():
+        with tracing.trace_request() as trace:
+            try:
+                async for event, data in astream_full_chain(params):
+                    if event == "token":
+                        data = {"text": data}
+                    elif event == "result":
+                        data = {"result": data}
+                    yield {"event": event, "data": json.dumps(data, default=str)}
+            except Exception as e:
+                yield {"event": "error", "data": json.dumps({"detail": str(e)})}
+            if DEBUG_TIMINGS and x_debug_timings == "1":
+                yield {"event": "timings", "data": json.dumps(trace.breakdown())}
+
+    return EventSourceResponse(events())
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
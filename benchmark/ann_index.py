@@ -0,0 +1,81 @@
+"""Recall and latency of the IVF-flat FAQ index against exact search.
+
+Uses clustered synthetic embeddings (help-centre articles cluster by topic):
+
+    python -m benchmark.ann_index --sizes 10000 100000 --nprobe 4 8 16
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from llm.retriever.ann_index import IvfFlatIndex, recall_at_k
+from llm.retriever.faq_search import FaqSearchEngine, normalize_rows
+
+DIM = 384
+
+
+def clustered_embeddings(rng, centers, size, spread):
+    labels = rng.integers(0, len(centers), size)
+    noise = rng.standard_normal((size, DIM)).astype(np.float32) / np.sqrt(DIM)
+    return normalize_rows(centers[labels] + spread * noise)
+
+
+def ms_per_query(engine, queries, k):
+    started = time.perf_counter()
+    for query in queries:
+        engine.search(query, k=k)
+    return 1000 * (time.perf_counter() - started) / len(queries)
+
+
+def run(sizes, nprobes, queries, k, spread, seed):
+    rng = np.random.default_rng(seed)
+    for size in sizes:
+        # Queries are drawn from the same topics as the corpus
+        centers = normalize_rows(rng.standard_normal((max(10, size // 100), DIM)))
+        embeddings = clustered_embeddings(rng, centers, size, spread)
+        query_embeddings = clustered_embeddings(rng, centers, queries, spread)
+        exact = FaqSearchEngine(embeddings, normalized=True)
+
+        started = time.perf_counter()
+        index = IvfFlatIndex.train(embeddings, normalized=True)
+        build_s = time.perf_counter() - started
+
+        # Round-trip through the persistence format before measuring
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "faq.ivf.npz")
+            index.save(path)
+            index = IvfFlatIndex.load(path)
+
+        # Incremental inserts land in existing cells without retraining
+        extra = clustered_embeddings(rng, centers, max(1, size // 100), spread)
+        index.add(extra, normalized=True)
+        exact.add(extra, normalized=True)
+
+        exact_ms = ms_per_query(exact, query_embeddings, k)
+        print(f"\n{size} vectors (+{len(extra)} inserted), {len(index.centroids)} cells, "
+              f"build {build_s:.2f}s, exact {exact_ms:.3f} ms/query")
+        print(f"{'nprobe':>7} {'ms/query':>9} {'recall@1':>9} {f'recall@{k}':>9}")
+        for nprobe in nprobes:
+            index.nprobe = nprobe
+            approx_ms = ms_per_query(index, query_embeddings, k)
+            print(f"{nprobe:>7} {approx_ms:9.3f} {recall_at_k(exact, index, query_embeddings, 1):9.3f} "
+                  f"{recall_at_k(exact, index, query_embeddings, k):9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--spread", type=float, default=1.0, help="noise norm around each topic centre")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sizes, args.nprobe, args.queries, args.k, args.spread, args.seed)
+
+
+if __name__ == "__main__":
+    main()
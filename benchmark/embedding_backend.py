@@ -0,0 +1,138 @@
+"""Parity check and latency benchmark for the embedding backends.
+
+Compares a backend (default onnx-int8) with the fp32 SentenceTransformer on
+cosine scores between user queries and FAQ questions, checks that every FAQ
+match above the similarity threshold is unchanged, and times single-query
+latency and batched throughput:
+
+    python -m benchmark.embedding_backend --backend onnx-int8
+    python -m benchmark.embedding_backend --from-db     # use the live faq table
+
+Exits non-zero if any FAQ match decision differs from fp32.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from llm.model import EMBEDDING_MODEL_NAME
+
+# Stand-in FAQ questions, taken from the FAQ examples the intent prompt uses
+FAQ_QUESTIONS = [
+    "can i place my order online?",
+    "what are custom lanyards?",
+    "when will my order arrive?",
+    "how to place an order?",
+    "what is return policy?",
+    "what's the turnaround time?",
+    "what imprint methods do you offer?",
+    "what is the minimum order quantity?",
+    "what is the thickness of your lanyard?",
+    "what lanyard options do you have?",
+    "can i order a single custom lanyard?",
+    "what are lanyards used for?",
+    "what are the standard sizes for custom lanyards?",
+    "how do i reset my password?",
+]
+
+QUERIES = [
+    "how do i order online",
+    "when does my order get here",
+    "what's your return policy",
+    "how long does production take",
+    "which printing methods are available",
+    "what is the min order qty",
+    "how thick are the lanyards",
+    "can i buy just one lanyard",
+    "what sizes do custom lanyards come in",
+    "i forgot my password",
+    "what are lanyards for",
+    "do you ship to canada",
+    "tell me a joke",
+    "what colors can i pick",
+]
+
+
+def load_backend(backend):
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(EMBEDDING_MODEL_NAME)
+    from llm.embedding.onnx_backend import OnnxEmbeddingBackend
+    return OnnxEmbeddingBackend(EMBEDDING_MODEL_NAME, os.getenv("ONNX_MODEL_DIR", ".cache/onnx"),
+                                quantize=backend == "onnx-int8")
+
+
+def encode(model, texts):
+    embeddings = np.asarray(model.encode(texts, convert_to_numpy=True), dtype=np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def decisions(scores, threshold):
+    best = scores.argmax(axis=1)
+    return [int(i) if scores[row, i] > threshold else None for row, i in enumerate(best)]
+
+
+def parity(reference, candidate, faqs, queries, threshold):
+    ref_scores = encode(reference, queries) @ encode(reference, faqs).T
+    cand_scores = encode(candidate, queries) @ encode(candidate, faqs).T
+    diff = np.abs(ref_scores - cand_scores)
+    ref_decisions = decisions(ref_scores, threshold)
+    cand_decisions = decisions(cand_scores, threshold)
+    mismatches = [
+        (query, ref, cand, float(ref_scores[i].max()), float(cand_scores[i].max()))
+        for i, (query, ref, cand) in enumerate(zip(queries, ref_decisions, cand_decisions))
+        if ref != cand
+    ]
+    print(f"cosine |diff|: max {diff.max():.4f}  mean {diff.mean():.4f}  p99 {np.percentile(diff, 99):.4f}")
+    print(f"top-1 agreement: {np.mean(ref_scores.argmax(1) == cand_scores.argmax(1)):.1%}")
+    print(f"match decisions above {threshold}: {len(queries) - len(mismatches)}/{len(queries)} identical")
+    for query, ref, cand, ref_best, cand_best in mismatches:
+        print(f"  MISMATCH {query!r}: fp32 -> {ref} ({ref_best:.3f}), candidate -> {cand} ({cand_best:.3f})")
+    return not mismatches
+
+
+def benchmark(name, model, queries, repeat, batch_size):
+    model.encode(queries[:2], convert_to_numpy=True)
+    latencies = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        model.encode([queries[i % len(queries)]], convert_to_numpy=True)
+        latencies.append((time.perf_counter() - started) * 1000)
+    batch = (queries * (batch_size // len(queries) + 1))[:batch_size]
+    started = time.perf_counter()
+    for _ in range(max(1, repeat // 10)):
+        model.encode(batch, convert_to_numpy=True)
+    throughput = batch_size * max(1, repeat // 10) / (time.perf_counter() - started)
+    latencies.sort()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{name:<10} single p50 {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms  "
+          f"batch-{batch_size} throughput {throughput:8.1f} sentences/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", default="onnx-int8", choices=["onnx", "onnx-int8"])
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--from-db", action="store_true", help="use the questions in the faq table")
+    args = parser.parse_args()
+
+    faqs = FAQ_QUESTIONS
+    if args.from_db:
+        from llm.chain.sub_chain.default_chain import get_all_faqs
+        faqs = [faq["question"] for faq in get_all_faqs()]
+
+    reference = load_backend("torch")
+    candidate = load_backend(args.backend)
+    ok = parity(reference, candidate, faqs, QUERIES, args.threshold)
+    benchmark("torch", reference, QUERIES, args.repeat, args.batch_size)
+    benchmark(args.backend, candidate, QUERIES, args.repeat, args.batch_size)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
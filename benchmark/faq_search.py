@@ -0,0 +1,76 @@
+"""Compare the vectorized FAQ search engine with the old per-FAQ cosine loop.
+
+Run from the repo root:
+
+    python -m benchmark.faq_search --sizes 100 10000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from llm.retriever.faq_search import FaqSearchEngine
+
+# all-MiniLM-L6-v2 embedding width
+DIM = 384
+
+
+def legacy_semantic_search(query_embedding, faq_data):
+    # The loop semantic_search used before the search engine, minus the prints
+    similarities = [cosine_similarity(query_embedding.reshape(1, -1), faq['embedding'].reshape(1, -1))[0][0] for faq in faq_data]
+    for i, faq in enumerate(faq_data):
+        faq['similarity'] = similarities[i]
+    sorted_faqs = sorted(faq_data, key=lambda x: x['similarity'], reverse=True)
+    return sorted_faqs[:1] if sorted_faqs and sorted_faqs[0]['similarity'] > 0.5 else []
+
+
+def time_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(sizes, queries, batch_size, legacy_limit, seed):
+    rng = np.random.default_rng(seed)
+    print(f"{'faqs':>8} {'legacy ms':>12} {'engine ms':>12} {'batch ms/q':>12} {'speedup':>9}")
+    for size in sizes:
+        embeddings = rng.standard_normal((size, DIM)).astype(np.float32)
+        query_embeddings = rng.standard_normal((queries, DIM)).astype(np.float32)
+        engine = FaqSearchEngine(embeddings)
+
+        engine_ms = 1000 * time_per_call(lambda: [engine.search(q, k=5) for q in query_embeddings], 1) / queries
+        batch = rng.standard_normal((batch_size, DIM)).astype(np.float32)
+        batch_ms = 1000 * time_per_call(lambda: engine.search_batch(batch, k=5), 3) / len(batch)
+
+        legacy_ms = None
+        if size <= legacy_limit:
+            faq_data = [{'id': i, 'embedding': embeddings[i]} for i in range(size)]
+            # The legacy loop takes seconds per query at large sizes, so one query is enough
+            legacy_queries = query_embeddings[:1] if size >= 10000 else query_embeddings
+            legacy_ms = 1000 * time_per_call(lambda: [legacy_semantic_search(q, faq_data) for q in legacy_queries], 1) / len(legacy_queries)
+
+            # Sanity check: both implementations pick the same best FAQ
+            expected = int(np.argmax(cosine_similarity(legacy_queries[:1], embeddings)[0]))
+            indices, _ = engine.search(legacy_queries[0], k=1)
+            assert indices[0] == expected, "engine and legacy search disagree on the top FAQ"
+
+        legacy = f"{legacy_ms:12.3f}" if legacy_ms is not None else f"{'skipped':>12}"
+        speedup = f"{legacy_ms / engine_ms:8.1f}x" if legacy_ms is not None else f"{'-':>9}"
+        print(f"{size:>8} {legacy} {engine_ms:12.3f} {batch_ms:12.3f} {speedup}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=20, help="single queries timed per size")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--legacy-limit", type=int, default=100000, help="skip the legacy loop above this size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sizes, args.queries, args.batch_size, args.legacy_limit, args.seed)
+
+
+if __name__ == "__main__":
+    main()
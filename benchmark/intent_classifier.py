@@ -0,0 +1,114 @@
+"""Accuracy and latency of the local intent classifier against the LLM router.
+
+Evaluates on hand-labelled messages that are not in the training examples:
+
+    python -m benchmark.intent_classifier                  # local classifier only
+    python -m benchmark.intent_classifier --llm            # also call Gemini for every message
+    python -m benchmark.intent_classifier --eval more.jsonl --thresholds 0.6 0.7 0.8 0.9
+
+With --llm, the "routed" rows show what production does at each threshold:
+local labels above it, LLM labels below it.
+"""
+import argparse
+import statistics
+import time
+
+from llm.intent_classifier import load_examples
+
+# Held-out messages, written the way customers actually phrase them
+EVAL_MESSAGES = [
+    ("hello", "Greeting"),
+    ("hey!", "Greeting"),
+    ("hi, good evening", "Greeting"),
+    ("howdy", "Greeting"),
+    ("what's up", "Greeting"),
+    ("show me your polyester lanyards", "Product"),
+    ("how much are 1 inch lanyards", "Product"),
+    ("what's the price for 300 lanyards with a lobster clip", "Product"),
+    ("do you have any red lanyards", "Product"),
+    ("what was my most recent order", "Product"),
+    ("show me orders i placed in january", "Product"),
+    ("has my order shipped yet", "Product"),
+    ("find lanyards wider than 5/8 inch", "Product"),
+    ("what is the cost of 50 custom lanyards", "Product"),
+    ("what is the minimum order quantity", "FAQ"),
+    ("how long does production take", "FAQ"),
+    ("do you ship to canada", "FAQ"),
+    ("what is your return policy", "FAQ"),
+    ("can i order online", "FAQ"),
+    ("what printing methods do you use", "FAQ"),
+    ("how thick are your lanyards", "FAQ"),
+    ("can i get just one custom lanyard", "FAQ"),
+    ("what are lanyards typically used for", "FAQ"),
+    ("are there any extra charges for attachments", "FAQ"),
+    ("how do i request a quote", "FAQ"),
+]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[int(fraction * (len(values) - 1))]
+
+
+def timed(predict, messages):
+    predictions, latencies = [], []
+    for message in messages:
+        started = time.perf_counter()
+        predictions.append(predict(message))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return predictions, latencies
+
+
+def report(name, correct, total, latencies=None):
+    line = f"{name:<24} accuracy {correct}/{total} ({correct / total if total else 0:.1%})"
+    if latencies:
+        line += f"  p50 {statistics.median(latencies):8.2f} ms  p95 {percentile(latencies, 0.95):8.2f} ms"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--eval", help="JSON-lines file of extra {text, label} messages")
+    parser.add_argument("--llm", action="store_true", help="also classify every message with the LLM router")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.9])
+    args = parser.parse_args()
+
+    from llm.chain.understand_chain import llm_classify, load_intent_classifier
+
+    examples = EVAL_MESSAGES + (load_examples(args.eval) if args.eval else [])
+    messages = [text for text, _ in examples]
+    labels = [label for _, label in examples]
+
+    started = time.perf_counter()
+    classifier = load_intent_classifier()
+    print(f"trained on {classifier.size} examples in {time.perf_counter() - started:.2f}s")
+    classifier.predict("hello")
+
+    local, local_ms = timed(classifier.predict, messages)
+    report("local", sum(p == l for (p, _), l in zip(local, labels)), len(labels), local_ms)
+
+    llm, llm_ms = [], []
+    if args.llm:
+        llm, llm_ms = timed(llm_classify, messages)
+        report("llm", sum(p == l for p, l in zip(llm, labels)), len(labels), llm_ms)
+
+    print(f"\n{'threshold':>9} {'local share':>12} {'local acc':>10} {'routed acc':>11} {'mean ms':>8}")
+    for threshold in args.thresholds:
+        confident = [i for i, (_, confidence) in enumerate(local) if confidence >= threshold]
+        local_correct = sum(local[i][0] == labels[i] for i in confident)
+        local_acc = f"{local_correct / len(confident):.1%}" if confident else "-"
+        routed_acc, mean_ms = "-", "-"
+        if llm:
+            routed = [local[i][0] if local[i][1] >= threshold else llm[i] for i in range(len(labels))]
+            routed_acc = f"{sum(p == l for p, l in zip(routed, labels)) / len(labels):.1%}"
+            # Uncertain messages pay for both the local pass and the LLM call
+            mean_ms = f"{statistics.mean(local_ms[i] + (llm_ms[i] if local[i][1] < threshold else 0) for i in range(len(labels))):.1f}"
+        print(f"{threshold:>9} {len(confident) / len(labels):>12.1%} {local_acc:>10} {routed_acc:>11} {mean_ms:>8}")
+
+    misses = [(m, l, p, c) for m, l, (p, c) in zip(messages, labels, local) if p != l]
+    for message, label, predicted, confidence in misses:
+        print(f"  local miss {message!r}: expected {label}, got {predicted} ({confidence:.2f})")
+
+
+if __name__ == "__main__":
+    main()
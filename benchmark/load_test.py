@@ -0,0 +1,126 @@
+"""Throughput of the async pipeline against the thread-offload pipeline under concurrent load.
+
+Both modes run in this process against the real models, LLM and database, exactly
+as /query runs them: "thread" is `asyncio.to_thread(full_chain.invoke)` on the
+default executor (ASYNC_PIPELINE=0), "async" is `full_chain.ainvoke` (ASYNC_PIPELINE=1):
+
+    python -m benchmark.load_test --concurrency 8 32 128 --requests 256
+    python -m benchmark.load_test --modes async --executor-threads 8 --customer-id 42
+
+With --url the same load is sent to a running server's /query instead, so the
+server's own ASYNC_PIPELINE setting is what gets measured.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# A mix of every route: greeting, FAQ, catalog/LLM product lookups, price and order questions
+MESSAGES = [
+    "hello",
+    "what is the minimum order quantity",
+    "what is your return policy",
+    "how long does production take",
+    "show me nylon lanyards",
+    "do you have polyester lanyards wider than 1 inch",
+    "what is the price of nylon lanyard",
+    "show me my last order",
+    "show me orders from last week",
+]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[int(fraction * (len(values) - 1))]
+
+
+def in_process(mode):
+    from llm.chain.full_chain import full_chain
+
+    if mode == "async":
+        return full_chain.ainvoke
+    return lambda params: asyncio.to_thread(full_chain.invoke, params)
+
+
+def over_http(client, url):
+    async def send(params):
+        response = await client.post(url.rstrip("/") + "/query", json=params)
+        response.raise_for_status()
+        return response.json()
+    return send
+
+
+async def run_load(send, messages, customer_id, requests, concurrency):
+    """Fire `requests` calls with at most `concurrency` in flight; returns (seconds, latencies, errors)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        params = {"message": messages[i % len(messages)]}
+        if customer_id:
+            params["customer_id"] = customer_id
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await send(params)
+            except Exception:
+                errors += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return time.perf_counter() - started, latencies, errors
+
+
+async def main_async(args):
+    loop = asyncio.get_running_loop()
+    if args.executor_threads:
+        # Thread mode is capped by this executor, like the server's default one
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=args.executor_threads))
+
+    client = None
+    if args.url:
+        import httpx
+        client = httpx.AsyncClient(timeout=args.timeout, limits=httpx.Limits(max_connections=max(args.concurrency)))
+        modes = ["server"]
+    else:
+        modes = args.modes
+
+    print(f"{'mode':<8} {'conc':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    try:
+        for mode in modes:
+            send = over_http(client, args.url) if client else in_process(mode)
+            # One pass per mode first, so model loading and connection set-up are not timed
+            await run_load(send, args.messages, args.customer_id, len(args.messages), len(args.messages))
+            for concurrency in args.concurrency:
+                seconds, latencies, errors = await run_load(
+                    send, args.messages, args.customer_id, args.requests, concurrency)
+                if not latencies:
+                    print(f"{mode:<8} {concurrency:>5} {'-':>8} {'-':>9} {'-':>9} {'-':>9} {errors:>7}")
+                    continue
+                print(f"{mode:<8} {concurrency:>5} {len(latencies) / seconds:>8.1f} "
+                      f"{statistics.median(latencies):>9.1f} {percentile(latencies, 0.95):>9.1f} "
+                      f"{percentile(latencies, 0.99):>9.1f} {errors:>7}")
+    finally:
+        if client:
+            await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["thread", "async"], choices=["thread", "async"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--requests", type=int, default=256, help="requests per concurrency level")
+    parser.add_argument("--executor-threads", type=int, help="size of the default executor (Python picks min(32, cpus + 4))")
+    parser.add_argument("--customer-id", help="sent with every request, for the order questions")
+    parser.add_argument("--messages", nargs="+", default=MESSAGES)
+    parser.add_argument("--url", help="load a running server instead, e.g. http://localhost:8000")
+    parser.add_argument("--timeout", type=float, default=120)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
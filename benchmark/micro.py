@@ -0,0 +1,195 @@
+"""Microbenchmarks for the per-request CPU hot spots, checked against a stored baseline.
+
+Each case times one helper on synthetic inputs at several sizes (best of --repeat
+runs of an auto-ranged loop). The first run on a machine records the baseline;
+later runs fail (exit 1) when any case is more than --margin slower:
+
+    python -m benchmark.micro --save-baseline        # on the commit to compare against
+    python -m benchmark.micro --margin 0.2           # after a change
+    python -m benchmark.micro --filter route --repeat 9
+
+Baselines are timings from one machine, so they live under benchmark/results
+(not in git) and should be re-recorded when the hardware or Python changes.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+DEFAULT_BASELINE = os.path.join("benchmark", "results", "micro", "baseline.json")
+
+WORDS = ("lanyard nylon polyester custom order price width attachment quantity show me my the of with "
+         "lobster claw key ring badge reel what is last first recent red blue 5/8 inch product").split()
+
+# name -> (sizes, setup); setup(size, rng) returns the zero-argument call to time
+CASES: Dict[str, Tuple[List[int], Callable]] = {}
+
+
+def case(name: str, sizes: List[int]):
+    def register(setup):
+        CASES[name] = (sizes, setup)
+        return setup
+    return register
+
+
+def sentence(rng, words: int) -> str:
+    return " ".join(rng.choice(WORDS, size=words))
+
+
+@case("preprocess_text", [8, 64, 512])
+def preprocess_text_case(size, rng):
+    from llm.chain.sub_chain.default_chain import preprocess_text
+
+    # Mixed case and irregular whitespace, as messages arrive
+    text = "  " + "  \t".join(word.upper() if i % 3 == 0 else word
+                              for i, word in enumerate(sentence(rng, size).split())) + " \n"
+    return lambda: preprocess_text(text)
+
+
+@case("semantic_search", [100, 1000, 10000])
+def semantic_search_case(size, rng):
+    from llm.chain.sub_chain.default_chain import semantic_search
+    from llm.retriever.faq_index import FaqIndex, make_search_engine
+
+    embeddings = rng.standard_normal((size, 384)).astype(np.float32)
+    faqs = [{"id": i, "question": f"question {i}", "answer": f"answer {i}"} for i in range(size)]
+    faq_index = FaqIndex(faqs, make_search_engine(embeddings), version=1)
+    # Close to one FAQ, so the answer path (not the "no match" one) is timed
+    query = embeddings[size // 2] + 0.1 * rng.standard_normal(384).astype(np.float32)
+    return lambda: semantic_search("question", faq_index, query_embedding=query)
+
+
+@case("check_user_query_details", [8, 32, 128])
+def check_user_query_details_case(size, rng):
+    from llm.chain.sub_chain.product_router import check_user_query_details
+
+    query = sentence(rng, size) + " product width attachment quantity 100"
+    return lambda: check_user_query_details(query)
+
+
+@case("route_product_query", [4, 16, 64])
+def route_product_query_case(size, rng):
+    # The fuzz.ratio scans over the order and price pattern lists that create_dynamic_sql_prompt relies on
+    from llm.chain.sub_chain.product_router import route_product_query
+
+    query = sentence(rng, size)
+    return lambda: route_product_query(query)
+
+
+def rows(rng, count: int, with_datetimes: bool) -> List[dict]:
+    created = datetime(2024, 1, 1)
+    result = []
+    for i in range(count):
+        row = {"id": i, "customer_id": str(i % 50), "product_id": int(rng.integers(1, 100)), "color_id": 1,
+               "color_name": "red", "size_id": 2, "size_name": "width", "material": "nylon", "title": "Nylon Lanyard",
+               "total_price": 160.0, "status": "delivered", "product_image_url": "/img/nylon.png"}
+        if with_datetimes:
+            row["created_at"] = created + timedelta(minutes=i)
+            row["updated_at"] = created + timedelta(minutes=2 * i)
+        result.append(row)
+    return result
+
+
+@case("serialize_result", [10, 1000, 10000])
+def serialize_result_case(size, rng):
+    from utils.serialize_result import serialize_result
+
+    template = rows(rng, size, with_datetimes=True)
+    # serialize_result rewrites rows in place, so every call gets fresh ones (the copy is timed too)
+    return lambda: serialize_result([dict(row) for row in template])
+
+
+@case("rows_to_dicts", [10, 1000, 10000])
+def rows_to_dicts_case(size, rng):
+    from utils.execute_query import rows_to_dicts
+
+    sample = rows(rng, size, with_datetimes=True)
+    columns = list(sample[0])
+    tuples = [tuple(row.values()) for row in sample]
+    return lambda: rows_to_dicts(columns, tuples)
+
+
+def measure(fn: Callable, repeat: int, min_time: float) -> float:
+    """Seconds per call: the best of `repeat` loops, each at least `min_time` long."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            break
+        number *= 2
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run(args) -> Dict[str, float]:
+    # The helpers' log events would be timed (and printed into the report); set before utils.logger is imported
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    results = {}
+    for name, (sizes, setup) in CASES.items():
+        if args.filter and args.filter not in name:
+            continue
+        for size in sizes:
+            fn = setup(size, np.random.default_rng(args.seed))
+            results[f"{name}[{size}]"] = measure(fn, args.repeat, args.min_time)
+    return results
+
+
+def report(results: Dict[str, float], baseline: Dict[str, float], margin: float) -> List[str]:
+    """Print the table; returns the cases that regressed past the margin."""
+    regressions = []
+    print(f"{'case':<34} {'us/call':>12} {'baseline':>12} {'change':>8}")
+    for key, seconds in results.items():
+        old = baseline.get(key)
+        if old is None:
+            print(f"{key:<34} {seconds * 1e6:>12.2f} {'-':>12} {'-':>8}")
+            continue
+        change = (seconds - old) / old
+        flag = ""
+        if change > margin:
+            regressions.append(key)
+            flag = "  SLOWER"
+        print(f"{key:<34} {seconds * 1e6:>12.2f} {old * 1e6:>12.2f} {100 * change:>+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="record these timings as the baseline")
+    parser.add_argument("--margin", type=float, default=float(os.getenv("MICRO_BENCH_MARGIN", "0.25")),
+                        help="allowed slowdown as a fraction of the baseline (0.25 = 25%%)")
+    parser.add_argument("--filter", help="only cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per timed loop")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = run(args)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["cases"]
+    regressions = report(results, baseline, args.margin)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        from benchmark.offline.run import git_revision
+        # Merged, so a filtered run only replaces the cases it timed
+        with open(args.baseline, "w") as f:
+            json.dump({"git": git_revision(), "created_at": datetime.now().isoformat(timespec="seconds"),
+                       "python": sys.version.split()[0], "cases": {**baseline, **results}}, f, indent=2, sort_keys=True)
+        print("Saved baseline", args.baseline)
+    elif not baseline:
+        print(f"No baseline at {args.baseline}; record one with --save-baseline")
+    elif regressions:
+        print(f"{len(regressions)} case(s) more than {100 * args.margin:.0f}% slower than the baseline:",
+              ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
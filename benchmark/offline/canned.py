@@ -0,0 +1,119 @@
+"""Canned LLM replies for the offline benchmark.
+
+Each prompt the pipeline sends is recognised by a marker: a line of its system
+instructions that no other prompt has. Markers are derived from the prompt
+functions themselves, so editing a prompt does not silently send it to the
+default reply. The SQL replies are fixed statements the stand-in database
+knows how to answer (and that also run on the seeded Postgres).
+"""
+from typing import Callable, Dict, List, Mapping
+
+from benchmark.offline.fake_llm import FakeLLM, Rule
+
+# Fixed SQL "written" per product_chain template (ProductRoute.sql_template)
+PRODUCT_SQL = """
+SELECT p.*, i.url
+FROM product p
+LEFT JOIN product_images pi ON p.id = pi.product_id
+LEFT JOIN image i ON pi.image_id = i.id
+WHERE p.deleted = 0
+ORDER BY p.id
+LIMIT 5;
+"""
+PRICE_SQL = """
+SELECT p.id, p.title, i.url, pp.price_chart
+FROM product p
+JOIN product_price_chart pp ON pp.product_id = p.id
+LEFT JOIN product_images pi ON p.id = pi.product_id
+LEFT JOIN image i ON pi.image_id = i.id
+WHERE p.deleted = 0 AND pp.deleted = 0
+ORDER BY p.id, pp.size_id, pp.attachment_style_id
+LIMIT 1;
+"""
+PRICE_QUANTITY_SQL = """
+SELECT (tier->>'price')::numeric AS price
+FROM product_price_chart pp, jsonb_array_elements(pp.price_chart) AS tier
+WHERE pp.deleted = 0
+ORDER BY abs((tier->>'quantity')::int - 100), pp.product_id
+LIMIT 1;
+"""
+
+
+def order_sql() -> str:
+    from llm.chain.sub_chain.order_templates import ORDER_TEMPLATES
+    from llm.chain.sub_chain.product_chain import CUSTOMER_ID_PLACEHOLDER
+    # What the LLM is asked to write: the customer as a quoted placeholder, which
+    # bind_customer_id turns back into the template's %(customer_id)s
+    return ORDER_TEMPLATES["recent_orders"].replace("%(customer_id)s", f"'{CUSTOMER_ID_PLACEHOLDER}'")
+
+
+def prompt_markers(prompts: Mapping[str, str]) -> Dict[str, str]:
+    """The first line of each prompt that appears in no other prompt and has no template fields."""
+    markers = {}
+    for name, text in prompts.items():
+        others = [other_text for other, other_text in prompts.items() if other != name]
+        marker = next((line.strip() for line in text.splitlines()
+                       if len(line.strip()) > 20 and "{" not in line and "}" not in line
+                       and not any(line.strip() in other_text for other_text in others)), None)
+        if marker is None:
+            raise ValueError(f"No unique marker line in the {name} prompt")
+        markers[name] = marker
+    return markers
+
+
+def _fields(human: str):
+    # Response prompts send "query | title | ..." as the human turn
+    return [field.strip() for field in human.split(" | ")]
+
+
+def classify_reply(labels: Mapping[str, str]) -> Callable[[str], str]:
+    def reply(human: str) -> str:
+        label = labels.get(human.strip().lower())
+        if label:
+            return label
+        return "Product" if any(word in human.lower() for word in ("order", "price", "lanyards")) else "FAQ"
+    return reply
+
+
+def product_reply(human: str) -> str:
+    fields = _fields(human)
+    return f"Yes, we have a {fields[1] if len(fields) > 1 else 'lanyard'}. Would that work?"
+
+
+def order_reply(human: str) -> str:
+    fields = _fields(human)
+    if len(fields) < 6:
+        return "Hello! Here is your order."
+    return f"Hello! Your order #{fields[2]} for {fields[1]} is {fields[5]}."
+
+
+def price_reply(human: str) -> str:
+    fields = _fields(human)
+    if len(fields) < 5:
+        return "Thanks for asking! Here is the price."
+    return f"Thanks for asking! The {fields[1]} ({fields[4]}) starts at {fields[2]} for {fields[3]} pieces."
+
+
+def build_rules(labels: Mapping[str, str]) -> List[Rule]:
+    """Rules for every prompt in understand_chain and product_chain."""
+    from llm.chain import understand_chain
+    from llm.chain.sub_chain import product_chain
+
+    replies = {
+        "classification": (understand_chain.get_dynamic_sql_prompt(), classify_reply(labels)),
+        "sql_product": (product_chain.get_dynamic_sql_prompt_product(), lambda human: PRODUCT_SQL),
+        "sql_order": (product_chain.get_dynamic_sql_prompt_order(), lambda human: order_sql()),
+        "sql_price": (product_chain.get_dynamic_sql_prompt_price(), lambda human: PRICE_SQL),
+        "sql_price_quantity": (product_chain.get_dynamic_sql_prompt_for_price_with_nearest_quantity_altered(),
+                               lambda human: PRICE_QUANTITY_SQL),
+        "product_response": (product_chain.get_dynamic_user_product_response(), product_reply),
+        "order_response": (product_chain.get_dynamic_user_order_response(), order_reply),
+        "price_response": (product_chain.get_dynamic_user_price_response(), price_reply),
+    }
+    markers = prompt_markers({name: prompt for name, (prompt, _) in replies.items()})
+    return [(markers[name], reply) for name, (_, reply) in replies.items()]
+
+
+def build_llm(labels: Mapping[str, str], latency: float = 0.0, jitter: float = 0.0,
+              token_delay: float = 0.0) -> FakeLLM:
+    return FakeLLM(rules=build_rules(labels), latency=latency, jitter=jitter, token_delay=token_delay)
@@ -0,0 +1,45 @@
+"""Fixed messages for the offline benchmarks, tagged with the intent they exercise."""
+
+# Every message is sent with this customer, who has orders in the seed data
+CUSTOMER_ID = "1"
+
+# (intent, message)
+CORPUS = [
+    ("greeting", "hello"),
+    ("greeting", "hi there"),
+    ("faq", "what is your return policy"),
+    ("faq", "what is the minimum order quantity"),
+    ("faq", "what's the turnaround time?"),
+    ("faq", "do you ship internationally"),
+    ("faq", "can i order a single custom lanyard"),
+    # Answered from the in-memory catalog index
+    ("product", "show me nylon lanyards"),
+    ("product", "do you have polyester lanyards"),
+    # Words the catalog does not know, so the LLM writes the SQL
+    ("product", "do you have red lanyards"),
+    ("product", "what is your cheapest lanyard"),
+    ("order", "show me my last order"),
+    ("order", "show me my first order"),
+    ("order", "show me orders from last week"),
+    ("order", "show me the details of my order with number 102"),
+    ("order", "what i ordered last"),
+    ("price", "what is the price of nylon lanyard"),
+    ("price", "show me price for nylon lanyard"),
+    # Answered from the price snapshot without any SQL
+    ("price_quote", "what is the price of product nylon lanyard width 1 with lobster claw attachment quantity 100"),
+    ("price_quote", "price of product woven lanyard width 0.625 with key ring attachment quantity 250"),
+]
+
+INTENTS = list(dict.fromkeys(intent for intent, _ in CORPUS))
+
+# What the fake LLM classifier answers for each intent
+LABELS = {"greeting": "Greeting", "faq": "FAQ"}
+
+
+def classification_labels() -> dict:
+    return {message: LABELS.get(intent, "Product") for intent, message in CORPUS}
+
+
+def messages_for(intent: str) -> list:
+    """Messages of one intent, or the whole corpus for "all"."""
+    return [message for name, message in CORPUS if intent in ("all", name)]
@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, Callable, Iterator, AsyncIterator, List, Optional, Tuple
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+# (marker, reply): the first rule whose marker appears in the prompt answers it.
+# reply gets the human turn of the prompt (the text after the last "Human: ").
+Rule = Tuple[str, Callable[[str], str]]
+
+
+def human_turn(prompt: str) -> str:
+    return prompt.rsplit("Human: ", 1)[-1].strip()
+
+
+class FakeLLM(LLM):
+    """Deterministic stand-in for the Gemini/Groq clients.
+
+    Sleeps `latency` seconds (plus up to `jitter`, derived from the prompt text so
+    reruns are identical) and answers from canned rules. Works with invoke, ainvoke,
+    batch and astream, so every chain path can run offline.
+    """
+
+    rules: List[Rule] = []
+    default_reply: str = "OK"
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Streaming yields one chunk per word after the first-token delay
+    token_delay: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _delay(self, prompt: str) -> float:
+        if not self.jitter:
+            return self.latency
+        digest = hashlib.blake2b(prompt.encode(), digest_size=4).digest()
+        return self.latency + self.jitter * int.from_bytes(digest, "big") / 0xFFFFFFFF
+
+    def reply(self, prompt: str) -> str:
+        self.calls += 1
+        for marker, reply in self.rules:
+            if marker in prompt:
+                return reply(human_turn(prompt))
+        return self.default_reply
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        time.sleep(self._delay(prompt))
+        return self.reply(prompt)
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        await asyncio.sleep(self._delay(prompt))
+        return self.reply(prompt)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        time.sleep(self._delay(prompt))
+        for i, word in enumerate(self.reply(prompt).split(" ")):
+            if i:
+                time.sleep(self.token_delay)
+            yield GenerationChunk(text=word if i == 0 else " " + word)
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None,
+                       **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        await asyncio.sleep(self._delay(prompt))
+        for i, word in enumerate(self.reply(prompt).split(" ")):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield GenerationChunk(text=word if i == 0 else " " + word)
@@ -0,0 +1,31 @@
+"""app.server with the offline fakes installed, for load tests that go through HTTP and uvicorn.
+
+    OFFLINE_LLM_LATENCY_MS=300 uvicorn benchmark.offline.fake_server:app --workers 4
+
+Every worker process imports this module, so each one gets its own fake LLM and
+stand-in database built from the same seed. Settings come from the environment:
+OFFLINE_LLM_LATENCY_MS, OFFLINE_LLM_JITTER_MS, OFFLINE_TOKEN_DELAY_MS,
+OFFLINE_DB (standin|postgres), OFFLINE_DB_LATENCY_MS, OFFLINE_FAKE_EMBEDDINGS
+and OFFLINE_SQL_CACHE. The server's own settings (ASYNC_PIPELINE, SINGLE_FLIGHT...)
+apply as usual.
+"""
+import os
+
+from benchmark.offline import fakes
+
+DB = os.getenv("OFFLINE_DB", "standin")
+
+fakes.configure_environment(sql_cache=os.getenv("OFFLINE_SQL_CACHE", "1") != "0")
+if DB == "standin":
+    # Nothing to connect to: warm-up must not try to fill the psycopg2 pool
+    os.environ["DB_POOL_MIN_SIZE"] = "0"
+fakes.install_fakes(
+    llm_latency_ms=float(os.getenv("OFFLINE_LLM_LATENCY_MS", "300")),
+    jitter_ms=float(os.getenv("OFFLINE_LLM_JITTER_MS", "0")),
+    token_delay_ms=float(os.getenv("OFFLINE_TOKEN_DELAY_MS", "0")),
+    db=DB,
+    db_latency_ms=float(os.getenv("OFFLINE_DB_LATENCY_MS", "1")),
+    fake_embeddings=os.getenv("OFFLINE_FAKE_EMBEDDINGS", "0") != "0",
+)
+
+from app.server import app  # noqa: E402  (the fakes must be in place before the chains import)
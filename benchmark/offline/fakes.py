@@ -0,0 +1,59 @@
+"""Installs the offline stand-ins: the fake LLM for every Gemini/Groq model, optionally a
+hashing embedder, and the in-process database. Call configure_environment() first,
+since the chains read their settings when they are imported."""
+import os
+import tempfile
+import zlib
+
+import numpy as np
+
+from benchmark.offline.corpus import classification_labels
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words vectors in place of the sentence embedding model."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, sentences, convert_to_numpy=True):
+        vectors = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for word in sentence.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def configure_environment(sql_cache: bool = True) -> None:
+    os.environ.setdefault("DOMAIN_FE", "https://example.com")
+    os.environ.setdefault("GOOGLE_API_KEY", "offline")
+    # Per-request info events would be written (and paid for) on every benchmark request
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Fresh per process, so embeddings from another model or run are never reused
+    os.environ["FAQ_EMBEDDING_DIR"] = tempfile.mkdtemp(prefix="offline-faq-embeddings-")
+    if not sql_cache:
+        os.environ["SQL_CACHE_TTL"] = "0"
+        os.environ["SQL_NEGATIVE_CACHE_TTL"] = "0"
+
+
+def install_fakes(llm_latency_ms: float = 300, jitter_ms: float = 0, token_delay_ms: float = 0,
+                  db: str = "standin", db_latency_ms: float = 1, fake_embeddings: bool = False):
+    """(fake LLM, stand-in database or None for db="postgres")."""
+    from llm.model import model_registry
+    from utils.execute_query import set_query_backend
+    from benchmark.offline.canned import build_llm
+
+    llm = build_llm(classification_labels(), latency=llm_latency_ms / 1000, jitter=jitter_ms / 1000,
+                    token_delay=token_delay_ms / 1000)
+    for name in ("gemini_generative_model", "gemini_chat_model", "groq_mixtral_model"):
+        model_registry.override(name, llm)
+    if fake_embeddings:
+        model_registry.override("sentence_embedding_model", HashingEmbedder())
+
+    database = None
+    if db == "standin":
+        from benchmark.offline.standin_db import StandinDatabase
+        database = StandinDatabase(latency=db_latency_ms / 1000)
+        set_query_backend(database)
+    return llm, database
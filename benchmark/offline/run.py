@@ -0,0 +1,241 @@
+"""Offline end-to-end latency benchmark: the real pipeline with a fake LLM and a stand-in database.
+
+Every request runs full_chain exactly as /query does (classification, FAQ
+retrieval, routing, catalog and price snapshots, order templates, SQL
+generation, response generation), but the Gemini models are replaced by a
+deterministic fake with a fixed latency and canned SQL and answers, and the
+database by an in-process stand-in holding the seed data. Results depend only
+on the code, so runs on different commits can be compared:
+
+    python -m benchmark.offline.run --llm-latency-ms 300 --concurrency 8
+    python -m benchmark.offline.run --mode async --compare benchmark/results/offline/<earlier run>.json
+
+With --db postgres, queries go to the database configured in config/db.py
+instead; load it with the seed first (see benchmark/offline/seed.py). The
+sentence embedding model is the real one unless --fake-embeddings is given.
+Results are saved under --output-dir as JSON named after the commit.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmark.load_test import percentile
+from benchmark.offline import fakes
+from benchmark.offline.corpus import CORPUS, CUSTOMER_ID, INTENTS, messages_for
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(["git", *args], capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+class Counters:
+    """LLM calls and database statements, read before and after each phase."""
+
+    def __init__(self, llm, database):
+        self.llm, self.database = llm, database
+
+    def read(self):
+        return {"llm_calls": self.llm.calls, "db_queries": self.database.queries if self.database else None}
+
+
+def run_phase(args, full_chain, messages, loop=None):
+    """Send `messages` with at most args.concurrency in flight; (seconds, latencies ms, stage totals ms, errors)."""
+    from utils import tracing
+
+    latencies, stages, errors = [], {}, 0
+
+    def record(trace, seconds):
+        latencies.append(seconds * 1000)
+        for span in trace.spans:
+            stages[span["stage"]] = stages.get(span["stage"], 0.0) + span["duration_ms"]
+
+    def one(message):
+        nonlocal errors
+        started = time.perf_counter()
+        with tracing.trace_request() as trace:
+            try:
+                full_chain.invoke({"message": message, "customer_id": CUSTOMER_ID})
+            except Exception as e:
+                print(f"Request failed: {message!r}: {e}", file=sys.stderr)
+                errors += 1
+                return
+        record(trace, time.perf_counter() - started)
+
+    async def aone(semaphore, message):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            with tracing.trace_request() as trace:
+                try:
+                    await full_chain.ainvoke({"message": message, "customer_id": CUSTOMER_ID})
+                except Exception as e:
+                    print(f"Request failed: {message!r}: {e}", file=sys.stderr)
+                    errors += 1
+                    return
+            record(trace, time.perf_counter() - started)
+
+    async def aall():
+        semaphore = asyncio.Semaphore(args.concurrency)
+        await asyncio.gather(*(aone(semaphore, message) for message in messages))
+
+    started = time.perf_counter()
+    if args.mode == "async":
+        loop.run_until_complete(aall())
+    else:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(one, messages))
+    return time.perf_counter() - started, latencies, stages, errors
+
+
+def summarize(seconds, latencies, stages, errors, before, after):
+    requests = len(latencies) + errors
+    if not latencies:
+        return {"requests": requests, "errors": errors}
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / seconds, 2),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        # Mean time per request spent in each stage (nested stages are included in their parents)
+        "stages_ms": {stage: round(total / len(latencies), 3) for stage, total in sorted(stages.items())},
+        **{f"{name}_per_request": round((after[name] - before[name]) / requests, 3)
+           for name in after if after[name] is not None},
+    }
+
+
+def run(args):
+    if args.verbose:
+        os.environ["LOG_LEVEL"] = "DEBUG"
+    fakes.configure_environment(sql_cache=not args.no_sql_cache)
+    # Coalescing would merge the repeated corpus messages; /query's own behaviour is not what is measured here
+    os.environ["SINGLE_FLIGHT"] = "0"
+    llm, database = fakes.install_fakes(args.llm_latency_ms, args.jitter_ms, args.token_delay_ms,
+                                        args.db, args.db_latency_ms, args.fake_embeddings)
+
+    from llm.chain.full_chain import full_chain
+    from llm.chain.sub_chain.default_chain import load_faq_index
+
+    counters = Counters(llm, database)
+    results = {}
+    # One loop for every phase: the async database pool and embedding batcher bind to it
+    loop = asyncio.new_event_loop() if args.mode == "async" else None
+    # The pipeline's logger is kept at WARNING (fakes.configure_environment), or DEBUG with --verbose.
+    # Stdout is muted too, so the stand-in's miss lines don't land in the timed phases
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+        load_faq_index()
+        # Untimed pass: classifier training, snapshots, embedding store and SQL cache warm up
+        run_phase(args, full_chain, [message for _, message in CORPUS], loop)
+
+        for intent in INTENTS + ["all"]:
+            corpus = messages_for(intent)
+            messages = [corpus[i % len(corpus)] for i in range(args.requests)]
+            before = counters.read()
+            phase = run_phase(args, full_chain, messages, loop)
+            results[intent] = summarize(*phase, before, counters.read())
+    if loop is not None:
+        loop.close()
+
+    print(f"{'intent':<12} {'req':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for intent, stats in results.items():
+        print_row(intent, stats)
+
+    return {
+        "git": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "config": {
+            "mode": args.mode,
+            "db": args.db,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "llm_latency_ms": args.llm_latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "token_delay_ms": args.token_delay_ms,
+            "db_latency_ms": args.db_latency_ms,
+            "fake_embeddings": args.fake_embeddings,
+            "sql_cache": not args.no_sql_cache,
+        },
+        "db_misses": dict(database.misses) if database else {},
+        "intents": results,
+    }
+
+
+def print_row(intent, stats):
+    if "p50_ms" not in stats:
+        print(f"{intent:<12} {stats['requests']:>5} {'-':>8} {'-':>9} {'-':>9} {'-':>9} {stats['errors']:>7}")
+        return
+    print(f"{intent:<12} {stats['requests']:>5} {stats['throughput_rps']:>8.1f} {stats['p50_ms']:>9.1f} "
+          f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['errors']:>7}")
+
+
+def save(result, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    commit = (result["git"]["commit"] or "nogit")[:10] + ("-dirty" if result["git"]["dirty"] else "")
+    stamp = result["created_at"].replace(":", "").replace("-", "")
+    path = os.path.join(output_dir, f"{stamp}-{commit}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    return path
+
+
+def compare(result, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != result["config"]:
+        print("Warning: the baseline ran with a different configuration:", baseline.get("config"))
+    print(f"\nAgainst {baseline_path} ({(baseline['git']['commit'] or '?')[:10]}):")
+    print(f"{'intent':<12} {'p50':>16} {'p95':>16} {'p99':>16} {'req/s':>16}")
+    for intent, stats in result["intents"].items():
+        old = baseline["intents"].get(intent, {})
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            if key not in stats or key not in old or not old[key]:
+                cells.append(f"{'-':>16}")
+                continue
+            cells.append(f"{stats[key]:>8.1f} {100 * (stats[key] - old[key]) / old[key]:>+6.1f}%")
+        print(f"{intent:<12} " + " ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["thread", "async"], default="thread",
+                        help="full_chain.invoke on a thread pool, or full_chain.ainvoke on one event loop")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per intent phase")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=0, help="extra latency per prompt, fixed by the prompt text")
+    parser.add_argument("--token-delay-ms", type=float, default=0, help="delay between streamed words")
+    parser.add_argument("--db", choices=["standin", "postgres"], default="standin")
+    parser.add_argument("--db-latency-ms", type=float, default=1, help="stand-in round trip per statement")
+    parser.add_argument("--fake-embeddings", action="store_true", help="hashing embedder instead of the sentence model")
+    parser.add_argument("--no-sql-cache", action="store_true", help="generate SQL for every product question")
+    parser.add_argument("--output-dir", default=os.path.join("benchmark", "results", "offline"))
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="log every pipeline step (LOG_LEVEL=DEBUG) and keep stdout")
+    parser.add_argument("--compare", metavar="RESULT_JSON", help="print the change against an earlier run")
+    args = parser.parse_args()
+
+    result = run(args)
+    if result["db_misses"]:
+        print("Statements the stand-in could not answer:", json.dumps(result["db_misses"], indent=2))
+    if not args.no_save:
+        print("Saved", save(result, args.output_dir))
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
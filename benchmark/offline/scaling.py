@@ -0,0 +1,255 @@
+"""How /query throughput and latency scale with concurrent clients and uvicorn workers.
+
+For each worker count, starts `uvicorn benchmark.offline.fake_server:app` (the real
+server with the fake LLM and the stand-in database), sends a weighted mix of corpus
+messages at each concurrency level, and prints one row per (workers, concurrency):
+
+    python -m benchmark.offline.scaling --workers 1 2 4 --concurrency 1 4 16 64
+    python -m benchmark.offline.scaling --mix faq=5 product=3 order=2 --async-pipeline --torch-threads 1
+
+Every answer is compared with the one the same message got from a lone sequential
+request; a mismatch under load means shared state leaked between requests (a
+mutated cache entry, FAQ dict or snapshot), so the run exits non-zero. With --url
+an already running server is measured instead, and --workers is ignored.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmark.load_test import percentile
+from benchmark.offline.corpus import CORPUS, CUSTOMER_ID, INTENTS
+from benchmark.offline.run import git_revision
+
+DEFAULT_MIX = ["faq=4", "product=3", "price=1", "price_quote=1", "order=2", "greeting=1"]
+# Mismatched answers kept per level, for the report
+MAX_EXAMPLES = 5
+
+
+def parse_mix(items):
+    mix = {}
+    for item in items:
+        intent, _, weight = item.partition("=")
+        if intent not in INTENTS:
+            raise SystemExit(f"Unknown intent {intent!r}; choose from {', '.join(INTENTS)}")
+        mix[intent] = float(weight or 1)
+    return mix
+
+
+def build_messages(mix, count, seed):
+    """`count` messages drawn by intent weight, the same sequence for every level and run."""
+    corpus = [(intent, message) for intent, message in CORPUS if mix.get(intent)]
+    per_intent = {intent: sum(1 for name, _ in corpus if name == intent) for intent in mix}
+    weights = [mix[intent] / per_intent[intent] for intent, _ in corpus]
+    return [message for _, message in random.Random(seed).choices(corpus, weights=weights, k=count)]
+
+
+def canonical(body) -> str:
+    return json.dumps(body, sort_keys=True, default=str)
+
+
+class Server:
+    """A uvicorn process serving fake_server; its output goes to a log file, not the report."""
+
+    def __init__(self, args, workers):
+        self.url = f"http://127.0.0.1:{args.port}"
+        self.workers = workers
+        env = dict(os.environ)
+        env.update({
+            "OFFLINE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+            "OFFLINE_DB_LATENCY_MS": str(args.db_latency_ms),
+            "OFFLINE_FAKE_EMBEDDINGS": "1" if args.fake_embeddings else "0",
+            "ASYNC_PIPELINE": "1" if args.async_pipeline else "0",
+            "SINGLE_FLIGHT": "1" if args.single_flight else "0",
+            "STARTUP_PROFILE": "0",
+        })
+        if args.torch_threads:
+            # Intra-op threads per worker; torch reads these when it initialises
+            env["OMP_NUM_THREADS"] = env["MKL_NUM_THREADS"] = str(args.torch_threads)
+        self.log = tempfile.NamedTemporaryFile(prefix=f"scaling-server-w{workers}-", suffix=".log", delete=False)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "benchmark.offline.fake_server:app", "--host", "127.0.0.1",
+             "--port", str(args.port), "--workers", str(workers), "--log-level", "warning"],
+            env=env, stdout=self.log, stderr=subprocess.STDOUT)
+
+    async def wait_ready(self, client, timeout):
+        # Each probe lands on whichever worker accepts it, so ask until several in a row agree
+        deadline, streak = time.monotonic() + timeout, 0
+        while streak < 2 * self.workers:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with {self.process.returncode}; see {self.log.name}")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server not ready after {timeout:.0f}s; see {self.log.name}")
+            try:
+                streak = streak + 1 if (await client.get(self.url + "/readyz")).status_code == 200 else 0
+            except Exception:
+                streak = 0
+            if streak == 0:
+                await asyncio.sleep(0.5)
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+
+
+async def send(client, url, message):
+    response = await client.post(url + "/query", json={"message": message, "customer_id": CUSTOMER_ID})
+    response.raise_for_status()
+    return response.json()
+
+
+async def reference_answers(client, url, messages):
+    """What each message gets when it is the only request in flight."""
+    return {message: canonical(await send(client, url, message)) for message in dict.fromkeys(messages)}
+
+
+async def run_level(client, url, messages, concurrency, reference):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors, mismatches = [], 0, []
+
+    async def one(message):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                body = await send(client, url, message)
+            except Exception:
+                errors += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+        if message in reference and canonical(body) != reference[message]:
+            mismatches.append({"message": message, "expected": json.loads(reference[message]), "got": body})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(message) for message in messages))
+    seconds = time.perf_counter() - started
+    level = {"concurrency": concurrency, "requests": len(messages), "errors": errors, "inconsistent": len(mismatches),
+             "examples": mismatches[:MAX_EXAMPLES]}
+    if latencies:
+        level.update({
+            "throughput_rps": round(len(latencies) / seconds, 2),
+            "p50_ms": round(statistics.median(latencies), 3),
+            "p95_ms": round(percentile(latencies, 0.95), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+        })
+    return level
+
+
+def print_row(workers, level, baseline_rps):
+    if "throughput_rps" not in level:
+        print(f"{workers:>7} {level['concurrency']:>5} {'-':>8} {'-':>8} {'-':>9} {'-':>9} {'-':>9} "
+              f"{level['errors']:>7} {level['inconsistent']:>7}")
+        return
+    # Throughput against the first worker count at the same concurrency
+    speedup = f"{level['throughput_rps'] / baseline_rps:>7.2f}x" if baseline_rps else f"{'-':>8}"
+    print(f"{workers:>7} {level['concurrency']:>5} {level['throughput_rps']:>8.1f} {speedup} "
+          f"{level['p50_ms']:>9.1f} {level['p95_ms']:>9.1f} {level['p99_ms']:>9.1f} "
+          f"{level['errors']:>7} {level['inconsistent']:>7}", flush=True)
+
+
+async def main_async(args):
+    import httpx
+
+    mix = parse_mix(args.mix)
+    messages = build_messages(mix, args.requests, args.seed)
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    runs, reference, baseline = [], None, {}
+
+    print(f"{'workers':>7} {'conc':>5} {'req/s':>8} {'scale':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'errors':>7} {'incons.':>7}")
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        for workers in ([None] if args.url else args.workers):
+            server = None if args.url else Server(args, workers)
+            url = args.url.rstrip("/") if args.url else server.url
+            try:
+                if server:
+                    await server.wait_ready(client, args.startup_timeout)
+                if reference is None:
+                    # Taken once, so every worker count is held to the same answers
+                    reference = await reference_answers(client, url, messages)
+                # Untimed round at the highest concurrency: every worker loads its classifier and snapshots
+                await run_level(client, url, messages[:max(args.concurrency)], max(args.concurrency), {})
+                for concurrency in args.concurrency:
+                    level = await run_level(client, url, messages, concurrency, reference)
+                    level["workers"] = workers
+                    runs.append(level)
+                    baseline.setdefault(concurrency, level.get("throughput_rps"))
+                    print_row(workers or "-", level, baseline[concurrency])
+            finally:
+                if server:
+                    server.stop()
+
+    return {
+        "git": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "url": args.url,
+            "mix": mix,
+            "requests": args.requests,
+            "seed": args.seed,
+            "llm_latency_ms": args.llm_latency_ms,
+            "db_latency_ms": args.db_latency_ms,
+            "fake_embeddings": args.fake_embeddings,
+            "async_pipeline": args.async_pipeline,
+            "single_flight": args.single_flight,
+            "torch_threads": args.torch_threads,
+        },
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=300, help="requests per concurrency level")
+    parser.add_argument("--mix", nargs="+", default=DEFAULT_MIX, metavar="INTENT=WEIGHT")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--db-latency-ms", type=float, default=1)
+    parser.add_argument("--fake-embeddings", action="store_true")
+    parser.add_argument("--async-pipeline", action="store_true", help="run the server with ASYNC_PIPELINE=1")
+    parser.add_argument("--single-flight", action="store_true",
+                        help="keep request coalescing on (off by default, since the mix repeats messages)")
+    parser.add_argument("--torch-threads", type=int, help="OMP_NUM_THREADS/MKL_NUM_THREADS for each worker")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="measure a running server instead of starting fake_server")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output-dir", default=os.path.join("benchmark", "results", "scaling"))
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    if not args.no_save:
+        os.makedirs(args.output_dir, exist_ok=True)
+        commit = (result["git"]["commit"] or "nogit")[:10] + ("-dirty" if result["git"]["dirty"] else "")
+        path = os.path.join(args.output_dir, f"{result['created_at'].replace(':', '').replace('-', '')}-{commit}.json")
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print("Saved", path)
+
+    inconsistent = [run for run in result["runs"] if run["inconsistent"]]
+    for run in inconsistent:
+        print(f"\nworkers={run['workers']} concurrency={run['concurrency']}: {run['inconsistent']} answers "
+              f"differed from the sequential reference, e.g.:")
+        for example in run["examples"][:2]:
+            print(json.dumps(example, indent=2, default=str))
+    if inconsistent:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
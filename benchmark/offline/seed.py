@@ -0,0 +1,151 @@
+"""Seed data for the offline benchmark, shared by the in-process stand-in and Postgres.
+
+Print it as SQL to load a scratch database (it drops and recreates the tables it needs):
+
+    python -m benchmark.offline.seed > /tmp/lanyard_seed.sql
+    psql "$SCRATCH_DATABASE_URL" -f /tmp/lanyard_seed.sql
+"""
+import json
+from datetime import datetime, timedelta
+
+FAQS = [
+    (1, "What is the minimum order quantity?", "Our minimum order is 50 custom lanyards."),
+    (2, "What is your return policy?", "Custom lanyards can be returned within 30 days if they arrive damaged."),
+    (3, "What's the turnaround time?", "Production takes 5-7 business days after artwork approval."),
+    (4, "Can I place my order online?", "Yes, you can design and order lanyards on our website."),
+    (5, "What imprint methods do you offer?", "We offer screen printing, dye sublimation and woven imprints."),
+    (6, "What is the thickness of your lanyard?", "Our lanyards are about 1.5 mm thick."),
+    (7, "Do you ship internationally?", "We ship to the US, Canada and most of Europe."),
+    (8, "Can I order a single custom lanyard?", "Custom orders start at 50 pieces; blank lanyards can be bought singly."),
+    (9, "What are lanyards used for?", "Lanyards hold ID badges, keys and passes at events and workplaces."),
+    (10, "What are the standard sizes for custom lanyards?", "We make 3/8, 5/8, 3/4 and 1 inch wide lanyards."),
+    (11, "How do I get a quote?", "Use the price calculator on any product page or email sales@example.com."),
+    (12, "Are there extra charges for attachments?", "Some attachments such as retractable reels carry a small extra charge."),
+]
+
+# (id, title, subtitle, material, description, width, length, height, weight, image url)
+PRODUCTS = [
+    (1, "Nylon Lanyard", "Smooth and shiny", "nylon", "Soft nylon lanyard with a glossy finish", 1.0, 36, 0.1, 20, "/img/nylon.png"),
+    (2, "Polyester Lanyard", "Budget friendly", "polyester", "Ribbed polyester lanyard for screen printing", 0.75, 36, 0.1, 18, "/img/polyester.png"),
+    (3, "Dye Sublimated Lanyard", "Full colour", "polyester", "Full colour dye sublimated print", 1.0, 36, 0.1, 19, "/img/dye.png"),
+    (4, "Woven Lanyard", "Classic", "polyester", "Woven logo lanyard", 0.625, 36, 0.1, 22, "/img/woven.png"),
+    (5, "Tubular Lanyard", "Economy", "polyester", "Round tubular lanyard", 0.5, 36, 0.2, 15, "/img/tubular.png"),
+    (6, "Eco Bamboo Lanyard", "Sustainable", "bamboo", "Lanyard made from bamboo fibre", 0.75, 36, 0.1, 17, "/img/bamboo.png"),
+    (7, "Satin Lanyard", "Premium feel", "satin", "Satin overlay lanyard", 1.0, 36, 0.1, 21, "/img/satin.png"),
+    (8, "Reflective Lanyard", "Safety", "polyester", "High visibility reflective lanyard", 1.0, 36, 0.1, 23, "/img/reflective.png"),
+]
+
+# (id, name, measurement, extra_charge)
+SIZES = [(1, "width", 0.375, 0), (2, "width", 0.625, 0), (3, "width", 0.75, 0.05), (4, "width", 1.0, 0.1)]
+# (id, name, label)
+ATTACHMENTS = [(1, "lobster claw", "Lobster Claw"), (2, "key ring", "Key Ring"), (3, "badge reel", "Badge Reel")]
+# (id, name, category_id, extra_charge)
+ATTACHMENT_STYLES = [(1, "lobster claw", 1, 0), (2, "key ring", 2, 0), (3, "badge reel", 3, 0.35)]
+
+PRICE_TIERS = [(50, 2.10), (100, 1.60), (250, 1.20), (500, 0.95), (1000, 0.80)]
+
+COLORS = [(1, "red"), (2, "blue"), (3, "black")]
+
+# (id, customer_id, product_id, color_id, size_id, total_price, status, days ago)
+ORDERS = [
+    (101, "1", 1, 1, 4, 160.00, "delivered", 90),
+    (102, "1", 3, 2, 4, 240.00, "shipped", 12),
+    (103, "1", 2, 3, 3, 95.00, "processing", 2),
+    (201, "2", 4, 1, 2, 310.00, "delivered", 40),
+    (202, "2", 7, 2, 4, 120.00, "processing", 5),
+]
+
+UPDATED_AT = datetime(2024, 1, 1)
+
+
+def price_chart(product_id: int, size_id: int):
+    # Wider and fancier lanyards cost a little more per piece
+    factor = 1 + 0.05 * (product_id - 1) + 0.1 * (size_id - 1)
+    return [{"quantity": quantity, "price": round(price * factor, 2)} for quantity, price in PRICE_TIERS]
+
+
+def tables(now: datetime = None) -> dict:
+    """Every seeded table as a list of row dicts, as Postgres would return them."""
+    now = now or datetime.now()
+    return {
+        "faq": [{"id": id, "question": question, "answer": answer} for id, question, answer in FAQS],
+        "product": [
+            {"id": id, "title": title, "subtitle": subtitle, "material": material, "description": description,
+             "width": width, "length": length, "height": height, "weight": weight, "deleted": 0,
+             "updated_at": UPDATED_AT}
+            for id, title, subtitle, material, description, width, length, height, weight, _ in PRODUCTS
+        ],
+        "image": [{"id": product[0], "url": product[9], "updated_at": UPDATED_AT} for product in PRODUCTS],
+        "product_images": [{"product_id": product[0], "image_id": product[0]} for product in PRODUCTS],
+        "size": [{"id": id, "name": name, "measurement": measurement, "extra_charge": extra, "deleted": 0}
+                 for id, name, measurement, extra in SIZES],
+        "attachment_categories": [{"id": id, "name": name, "label": label, "deleted": 0}
+                                  for id, name, label in ATTACHMENTS],
+        "attachment_styles": [{"id": id, "name": name, "category_id": category, "extra_charge": extra, "deleted": 0}
+                              for id, name, category, extra in ATTACHMENT_STYLES],
+        "product_price_chart": [
+            {"product_id": product[0], "size_id": size[0], "attachment_style_id": attachment[0],
+             "price_chart": price_chart(product[0], size[0]), "deleted": 0, "updated_at": UPDATED_AT}
+            for product in PRODUCTS for size in SIZES for attachment in ATTACHMENTS
+        ],
+        "color": [{"id": id, "name": name} for id, name in COLORS],
+        "lanyard_order": [
+            {"id": id, "customer_id": customer_id, "total_price": total, "status": status,
+             "created_at": now - timedelta(days=days_ago)}
+            for id, customer_id, _, _, _, total, status, days_ago in ORDERS
+        ],
+        "lanyard_order_items": [{"id": order[0], "order_id": order[0], "product_id": order[2]} for order in ORDERS],
+        "order_color": [{"order_item_id": order[0], "color_id": order[3]} for order in ORDERS],
+        "order_size": [{"order_item_id": order[0], "size_id": order[4]} for order in ORDERS],
+    }
+
+
+SCHEMA = """
+DROP TABLE IF EXISTS faq, product, image, product_images, size, attachment_categories, attachment_styles,
+    product_price_chart, color, lanyard_order, lanyard_order_items, order_color, order_size;
+CREATE TABLE faq (id integer PRIMARY KEY, question varchar NOT NULL, answer varchar NOT NULL);
+CREATE TABLE product (id integer PRIMARY KEY, title varchar NOT NULL, subtitle varchar, material varchar,
+    description varchar, width double precision, length double precision, height double precision,
+    weight double precision, deleted integer NOT NULL DEFAULT 0, updated_at timestamp);
+CREATE TABLE image (id integer PRIMARY KEY, url varchar, updated_at timestamp);
+CREATE TABLE product_images (product_id integer, image_id integer);
+CREATE TABLE size (id integer PRIMARY KEY, name varchar, measurement double precision,
+    extra_charge numeric(10,2), deleted integer NOT NULL DEFAULT 0);
+CREATE TABLE attachment_categories (id integer PRIMARY KEY, name varchar, label varchar, deleted integer NOT NULL DEFAULT 0);
+CREATE TABLE attachment_styles (id integer PRIMARY KEY, name varchar, category_id integer,
+    extra_charge numeric(10,2), deleted integer NOT NULL DEFAULT 0);
+CREATE TABLE product_price_chart (product_id integer, size_id integer, attachment_style_id integer,
+    price_chart jsonb, deleted integer NOT NULL DEFAULT 0, updated_at timestamp);
+CREATE TABLE color (id integer PRIMARY KEY, name varchar);
+CREATE TABLE lanyard_order (id integer PRIMARY KEY, customer_id varchar NOT NULL, total_price numeric(10,2),
+    status varchar, created_at timestamp);
+CREATE TABLE lanyard_order_items (id integer PRIMARY KEY, order_id integer, product_id integer);
+CREATE TABLE order_color (order_item_id integer, color_id integer);
+CREATE TABLE order_size (order_item_id integer, size_id integer);
+"""
+
+
+def _literal(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime):
+        return f"'{value.isoformat(sep=' ')}'"
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def render_sql(now: datetime = None) -> str:
+    statements = [SCHEMA.strip()]
+    for table, rows in tables(now).items():
+        for row in rows:
+            columns = ", ".join(row)
+            values = ", ".join(_literal(value) for value in row.values())
+            statements.append(f"INSERT INTO {table} ({columns}) VALUES ({values});")
+    return "\n".join(statements) + "\n"
+
+
+if __name__ == "__main__":
+    print(render_sql(), end="")
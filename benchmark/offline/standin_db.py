@@ -0,0 +1,148 @@
+"""In-process stand-in for Postgres, answering exactly the statements the pipeline issues.
+
+Statements are matched on their whitespace-normalised text: the FAQ load, the
+catalog and price snapshot reads, the order templates (evaluated with their
+bound parameters) and the canned SQL the fake LLM writes. Anything else is
+counted in `misses` and returns None, like a failed query does.
+"""
+import asyncio
+import copy
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from benchmark.offline import canned, seed
+from utils.serialize_result import serialize_result
+
+
+def normalize_sql(sql: str) -> str:
+    return " ".join(sql.split()).rstrip(";").strip()
+
+
+def _as_datetime(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+class StandinDatabase:
+    def __init__(self, latency: float = 0.0, now: Optional[datetime] = None):
+        # Simulated round trip per statement, slept (or awaited) like a network wait
+        self.latency = latency
+        self.tables = seed.tables(now)
+        self.queries = 0
+        self.misses: Dict[str, int] = {}
+        self.handlers: Dict[str, Callable[[dict], Optional[List[dict]]]] = {}
+        self._register_pipeline_sql()
+
+    def register(self, sql: str, handler: Callable[[dict], Optional[List[dict]]]) -> None:
+        self.handlers[normalize_sql(sql)] = handler
+
+    def _register_pipeline_sql(self) -> None:
+        from llm.catalog import catalog_index, price_quotes
+        from llm.chain.sub_chain.order_templates import ORDER_TEMPLATES
+
+        t = self.tables
+        self.register("SELECT id, question, answer FROM faq", lambda params: t["faq"])
+        self.register(catalog_index.CATALOG_SQL, lambda params: self.catalog_rows())
+        self.register(catalog_index.FINGERPRINT_SQL,
+                      lambda params: self.fingerprint("product", "image", "product_images"))
+        self.register(price_quotes.FINGERPRINT_SQL, lambda params: self.fingerprint(
+            "product_price_chart", "product", "size", "attachment_categories", "attachment_styles"))
+        self.register(price_quotes.PRICE_CHART_SQL, lambda params: [
+            {key: row[key] for key in ("product_id", "size_id", "attachment_style_id", "price_chart")}
+            for row in t["product_price_chart"]])
+        self.register(price_quotes.PRODUCT_SQL, lambda params: [
+            {"id": row["id"], "title": row["title"]} for row in t["product"]])
+        self.register(price_quotes.SIZE_SQL, lambda params: [
+            {key: row[key] for key in ("id", "name", "measurement", "extra_charge")} for row in t["size"]])
+        self.register(price_quotes.ATTACHMENT_SQL, lambda params: [
+            {key: row[key] for key in ("id", "name", "label")} for row in t["attachment_categories"]])
+        self.register(price_quotes.ATTACHMENT_STYLE_SQL, lambda params: [
+            {key: row[key] for key in ("id", "name", "category_id", "extra_charge")} for row in t["attachment_styles"]])
+
+        newest_first = lambda rows: sorted(rows, key=lambda row: row["created_at"], reverse=True)
+        self.register(ORDER_TEMPLATES["last_order"], lambda params: newest_first(self.order_rows(params))[:1])
+        self.register(ORDER_TEMPLATES["first_order"], lambda params: sorted(
+            self.order_rows(params), key=lambda row: row["created_at"])[:1])
+        self.register(ORDER_TEMPLATES["recent_orders"], lambda params: newest_first(self.order_rows(params))[:20])
+        self.register(ORDER_TEMPLATES["order_by_id"], lambda params: [
+            row for row in self.order_rows(params) if row["id"] == int(params["order_id"])])
+        self.register(ORDER_TEMPLATES["orders_in_range"], lambda params: newest_first([
+            row for row in self.order_rows(params)
+            if _as_datetime(params["start"]) <= row["created_at"] < _as_datetime(params["end"])]))
+
+        # The fake LLM's SQL; the order SQL comes back as the recent_orders template after binding
+        self.register(canned.PRODUCT_SQL, lambda params: self.catalog_rows()[:5])
+        self.register(canned.PRICE_SQL, lambda params: [self.price_row()])
+        self.register(canned.PRICE_QUANTITY_SQL, lambda params: [{"price": self.price_row()["price_chart"][1]["price"]}])
+
+    def catalog_rows(self) -> List[dict]:
+        images = {row["id"]: row["url"] for row in self.tables["image"]}
+        return [{**product, "url": images.get(product["id"])} for product in self.tables["product"]]
+
+    def price_row(self) -> dict:
+        chart = self.tables["product_price_chart"][0]
+        product = self.catalog_rows()[0]
+        return {"id": product["id"], "title": product["title"], "url": product["url"], "price_chart": chart["price_chart"]}
+
+    def fingerprint(self, *tables: str) -> List[dict]:
+        # Per table, the row count and the newest updated_at, or a content hash where there is no such column
+        row = {}
+        for table in tables:
+            rows = self.tables[table]
+            row[f"{table}_rows"] = len(rows)
+            if all("updated_at" in item for item in rows):
+                row[f"{table}_version"] = max((item["updated_at"] for item in rows), default=None)
+            else:
+                row[f"{table}_version"] = hash(repr(rows))
+        return [row]
+
+    def order_rows(self, params: dict) -> List[dict]:
+        t = self.tables
+        items = {row["order_id"]: row for row in t["lanyard_order_items"]}
+        colors = {row["order_item_id"]: row["color_id"] for row in t["order_color"]}
+        sizes = {row["order_item_id"]: row["size_id"] for row in t["order_size"]}
+        color_names = {row["id"]: row["name"] for row in t["color"]}
+        size_names = {row["id"]: row["name"] for row in t["size"]}
+        products = {row["id"]: row for row in t["product"]}
+        images = {row["id"]: row["url"] for row in t["image"]}
+        rows = []
+        for order in t["lanyard_order"]:
+            if order["customer_id"] != str(params.get("customer_id")):
+                continue
+            item = items.get(order["id"], {})
+            product = products.get(item.get("product_id"), {})
+            color_id, size_id = colors.get(item.get("id")), sizes.get(item.get("id"))
+            rows.append({
+                **order,
+                "product_id": item.get("product_id"),
+                "color_id": color_id,
+                "color_name": color_names.get(color_id),
+                "size_id": size_id,
+                "size_name": size_names.get(size_id),
+                "material": product.get("material"),
+                "title": product.get("title"),
+                "product_image_url": images.get(item.get("product_id")),
+            })
+        return rows
+
+    def _run(self, query: str, params: Optional[dict]) -> Optional[List[dict]]:
+        self.queries += 1
+        key = normalize_sql(query)
+        handler = self.handlers.get(key)
+        if handler is None:
+            self.misses[key] = self.misses.get(key, 0) + 1
+            print(f"Error executing query: stand-in database has no answer for {key[:80]!r}")
+            return None
+        # Copies, so callers (serialize_result included) never mutate the seeded rows
+        result = copy.deepcopy(handler(params or {}))
+        return serialize_result(result) if result else None
+
+    def execute(self, query: str, params: Optional[dict] = None) -> Optional[List[dict]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._run(query, params)
+
+    async def aexecute(self, query: str, params: Optional[dict] = None) -> Optional[List[dict]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._run(query, params)
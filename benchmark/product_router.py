@@ -0,0 +1,78 @@
+"""Routing cost per query: the old double fuzzy scan against the single-pass router.
+
+    python -m benchmark.product_router --repeat 200
+
+Also checks that both give the same order/price/price-and-quantity flags.
+"""
+import argparse
+import statistics
+import time
+
+from fuzzywuzzy import fuzz
+
+from llm.chain.sub_chain.product_router import (
+    PRICE_CALCULATION_PATTERNS,
+    RECEIVED_ORDER_PATTERNS,
+    check_user_query_details,
+    route_product_query,
+)
+
+QUERIES = [
+    "what is my last order",
+    "show me my recent orders",
+    "what is the status of my order",
+    "show me orders from last week",
+    "what is the price of nylon lanyard",
+    "calculate price for 200 lanyards",
+    "price of product pone with width 1 inch attachment clip quantity of 500",
+    "show me product with width more than 10",
+    "do you have blue polyester lanyards with a breakaway",
+    "what's the shipping time for dye sublimated lanyards in 3/4 inch",
+    "show me the cheapest lanyard you sell",
+    "which lanyards come in neon green",
+]
+
+
+def legacy_route(user_query):
+    # What product_chain used to do per request: every scan ran twice
+    user_query = user_query.strip().lower()
+    for _ in range(2):
+        is_recent_order = any(fuzz.ratio(user_query, pattern) > 80 for pattern in RECEIVED_ORDER_PATTERNS)
+        is_price_calculation = any(fuzz.ratio(user_query, pattern) > 80 for pattern in PRICE_CALCULATION_PATTERNS)
+        is_price_and_quantity = check_user_query_details(user_query)
+    return is_recent_order, is_price_calculation, is_price_and_quantity
+
+
+def route(user_query):
+    result = route_product_query(user_query)
+    return result.is_recent_order, result.is_price_calculation, result.is_price_and_quantity
+
+
+def us_per_query(func, queries, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for query in queries:
+            func(query)
+        timings.append((time.perf_counter() - started) * 1e6 / len(queries))
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    mismatches = [query for query in QUERIES if legacy_route(query) != route(query)]
+    for query in mismatches:
+        print(f"  MISMATCH {query!r}: legacy {legacy_route(query)}, router {route(query)}")
+
+    legacy_us = us_per_query(legacy_route, QUERIES, args.repeat)
+    router_us = us_per_query(route, QUERIES, args.repeat)
+    print(f"legacy double scan {legacy_us:9.1f} us/query")
+    print(f"single-pass router {router_us:9.1f} us/query  ({legacy_us / router_us:.1f}x)")
+    print(f"flags identical on {len(QUERIES) - len(mismatches)}/{len(QUERIES)} queries")
+
+
+if __name__ == "__main__":
+    main()
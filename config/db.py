@@ -12,3 +12,18 @@ def get_db_params():
         'port': os.getenv('DB_PORT'),
         # 'sslmode':os.getenv('DB_SSL_MODE')
     }
+
+def get_pool_config():
+    return {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        # Seconds a request waits for a free connection before giving up
+        'checkout_timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        # Connections are recycled after this many seconds, so server-side restarts and failovers are picked up
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+        # Connections idle longer than this are pinged on checkout (0 pings every checkout)
+        'health_check_idle': float(os.getenv('DB_POOL_HEALTH_CHECK_IDLE', '30')),
+        'statement_timeout_ms': int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000')),
+        'connect_retries': int(os.getenv('DB_CONNECT_RETRIES', '3')),
+        'connect_backoff': float(os.getenv('DB_CONNECT_BACKOFF', '0.2')),
+    }
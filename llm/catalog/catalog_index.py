@@ -0,0 +1,187 @@
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from llm.catalog.snapshot import RefreshingSnapshot
+
+# Same rows the product SQL prompt produces (p.* plus image url, one row per image)
+CATALOG_SQL = """
+SELECT p.*, i.url
+FROM product p
+LEFT JOIN product_images pi ON p.id = pi.product_id
+LEFT JOIN image i ON pi.image_id = i.id
+WHERE p.deleted = 0
+ORDER BY p.id
+"""
+# Covers every table CATALOG_SQL joins, so a changed image url refreshes the snapshot too;
+# product_images has no updated_at column, so its links are hashed
+FINGERPRINT_SQL = """
+SELECT
+    (SELECT COUNT(*) FROM product) AS product_rows,
+    (SELECT MAX(updated_at) FROM product) AS product_updated_at,
+    (SELECT COUNT(*) FROM image) AS image_rows,
+    (SELECT MAX(updated_at) FROM image) AS image_updated_at,
+    (SELECT md5(string_agg(t::text, ',' ORDER BY t.product_id, t.image_id)) FROM product_images t) AS product_images_hash
+"""
+
+TEXT_FIELDS = ("title", "subtitle", "material", "description")
+# Words the product prompt tells the LLM to look for in the title or material
+PRIMARY_FIELDS = ("title", "subtitle", "material")
+NUMERIC_FIELDS = ("width", "length", "height", "weight")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Request phrasing that carries no search meaning
+QUERY_STOPWORDS = frozenset("""
+show me find list get give display see i need want looking for search all any some the a an of with
+made from in that which are is have has do you your products product items item please what and
+""".split())
+
+COMPARISONS = {
+    "more than": ">", "greater than": ">", "over": ">", "above": ">", "bigger than": ">", "wider than": ">",
+    "at least": ">=", "less than": "<", "under": "<", "below": "<", "smaller than": "<", "at most": "<=",
+    "equal to": "=", "equals": "=", "exactly": "=", "of": "=", "is": "=",
+}
+COMPARISON_WORDS = "|".join(sorted((re.escape(word) for word in COMPARISONS), key=len, reverse=True))
+NUMERIC_CONDITION_PATTERN = re.compile(
+    r"\b(" + "|".join(NUMERIC_FIELDS) + r")\s*(?:is\s+)?(" + COMPARISON_WORDS + r"|>=|<=|>|<|=)?\s*(\d+(?:\.\d+)?)\b")
+
+
+def stem(token: str) -> str:
+    # "lanyards" and "lanyard" index the same, like the prompt's singular/plural ILIKE pair
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def trigrams(token: str) -> Set[str]:
+    # Unpadded, so a word's trigrams are a subset of those of any token containing it
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class CatalogSnapshot:
+    """Immutable in-memory copy of the product catalog with search indexes.
+
+    Text fields get a token inverted index (stemmed) plus a trigram index over
+    the token vocabulary, so a query word also matches tokens that contain it,
+    as ILIKE '%word%' would. Numeric columns get sorted arrays for range
+    lookups by binary search.
+    """
+
+    def __init__(self, rows: List[dict], fingerprint=None):
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+        self.rows_by_product: Dict[int, List[dict]] = {}
+        for row in rows:
+            self.rows_by_product.setdefault(row["id"], []).append(row)
+        self.product_ids = list(self.rows_by_product)
+
+        # field -> token -> product ids
+        self.postings: Dict[str, Dict[str, Set[int]]] = {field: {} for field in TEXT_FIELDS}
+        for product_id, product_rows in self.rows_by_product.items():
+            product = product_rows[0]
+            for field in TEXT_FIELDS:
+                for token in TOKEN_PATTERN.findall((product.get(field) or "").lower()):
+                    self.postings[field].setdefault(stem(token), set()).add(product_id)
+
+        self.vocabulary = {token for field_postings in self.postings.values() for token in field_postings}
+        self.trigram_index: Dict[str, Set[str]] = {}
+        for token in self.vocabulary:
+            for gram in trigrams(token):
+                self.trigram_index.setdefault(gram, set()).add(token)
+
+        self.numeric: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for field in NUMERIC_FIELDS:
+            pairs = [(float(rows[0][field]), product_id) for product_id, rows in self.rows_by_product.items()
+                     if rows[0].get(field) is not None]
+            pairs.sort()
+            self.numeric[field] = (np.array([value for value, _ in pairs], dtype=np.float64),
+                                   np.array([product_id for _, product_id in pairs], dtype=np.int64))
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def matching_tokens(self, word: str) -> Set[str]:
+        """Vocabulary tokens containing `word` as a substring."""
+        word = stem(word)
+        if len(word) < 3:
+            # Too short to mean anything as a substring ("or" is in "color")
+            return {word} if word in self.vocabulary else set()
+        candidates = self.vocabulary
+        # Trigram intersection narrows the substring check to a few tokens
+        for gram in trigrams(word):
+            candidates = candidates & self.trigram_index.get(gram, set())
+            if not candidates:
+                return set()
+        return {token for token in candidates if word in token}
+
+    def text_matches(self, word: str, fields: Iterable[str] = PRIMARY_FIELDS) -> Set[int]:
+        products = set()
+        for token in self.matching_tokens(word):
+            for field in fields:
+                products |= self.postings[field].get(token, set())
+        return products
+
+    def numeric_matches(self, field: str, operator: str, value: float) -> Set[int]:
+        values, product_ids = self.numeric[field]
+        if operator == ">":
+            selected = product_ids[np.searchsorted(values, value, side="right"):]
+        elif operator == ">=":
+            selected = product_ids[np.searchsorted(values, value, side="left"):]
+        elif operator == "<":
+            selected = product_ids[:np.searchsorted(values, value, side="left")]
+        elif operator == "<=":
+            selected = product_ids[:np.searchsorted(values, value, side="right")]
+        else:
+            selected = product_ids[np.searchsorted(values, value, side="left"):np.searchsorted(values, value, side="right")]
+        return set(selected.tolist())
+
+    def rows(self, product_ids: Iterable[int]) -> List[dict]:
+        """SQL-shaped rows (p.* plus url), in product id order."""
+        return [dict(row) for product_id in sorted(product_ids) for row in self.rows_by_product[product_id]]
+
+
+def parse_product_query(user_query: str) -> Tuple[List[str], List[Tuple[str, str, float]]]:
+    """(search words, numeric conditions) from a simple product question."""
+    query = user_query.lower()
+    conditions = []
+    for field, comparison, value in NUMERIC_CONDITION_PATTERN.findall(query):
+        conditions.append((field, COMPARISONS.get(comparison, comparison or "="), float(value)))
+    remainder = NUMERIC_CONDITION_PATTERN.sub(" ", query)
+    words = [word for word in TOKEN_PATTERN.findall(remainder) if word not in QUERY_STOPWORDS]
+    return words, conditions
+
+
+class CatalogIndex(RefreshingSnapshot):
+    """Keeps a CatalogSnapshot current and resolves simple product lookups in-process."""
+
+    fingerprint_sql = FINGERPRINT_SQL
+
+    def build(self, fingerprint) -> CatalogSnapshot:
+        return CatalogSnapshot(self.fetch(CATALOG_SQL) or [], fingerprint=fingerprint)
+
+    def search(self, user_query: str) -> Optional[List[dict]]:
+        """Rows for every product matching all words and conditions.
+
+        Returns None, meaning "let the LLM write SQL", when the query has a word
+        the catalog has never seen (a colour, "cheapest", a country...) or
+        nothing to search on, or when nothing matches.
+        """
+        snapshot = self.snapshot()
+        words, conditions = parse_product_query(user_query)
+        if not words and not conditions:
+            return None
+        matches: Optional[Set[int]] = None
+        for word in words:
+            products = snapshot.text_matches(word)
+            if not products:
+                return None
+            matches = products if matches is None else matches & products
+        for field, operator, value in conditions:
+            products = snapshot.numeric_matches(field, operator, value)
+            matches = products if matches is None else matches & products
+        if not matches:
+            return None
+        return snapshot.rows(matches)
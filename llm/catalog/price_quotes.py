@@ -0,0 +1,208 @@
+import json
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from llm.catalog.snapshot import RefreshingSnapshot
+
+Variant = Tuple[int, int, int]  # (product_id, size_id, attachment_style_id)
+
+PRICE_CHART_SQL = """
+SELECT pp.product_id, pp.size_id, pp.attachment_style_id, pp.price_chart
+FROM product_price_chart pp
+WHERE pp.deleted = 0
+"""
+PRODUCT_SQL = "SELECT id, title FROM product WHERE deleted = 0"
+SIZE_SQL = "SELECT id, name, measurement, extra_charge FROM size WHERE deleted = 0"
+ATTACHMENT_SQL = "SELECT id, name, label FROM attachment_categories WHERE deleted = 0"
+ATTACHMENT_STYLE_SQL = "SELECT id, name, category_id, extra_charge FROM attachment_styles WHERE deleted = 0"
+# Cheap change detector over every table a quote reads, so a refresh only re-reads them when
+# something moved. size and the attachment tables have no updated_at column; they hold a few
+# dozen rows, so their contents are hashed instead.
+FINGERPRINT_SQL = """
+SELECT
+    (SELECT COUNT(*) FROM product_price_chart) AS price_chart_rows,
+    (SELECT MAX(updated_at) FROM product_price_chart) AS price_chart_updated_at,
+    (SELECT COUNT(*) FROM product) AS product_rows,
+    (SELECT MAX(updated_at) FROM product) AS product_updated_at,
+    (SELECT md5(string_agg(t::text, ',' ORDER BY t.id)) FROM size t) AS size_hash,
+    (SELECT md5(string_agg(t::text, ',' ORDER BY t.id)) FROM attachment_categories t) AS attachment_hash,
+    (SELECT md5(string_agg(t::text, ',' ORDER BY t.id)) FROM attachment_styles t) AS attachment_style_hash
+"""
+
+
+def attachment_key(name: str) -> str:
+    # Same comparison the price prompt asks the LLM for: lower case, spaces as underscores
+    return re.sub(r"\s+", "_", name.strip().lower())
+
+
+def _number(value) -> float:
+    return float(value) if value not in (None, "") else 0.0
+
+
+@dataclass(frozen=True)
+class Quote:
+    product_id: int
+    size_id: int
+    attachment_style_id: int
+    requested_quantity: int
+    quantity: int       # the price-chart tier that was used
+    price: float        # unit price at that tier
+    size_extra_charge: float
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class PriceSnapshot:
+    """Immutable, parsed copy of the price tables.
+
+    Every (product, size, attachment) price chart is held as two arrays sorted
+    by quantity, so a nearest-tier lookup is a binary search instead of a
+    jsonb_array_elements scan in Postgres.
+    """
+
+    def __init__(self, chart_rows: List[dict], products: List[dict], sizes: List[dict],
+                 attachments: List[dict], attachment_styles: List[dict], fingerprint=None):
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+        self.tiers: Dict[Variant, Tuple[np.ndarray, np.ndarray]] = {}
+        for row in chart_rows:
+            chart = row["price_chart"]
+            if isinstance(chart, str):
+                chart = json.loads(chart)
+            points = sorted((int(_number(tier.get("quantity"))), _number(tier.get("price")))
+                            for tier in chart or [] if tier.get("quantity") not in (None, ""))
+            if not points:
+                continue
+            variant = (row["product_id"], row["size_id"], row["attachment_style_id"])
+            self.tiers[variant] = (np.array([q for q, _ in points], dtype=np.int64),
+                                   np.array([p for _, p in points], dtype=np.float64))
+
+        self.products = {row["id"]: row["title"] for row in products}
+        self.sizes = {row["id"]: row for row in sizes}
+        self.attachments = {row["id"]: row for row in attachments}
+        self.attachment_ids = {}
+        for row in attachments:
+            self.attachment_ids.setdefault(attachment_key(row["name"]), row["id"])
+            if row.get("label"):
+                self.attachment_ids.setdefault(attachment_key(row["label"]), row["id"])
+        self.attachment_style_charges = {row["id"]: _number(row.get("extra_charge")) for row in attachment_styles}
+
+        self.variants_by_product: Dict[int, List[Variant]] = {}
+        for variant in self.tiers:
+            self.variants_by_product.setdefault(variant[0], []).append(variant)
+        # Lowest unit price per variant and per product, precomputed for "starting at" answers
+        self.variant_min_price = {variant: float(prices.min()) for variant, (_, prices) in self.tiers.items()}
+        self.product_min_price = {}
+        for variant, price in self.variant_min_price.items():
+            current = self.product_min_price.get(variant[0])
+            if current is None or price < current:
+                self.product_min_price[variant[0]] = price
+
+    def __len__(self):
+        return len(self.tiers)
+
+    def _quote(self, variant: Variant, requested: int, tier: int) -> Quote:
+        quantities, prices = self.tiers[variant]
+        size = self.sizes.get(variant[1], {})
+        return Quote(variant[0], variant[1], variant[2], int(requested), int(quantities[tier]),
+                     float(prices[tier]), _number(size.get("extra_charge")))
+
+    @staticmethod
+    def _nearest_tiers(quantities: np.ndarray, requested: np.ndarray) -> np.ndarray:
+        """Index of the tier closest to each requested quantity; ties go to the smaller tier."""
+        right = np.searchsorted(quantities, requested, side="left").clip(0, len(quantities) - 1)
+        left = (right - 1).clip(0, len(quantities) - 1)
+        take_left = np.abs(quantities[left] - requested) <= np.abs(quantities[right] - requested)
+        return np.where(take_left, left, right)
+
+    def nearest_quote(self, variant: Variant, quantity: int) -> Optional[Quote]:
+        if variant not in self.tiers:
+            return None
+        quantities, _ = self.tiers[variant]
+        tier = int(self._nearest_tiers(quantities, np.array([quantity]))[0])
+        return self._quote(variant, quantity, tier)
+
+    def quote_quantities(self, variant: Variant, quantities: Iterable[int]) -> List[Quote]:
+        """Quotes for many quantities of one variant with a single vectorized search."""
+        if variant not in self.tiers:
+            return []
+        requested = np.asarray(list(quantities), dtype=np.int64)
+        tiers = self._nearest_tiers(self.tiers[variant][0], requested)
+        return [self._quote(variant, q, t) for q, t in zip(requested.tolist(), tiers.tolist())]
+
+    def quote_variants(self, variants: Iterable[Variant], quantity: int) -> List[Optional[Quote]]:
+        """One quote per variant for the same quantity; None where a variant has no chart."""
+        return [self.nearest_quote(variant, quantity) for variant in variants]
+
+    def starting_price(self, product_id: int, size_id: Optional[int] = None,
+                       attachment_style_id: Optional[int] = None) -> Optional[float]:
+        """Lowest unit price for the product, optionally narrowed to a size and/or attachment."""
+        if size_id is None and attachment_style_id is None:
+            return self.product_min_price.get(product_id)
+        prices = [self.variant_min_price[variant] for variant in self.variants_by_product.get(product_id, [])
+                  if (size_id is None or variant[1] == size_id)
+                  and (attachment_style_id is None or variant[2] == attachment_style_id)]
+        return min(prices) if prices else None
+
+    def find_sizes(self, measurement: Optional[float] = None, name: str = "width") -> List[int]:
+        # Mirrors the prompt's `s.name ILIKE '%width%' AND s.measurement = N`
+        return [size_id for size_id, size in self.sizes.items()
+                if name.lower() in (size.get("name") or "").lower()
+                and (measurement is None or _number(size.get("measurement")) == measurement)]
+
+    def find_attachment(self, name: str) -> Optional[int]:
+        return self.attachment_ids.get(attachment_key(name))
+
+    def find_products(self, text: str) -> List[int]:
+        """Products whose title appears in `text`, longest title first."""
+        text = text.lower()
+        matches = [(len(title), product_id) for product_id, title in self.products.items()
+                   if title and re.search(r"\b" + re.escape(title.lower()) + r"\b", text)]
+        return [product_id for _, product_id in sorted(matches, reverse=True)]
+
+
+QUANTITY_PATTERN = re.compile(r"\b(?:quantity|qty|amount|number)\s*(?:of\s*)?(\d+)\b|\bof\s+(\d+)\b")
+WIDTH_PATTERN = re.compile(r"\bwidth\s*(?:of\s*)?(\d+(?:\.\d+)?)\b")
+
+
+class PriceQuoteEngine(RefreshingSnapshot):
+    """Keeps a PriceSnapshot current and answers price questions from it."""
+
+    fingerprint_sql = FINGERPRINT_SQL
+
+    def build(self, fingerprint) -> PriceSnapshot:
+        return PriceSnapshot(
+            self.fetch(PRICE_CHART_SQL) or [],
+            self.fetch(PRODUCT_SQL) or [],
+            self.fetch(SIZE_SQL) or [],
+            self.fetch(ATTACHMENT_SQL) or [],
+            self.fetch(ATTACHMENT_STYLE_SQL) or [],
+            fingerprint=fingerprint,
+        )
+
+    def quote_from_query(self, user_query: str) -> Optional[Quote]:
+        """Quote a "product ... width N ... <attachment> ... quantity N" question, or None if any part is missing."""
+        snapshot = self.snapshot()
+        query = user_query.lower()
+        quantity = QUANTITY_PATTERN.search(query)
+        width = WIDTH_PATTERN.search(query)
+        products = snapshot.find_products(query)
+        if not (quantity and width and products):
+            return None
+        attachment_ids = {attachment_id for key, attachment_id in snapshot.attachment_ids.items()
+                          if re.search(r"\b" + re.escape(key.replace("_", " ")) + r"\b", query)}
+        if len(attachment_ids) != 1:
+            return None
+        attachment_id = attachment_ids.pop()
+        requested = int(quantity.group(1) or quantity.group(2))
+        for size_id in snapshot.find_sizes(float(width.group(1))):
+            for product_id in products:
+                quote = snapshot.nearest_quote((product_id, size_id, attachment_id), requested)
+                if quote:
+                    return quote
+        return None
@@ -0,0 +1,58 @@
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+
+class RefreshingSnapshot:
+    """Holds an immutable snapshot built from database tables and swaps in a new one when they change.
+
+    Subclasses set `fingerprint_sql` (a cheap query whose first row changes
+    whenever the tables do) and implement `build`. `fetch(sql)` returns rows as
+    dicts, like execute_query. Reads never block on a refresh: the old snapshot
+    keeps serving until the new one is published.
+    """
+
+    fingerprint_sql: str = ""
+
+    def __init__(self, fetch: Callable[[str], Optional[List[dict]]], check_interval: float = 60):
+        self.fetch = fetch
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    def build(self, fingerprint) -> Any:
+        raise NotImplementedError
+
+    def _fingerprint(self):
+        rows = self.fetch(self.fingerprint_sql) or [{}]
+        return tuple(rows[0].values())
+
+    def refresh(self, fingerprint=None):
+        """Re-read the tables and publish a new snapshot."""
+        with self._lock:
+            fingerprint = fingerprint if fingerprint is not None else self._fingerprint()
+            snapshot = self.build(fingerprint)
+            self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+        return snapshot
+
+    def refresh_if_changed(self):
+        # Stamp first so concurrent callers don't all run the fingerprint query
+        self._checked_at = time.monotonic()
+        fingerprint = self._fingerprint()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.fingerprint == fingerprint:
+            return snapshot
+        return self.refresh(fingerprint)
+
+    def snapshot(self):
+        """The current snapshot; loads on first use and re-checks the fingerprint every `check_interval` seconds."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                # Concurrent first requests wait for one load instead of each reading the tables
+                return self._snapshot or self.refresh()
+        if self.check_interval and time.monotonic() - self._checked_at > self.check_interval:
+            return self.refresh_if_changed()
+        return snapshot
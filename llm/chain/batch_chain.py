@@ -0,0 +1,59 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+from llm.chain.full_chain import coalesced_full_chain
+from llm.chain.understand_chain import classify_queries
+from llm.chain.sub_chain.default_chain import preprocess_text
+from utils import metrics
+
+# Concurrent full_chain runs per batch request (LLM calls, SQL and FAQ lookups in flight)
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '8'))
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '500'))
+
+batch_items_total = metrics.counter(
+    "batch_items_total", "Messages received by /query/batch, and how many were duplicates (kind=received|unique)")
+
+
+def batch_key(item: dict) -> Tuple[str, Optional[str]]:
+    # The customer is part of the key: "show me my last order" differs per customer
+    return preprocess_text(item.get("message", "")), item.get("customer_id")
+
+
+def run_batch(items: List[dict], max_concurrency: Optional[int] = None) -> List[dict]:
+    """full_chain over many {message, customer_id} items, results in input order.
+
+    Identical normalized messages (per customer) run once. Every distinct message
+    is classified in one batched stage first; the rest runs through
+    coalesced_full_chain.batch, where concurrent query embeddings share the
+    embedding batcher's forward passes. Each result is {"result": ...} like /query, or
+    {"error": "..."} for that item alone.
+    """
+    max_concurrency = min(max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    positions: Dict[Tuple[str, Optional[str]], int] = {}
+    unique_inputs = []
+    for item in items:
+        key = batch_key(item)
+        if key not in positions:
+            positions[key] = len(unique_inputs)
+            unique_inputs.append(dict(item))
+    batch_items_total.inc(len(items), kind="received")
+    batch_items_total.inc(len(unique_inputs), kind="unique")
+
+    # decision_chain classifies `message.strip().lower()`; same text here
+    labels = classify_queries([item["message"].strip().lower() for item in unique_inputs], max_concurrency)
+    for item, label in zip(unique_inputs, labels):
+        if label is not None:
+            item["classification"] = label
+
+    # Coalesced, so batch items also share runs with identical live /query requests
+    outputs = coalesced_full_chain.batch(unique_inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True)
+
+    results = []
+    for item in items:
+        output = outputs[positions[batch_key(item)]]
+        if isinstance(output, Exception):
+            results.append({"error": str(output)})
+        else:
+            # Duplicates share the answer but echo their own message text
+            results.append({"result": {**output, "message": item["message"]}})
+    return results
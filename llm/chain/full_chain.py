@@ -1,9 +1,12 @@
+import os
 from typing import Optional
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langserve import CustomUserType
 from operator import itemgetter
 from llm.chain.response_chain import response_chain
-from llm.chain.understand_chain import decision_chain
+from llm.chain.understand_chain import astream_decision, decision_chain
+from llm.chain.sub_chain.default_chain import preprocess_text
+from utils.single_flight import SingleFlight
 
 class Input(CustomUserType):
     message: str
@@ -16,6 +19,8 @@ full_chain = (
         # Pass both message and customer_id through to the next stage
         "message": lambda input: input["message"],
         "customer_id": lambda input: input.get("customer_id", None),  # Safely handle optional customer_id
+        # Set by batch runs, which classify all their messages in one stage; None means classify here
+        "classification": lambda input: input.get("classification", None),
     }
     |
     RunnablePassthrough().assign(
@@ -32,3 +37,42 @@ full_chain = (
         "customer_id": lambda input: input.get("customer_id", None),
     }
 )
+
+
+# Identical concurrent requests (same normalized message, same customer) share one run
+SINGLE_FLIGHT = os.getenv('SINGLE_FLIGHT', '1') != '0'
+full_chain_flight = SingleFlight("full_chain")
+
+def coalesce_key(input):
+    return preprocess_text(input["message"]), input.get("customer_id", None)
+
+def own_result(result, input):
+    # The shared result carries the leader's message text; each caller gets a copy with its own,
+    # the same way run_batch answers duplicates
+    return {**result, "message": input["message"]}
+
+def invoke_coalesced(input):
+    if not SINGLE_FLIGHT:
+        return full_chain.invoke(input)
+    return own_result(full_chain_flight.do(coalesce_key(input), lambda: full_chain.invoke(input)), input)
+
+async def ainvoke_coalesced(input):
+    if not SINGLE_FLIGHT:
+        return await full_chain.ainvoke(input)
+    return own_result(await full_chain_flight.ado(coalesce_key(input), lambda: full_chain.ainvoke(input)), input)
+
+# full_chain behind single-flight; what /query and /query/batch run
+coalesced_full_chain = RunnableLambda(invoke_coalesced, afunc=ainvoke_coalesced, name="coalesced_full_chain")
+
+# Streaming counterpart of full_chain: the same events as astream_decision, with the
+# final "result" shaped exactly like full_chain's output
+async def astream_full_chain(input):
+    params = {"message": input["message"], "customer_id": input.get("customer_id", None)}
+    async for event, data in astream_decision(params):
+        if event == "result":
+            data = {
+                "message": params["message"],
+                "response": response_chain.invoke({"decision": data}),
+                "customer_id": params["customer_id"],
+            }
+        yield event, data
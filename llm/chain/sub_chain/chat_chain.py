@@ -1,11 +1,20 @@
 import json
-from langchain_core.runnables import chain
+from langchain_core.runnables import RunnableLambda
 from llm.chain.sub_chain.default_chain import default_chain
+from utils.logger import get_logger
 
-@chain
-def chat_chain(x):
+log = get_logger("chat_chain")
+
+def run_chat_chain(x):
     message = x["message"]
-    print('chat,',x)
+    log.debug("chat_chain_input", input=x)
     result = default_chain.invoke(input={"message": message})
     return result
     #json.loads(result.json())
+
+async def arun_chat_chain(x):
+    message = x["message"]
+    log.debug("chat_chain_input", input=x)
+    return await default_chain.ainvoke(input={"message": message})
+
+chat_chain = RunnableLambda(run_chat_chain, afunc=arun_chat_chain, name="chat_chain")
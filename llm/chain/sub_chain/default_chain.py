@@ -1,87 +1,164 @@
 
+import asyncio
 import json
-import torch
+import os
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from transformers import DistilBertTokenizer, DistilBertModel
 from typing import Union
-from langchain_core.runnables import RunnablePassthrough, chain
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from utils import metrics, tracing
+from utils.logger import get_logger
 from utils.execute_query import execute_query
 from llm.schema.faq_schema import Faq
-from llm.model import gemini_chat_model
+from llm.model import EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME, model_registry
 from llm.prompts.faq_prompt import faq_prompt
-from sentence_transformers import SentenceTransformer
+from llm.retriever.faq_index import build_faq_index, current_faq_index, get_faq_index
+from llm.retriever.faq_store import FaqEmbeddingStore
+from llm.embedding.batcher import EmbeddingBatcher
 
-# Use DistilBERT for faster processing
-tokenizer = DistilBertTokenizer.from_pretrained('distilbert-base-uncased')
-model = DistilBertModel.from_pretrained('distilbert-base-uncased')
+log = get_logger("default_chain")
 
 # Cache for frequently asked queries (optional)
 # faq_cache = {}
 
-# Load a better model for embeddings
-new_model = SentenceTransformer('all-MiniLM-L6-v2')
+# The sentence embedding model is loaded by the registry on first use or warm-up
+def encode_sentences(sentences):
+    return model_registry.get("sentence_embedding_model").encode(sentences, convert_to_numpy=True)
 
-# # Function to embed a sentence using DistilBERT
-# def embed_sentence(sentence):
-#     inputs = tokenizer(sentence, return_tensors='pt', truncation=True, padding=True)
-#     with torch.no_grad():
-#         outputs = model(**inputs)
-#     return outputs.last_hidden_state.mean(dim=1).numpy()
+# Concurrent query embeddings share one batched forward pass instead of one each
+embedding_batcher = EmbeddingBatcher(
+    encode_sentences,
+    window_ms=float(os.getenv('EMBED_BATCH_WINDOW_MS', '5')),
+    max_batch_size=int(os.getenv('EMBED_MAX_BATCH_SIZE', '32')),
+)
 
-# Function to embed a sentence
+# Function to embed a sentence (or a list of sentences, encoded as one batch)
+@tracing.traced("embedding")
 def embed_sentence(sentence):
-    return new_model.encode(sentence, convert_to_numpy=True)
+    if isinstance(sentence, str):
+        return embedding_batcher.embed(sentence)
+    return encode_sentences(sentence)
 
 def preprocess_text(text):
     return ' '.join(text.lower().strip().split())
 
-# Precompute and store FAQ embeddings for faster query processing
-def precompute_faq_embeddings(faq_data):
-    for faq in faq_data:
-        faq['question'] = preprocess_text(faq['question'])
-        faq['embedding'] = embed_sentence(faq['question'])
+# FAQ embeddings persisted on disk and memory-mapped by every worker.
+# Keyed by backend too, since int8 vectors must not be mixed with fp32 ones.
+faq_store = FaqEmbeddingStore(
+    os.getenv('FAQ_EMBEDDING_DIR', '.cache/faq_embeddings'),
+    f"{EMBEDDING_MODEL_NAME}:{EMBEDDING_BACKEND}",
+    embed=embed_sentence,
+    normalize=preprocess_text,
+)
 
-# SQL Query to retrieve all FAQs and their precomputed embeddings
+# SQL Query to retrieve all FAQs
+@tracing.traced("faq_load")
 def get_all_faqs():
     sql_query = "SELECT id, question, answer FROM faq"
-    result = execute_query(sql_query)
-    faqs = [{'id': row['id'], 'question': row['question'], 'answer': row['answer']} for row in result]
-    
-    # Precompute embeddings for all FAQ questions
-    precompute_faq_embeddings(faqs)
-    
-    return faqs
+    result = execute_query(sql_query) or []
+    return [{'id': row['id'], 'question': preprocess_text(row['question']), 'answer': row['answer']} for row in result]
+
+# Embeddings for the FAQ questions, re-encoding only questions that changed
+def embed_faqs(faqs):
+    return faq_store.sync([faq['question'] for faq in faqs])
+
+# Rebuild the process-wide FAQ index and swap it in (called at startup and on reload)
+def load_faq_index():
+    return build_faq_index(get_all_faqs, embed_faqs, normalize=preprocess_text)
+
+# Minimum cosine similarity for an FAQ to count as an answer
+SIMILARITY_THRESHOLD = 0.5
+# Weight of the semantic score when reranking ambiguous queries with BM25
+HYBRID_SEMANTIC_WEIGHT = float(os.getenv('FAQ_HYBRID_SEMANTIC_WEIGHT', '0.7'))
+
+# Which retrieval path answered each FAQ query; hit rate = path count / all queries
+faq_retrieval_total = metrics.counter(
+    "faq_retrieval_total", "FAQ queries by retrieval path (exact, lexical, hybrid, semantic) and outcome")
+
+# Function to compute semantic similarity between the query and the resident FAQ index
+@tracing.traced("semantic_search")
+def semantic_search(user_query: str, faq_index, query_embedding=None) -> list:
+    if query_embedding is None:
+        query_embedding = embed_sentence(user_query)
+
+    # One matrix product over all FAQs, top 5 kept for debugging
+    indices, similarities = faq_index.engine.search(query_embedding, k=5)
+
+    # Debugging: top similarities, only built when debug logging is on
+    if log.enabled("debug"):
+        log.debug("faq_top_similarities", query=user_query, top=[
+            (faq_index.faqs[i]["question"], round(float(similarity), 4))
+            for i, similarity in zip(indices, similarities) if i >= 0])
+
+    # Scores stay in their own arrays; the shared FAQ dicts are never mutated
+    if len(indices) and indices[0] >= 0 and similarities[0] > SIMILARITY_THRESHOLD:
+        # Return top 1 most similar FAQ
+        return [faq_index.faqs[indices[0]]]
+    return []
+
+# Rerank semantic and BM25 candidates together when neither is decisive on its own
+@tracing.traced("hybrid_search")
+def hybrid_search(user_query: str, faq_index, lexical_indices, lexical_scores, query_embedding=None) -> list:
+    if query_embedding is None:
+        query_embedding = embed_sentence(user_query)
+    semantic_indices, _ = faq_index.engine.search(query_embedding, k=10)
+    candidates = np.union1d(semantic_indices[semantic_indices >= 0], lexical_indices).astype(np.int64)
+    similarities = faq_index.engine.score_rows(query_embedding, candidates)
+
+    # BM25 is unbounded, so scale it by the best lexical score before mixing
+    lexical = np.zeros(len(candidates), dtype=np.float32)
+    lexical[np.searchsorted(candidates, lexical_indices)] = lexical_scores / lexical_scores[0]
+    combined = HYBRID_SEMANTIC_WEIGHT * similarities + (1 - HYBRID_SEMANTIC_WEIGHT) * lexical
+
+    best = int(np.argmax(combined))
+    log.debug("faq_hybrid_best", query=user_query, question=faq_index.faqs[candidates[best]]["question"],
+              similarity=float(similarities[best]), lexical=float(lexical[best]))
+    # The semantic threshold still decides whether there is an answer at all
+    if similarities[best] > SIMILARITY_THRESHOLD:
+        return [faq_index.faqs[candidates[best]]]
+    return []
+
+# Cheapest path first: exact question, then a confident BM25 match. Returns
+# (path, faqs, lexical candidates); faqs is None when the query still needs embedding.
+@tracing.traced("lexical_search")
+def match_faq_lexically(user_query: str, faq_index):
+    lexical_index = faq_index.lexical
+    if lexical_index is None:
+        return "semantic", None, None
+    exact = lexical_index.exact_match(user_query)
+    if exact is not None:
+        return "exact", [faq_index.faqs[exact]], None
+    best, lexical_indices, lexical_scores = lexical_index.confident_match(user_query)
+    if best is not None:
+        return "lexical", [faq_index.faqs[best]], None
+    if len(lexical_indices):
+        return "hybrid", None, (lexical_indices, lexical_scores)
+    return "semantic", None, None
+
+def search_by_embedding(user_query: str, faq_index, path: str, lexical, query_embedding) -> list:
+    if path == "hybrid":
+        return hybrid_search(user_query, faq_index, *lexical, query_embedding=query_embedding)
+    return semantic_search(user_query, faq_index, query_embedding=query_embedding)
+
+# Exact question, confident BM25 match, hybrid, then pure semantic
+@tracing.traced("faq_retrieval")
+def retrieve_faqs(user_query: str, faq_index) -> list:
+    path, relevant_faqs, lexical = match_faq_lexically(user_query, faq_index)
+    if relevant_faqs is None:
+        relevant_faqs = search_by_embedding(user_query, faq_index, path, lexical, embed_sentence(user_query))
+    faq_retrieval_total.inc(path=path, answered=str(bool(relevant_faqs)).lower())
+    tracing.set_labels(route=path)
+    return relevant_faqs
 
-# Function to compute semantic similarity between the query and precomputed FAQ embeddings
-def semantic_search(user_query: str, faq_data: list) -> list:
-    query_embedding = embed_sentence(user_query)
-    
-    # Use precomputed embeddings for each FAQ
-    faq_embeddings = [faq['embedding'] for faq in faq_data]
-    
-    # Compute cosine similarity between the query and FAQ embeddings
-    similarities = [cosine_similarity(query_embedding.reshape(1, -1), faq_embedding.reshape(1, -1))[0][0] for faq_embedding in faq_embeddings]
-    
-    # Add similarity scores to FAQs for better debugging
-    for i, faq in enumerate(faq_data):
-        faq['similarity'] = similarities[i]
-    # Sort FAQs by similarity score (highest first)
-    # sorted_faqs = sorted(zip(similarities, faq_data), key=lambda x: x[0], reverse=True)
-
-    # Sort FAQs by similarity score
-    sorted_faqs = sorted(faq_data, key=lambda x: x['similarity'], reverse=True)
-
-    # Debugging: Print top similarities
-    print("Top Similarities:")
-    for faq in sorted_faqs[:5]:  # Print top 5 matches
-        print(f"Question: {faq['question']}, Similarity: {faq['similarity']}")
-    
-    # Define a similarity threshold to filter out irrelevant FAQs
-    threshold = 0.5
-    # relevant_faqs = [faq for similarity, faq in sorted_faqs if similarity > threshold]
-    relevant_faqs = sorted_faqs[:1] if sorted_faqs and sorted_faqs[0]['similarity'] > 0.5 else []
-    # Return top 1 most similar FAQ
+# Same as retrieve_faqs, awaiting the embedding batcher instead of blocking a thread on it
+@tracing.traced("faq_retrieval")
+async def aretrieve_faqs(user_query: str, faq_index) -> list:
+    path, relevant_faqs, lexical = match_faq_lexically(user_query, faq_index)
+    if relevant_faqs is None:
+        with tracing.span("embedding"):
+            query_embedding = await embedding_batcher.aembed(user_query)
+        relevant_faqs = search_by_embedding(user_query, faq_index, path, lexical, query_embedding)
+    faq_retrieval_total.inc(path=path, answered=str(bool(relevant_faqs)).lower())
+    tracing.set_labels(route=path)
     return relevant_faqs
 
 # Check the cache for frequently asked queries (optional)
@@ -115,8 +192,7 @@ def transform_result(relevant_faqs):
         }
 
 # Define the chain that retrieves FAQ data from the database and integrates with prompt template
-@chain
-def get_data(x):
+def get_faq_data(x):
     user_query = x["message"]
     
     # Check if the result is in the cache
@@ -124,22 +200,36 @@ def get_data(x):
     # if cached_result:
     #     return cached_result
     
-    # Get all FAQs from the SQL database with precomputed embeddings
-    all_faqs = get_all_faqs()
+    # Use the resident FAQ index instead of re-embedding the FAQ table per request
+    faq_index = get_faq_index(load_faq_index)
 
-    # Perform semantic search to find relevant FAQs
-    relevant_faqs = semantic_search(user_query, all_faqs)
+    # Lexical fast paths skip the embedding model for near-verbatim questions
+    relevant_faqs = retrieve_faqs(user_query, faq_index)
     
     # Cache the result for future queries (optional)
     # cache_result(user_query, relevant_faqs)
-    print("Transform FAQS:", transform_result(relevant_faqs))
     # Transform the result into a structure expected by Faq schema
     # Transform the result
     result = transform_result(relevant_faqs)
+    log.debug("faq_result", query=user_query, result=result)
     
     # Wrap the result in a RunnablePassthrough-compatible format
     return {"faq": result}
 
+async def aget_faq_data(x):
+    user_query = x["message"]
+    faq_index = current_faq_index()
+    if faq_index is None:
+        # Only before startup has built the index; building reads the database and embeds every FAQ
+        faq_index = await asyncio.to_thread(get_faq_index, load_faq_index)
+    relevant_faqs = await aretrieve_faqs(user_query, faq_index)
+    result = transform_result(relevant_faqs)
+    log.debug("faq_result", query=user_query, result=result)
+    return {"faq": result}
+
+# ainvoke runs the native async version instead of borrowing an executor thread
+get_data = RunnableLambda(get_faq_data, afunc=aget_faq_data, name="get_data")
+
 # Define the default chain, which retrieves the data and processes it with the FAQ model
 default_chain = (
     RunnablePassthrough().assign(
@@ -148,15 +238,3 @@ default_chain = (
     # | faq_prompt
     # | gemini_chat_model.with_structured_output(Faq)
 )
-
-# Correct input format
-input_data = {
-    "message": "How do I reset my password?"
-}
-
-# Run the chain with the correct input
-result = default_chain.invoke(input=input_data)
-
-# Output the result directly (it's already a dictionary)
-print(result)
-
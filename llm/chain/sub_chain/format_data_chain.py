@@ -1,6 +1,7 @@
-from llm.model import gemini_chat_model
+from llm import model as models
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
 
 template = """
 Question: {message}\n
@@ -17,6 +18,7 @@ prompt = ChatPromptTemplate.from_template(template)
 
 format_data_chain = (
       prompt
-    | gemini_chat_model
+    # Resolve the chat model at call time so importing this module loads nothing
+    | RunnableLambda(lambda prompt_value: models.gemini_chat_model.invoke(prompt_value))
     | StrOutputParser()
 )
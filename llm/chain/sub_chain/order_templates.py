@@ -0,0 +1,101 @@
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from llm.chain.sub_chain.product_router import ProductRoute
+
+# Minimum fuzzy score against RECEIVED_ORDER_PATTERNS before a template may answer
+ORDER_TEMPLATE_MIN_SCORE = int(os.getenv('ORDER_TEMPLATE_MIN_SCORE', '85'))
+
+# Same columns and joins get_dynamic_sql_prompt_order teaches the LLM, so the
+# response code reads the rows the same way whichever path produced them
+ORDER_SELECT = """
+SELECT o.*, i.product_id, c.color_id, col.name AS color_name, s.size_id, sz.name AS size_name, p.material, p.title, total_price, img.url AS product_image_url
+FROM lanyard_order o
+LEFT JOIN lanyard_order_items i ON o.id = i.order_id
+LEFT JOIN order_color c ON i.id = c.order_item_id
+LEFT JOIN color col ON c.color_id = col.id
+LEFT JOIN order_size s ON i.id = s.order_item_id
+LEFT JOIN size sz ON s.size_id = sz.id
+LEFT JOIN product p ON i.product_id = p.id
+LEFT JOIN product_images pi ON p.id = pi.product_id
+LEFT JOIN image img ON pi.image_id = img.id
+WHERE o.customer_id = %(customer_id)s"""
+
+# Read-only, fully parameterized; only bound values vary between customers and dates
+ORDER_TEMPLATES = {
+    "last_order": ORDER_SELECT + "\nORDER BY o.created_at DESC\nLIMIT 1;",
+    "first_order": ORDER_SELECT + "\nORDER BY o.created_at ASC\nLIMIT 1;",
+    "recent_orders": ORDER_SELECT + "\nORDER BY o.created_at DESC\nLIMIT 20;",
+    "order_by_id": ORDER_SELECT + "\nAND o.id = %(order_id)s;",
+    "orders_in_range": ORDER_SELECT + "\nAND o.created_at >= %(start)s AND o.created_at < %(end)s\nORDER BY o.created_at DESC;",
+}
+
+# The keywords are whole words, so "mid 2023" or "video 5" are not read as an order number
+ORDER_ID_PATTERN = re.compile(r"\border\b.*?(?:\b(?:number|no|id)\b\.?|#)\s*#?\s*(\d+)\b")
+FIRST_PATTERN = re.compile(r"\b(?:first|earliest|oldest)\b")
+LAST_PATTERN = re.compile(r"\b(?:last|latest|recent|most recent|newest|status)\b")
+PLURAL_PATTERN = re.compile(r"\borders\b")
+
+UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+RELATIVE_SPAN_PATTERN = re.compile(r"\b(?:last|past|previous)\s+(\d+|a|one|two|three|four|five|six|seven)?\s*(day|week|month|year)s?\b")
+WORD_NUMBERS = {"a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7}
+
+
+def parse_date_range(text: str, now: Optional[datetime] = None) -> Optional[Tuple[datetime, datetime]]:
+    """[start, end) for a relative date phrase in `text`, or None if there isn't one.
+
+    "last week" / "past 3 months" are rolling windows ending now, the same
+    reading as the order prompt's "NOW() - INTERVAL '7 days'"; "this week" and
+    "this month" start at the calendar boundary.
+    """
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if re.search(r"\btoday\b", text):
+        return today, now
+    if re.search(r"\byesterday\b", text):
+        return today - timedelta(days=1), today
+    if re.search(r"\bthis week\b", text):
+        return today - timedelta(days=today.weekday()), now
+    if re.search(r"\bthis month\b", text):
+        return today.replace(day=1), now
+    if re.search(r"\bthis year\b", text):
+        return today.replace(month=1, day=1), now
+    match = RELATIVE_SPAN_PATTERN.search(text)
+    if match:
+        count, unit = match.groups()
+        count = WORD_NUMBERS.get(count, None) or int(count or 1)
+        return now - timedelta(days=count * UNIT_DAYS[unit]), now
+    return None
+
+
+def match_order_template(route: ProductRoute, now: Optional[datetime] = None) -> Optional[Tuple[str, dict]]:
+    """(template name, bound parameters other than customer_id), or None to let the LLM write the SQL."""
+    if route.sql_template != "order":
+        return None
+    query = route.query
+
+    # An explicit order number is unambiguous even when the phrasing is unusual
+    order_id = ORDER_ID_PATTERN.search(query)
+    if order_id:
+        return "order_by_id", {"order_id": int(order_id.group(1))}
+    if route.scores.get("recent_order", 0) < ORDER_TEMPLATE_MIN_SCORE:
+        return None
+
+    date_range = parse_date_range(query, now)
+    if date_range:
+        return "orders_in_range", {"start": date_range[0], "end": date_range[1]}
+
+    wants_first = FIRST_PATTERN.search(query) is not None
+    wants_last = LAST_PATTERN.search(query) is not None
+    if wants_first and wants_last:
+        # "first and last order" and the like are left to the LLM
+        return None
+    if wants_first:
+        return "first_order", {}
+    if PLURAL_PATTERN.search(query):
+        return "recent_orders", {}
+    if wants_last:
+        return "last_order", {}
+    return None
@@ -1,14 +1,32 @@
+import asyncio
 import json
 import os
+from dataclasses import dataclass, field
+from typing import Any, Optional, Tuple
 # from llm.model import groq_mixtral_model
-from llm.model import gemini_generative_model
+from llm import model as models
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import chain
+from langchain_core.runnables import RunnableLambda
 from fuzzywuzzy import fuzz
 import re
 from llm.prompts.sql_prompt import sql_prompt
 from llm.schema.sql_query import SqlQuery
-from utils.execute_query import execute_query
+from utils.execute_query import aexecute_query, execute_query
+from utils.ttl_cache import TtlCache
+from utils import metrics, tracing
+from utils.logger import get_logger
+from llm.chain.sub_chain.order_templates import ORDER_TEMPLATES, match_order_template
+from llm.catalog.price_quotes import PriceQuoteEngine
+from llm.catalog.catalog_index import CatalogIndex
+from llm.chain.sub_chain.product_router import (
+    PRICE_CALCULATION_PATTERNS,
+    RECEIVED_ORDER_PATTERNS,
+    ProductRoute,
+    check_user_query_details,
+    route_product_query,
+)
+
+log = get_logger("product_chain")
 
 # Define the structured model for generating SQL queries
 # structured_model = gemini_generative_model.with_structured_output(SqlQuery)
@@ -1174,21 +1192,6 @@ def get_dynamic_sql_prompt_for_price_chart() -> str:
 
 
 
-PRICE_CALCULATION_PATTERNS = [
-    "calculate price for",
-    "what is the price for",
-    "what is the price of pone with attachment",
-    "price of lanyard",
-    "what is the price of nylon lanyard",
-    "what's the price of nylon lanyard",
-    "show me price for nylon lanyard",
-    "show me price of nylon lanyard",
-    "get me price for nylon lanyard",
-    "get me price of nylon lanyard",
-    "find price of nylon lanyard",
-    "find price for nylon lanyard",
-
-]
 QUANTITY_SYNONYMS = [r'quantity', r'count', r'number', r'amount', r'total']
 SIZE_SYNONYMS = [r'width', r'height', r'size', r'dimension', r'volume']
 ATTACHMENT_SYNONYMS = [r'attachment style', r'style', r'attachment']
@@ -1198,37 +1201,7 @@ MEASUREMENT_SYNONYMS = [r'measurement', r'size of', r'dimension of']
 def create_synonym_pattern(synonyms):
     return r'(' + '|'.join(synonyms) + r')\s*'
 
-def check_user_query_details(user_query: str) -> bool:
-    # Normalize the query to lower case
-    normalized_query = user_query.lower()
-
-    # Keywords to look for
-    keywords = {
-        "product_name": r"\b(?:product|item|pone)\b",  # Including 'pone' directly
-        "width": r"\b(?:width)\b",                     # Match 'width'
-        "attachment_style": r"\b(?:attachment|style|clip)\b",  # Match variations of 'attachment style'
-        "quantity": r"\b(?:quantity|amount|number|of\s+\d+)\b" # Match 'quantity' and numbers
-    }
-
-    # Check for each keyword in the normalized query
-    for key, pattern in keywords.items():
-        if not re.search(pattern, normalized_query):
-            return False  # Return false if any keyword is missing
-
-    # Check specifically for a numeric quantity presence
-    quantity_matches = re.search(r'\b\d+\b', normalized_query)
-    if not quantity_matches:
-        return False  # Return false if no numeric quantity found
-
-    return True
-
-# Create a ChatPromptTemplate with the dynamic user input
-def create_dynamic_sql_prompt(user_query: str, customer_id: str) -> ChatPromptTemplate:
-    
-    is_recent_order_query = any(fuzz.ratio(user_query, pattern) > 80 for pattern in RECEIVED_ORDER_PATTERNS)
-    is_price_calculation_query = any(fuzz.ratio(user_query, pattern) > 80 for pattern in PRICE_CALCULATION_PATTERNS)
 
-    
 REQUIRED_PATTERNS = {
     'attachment_style': ['attachment style', 'clip', 'style'],
     'width': ['width', 'size'],
@@ -1265,12 +1238,16 @@ def create_dynamic_user_price_response(user_query: str, title: str, price_chart:
         ("human", f"{user_query} | {title} | {price_chart} | {quantity} | {product_id}")
     ])
 
-def create_dynamic_sql_prompt(user_query: str, customer_id: str) -> ChatPromptTemplate:
-    is_recent_order_query = any(fuzz.ratio(user_query, pattern) > 80 for pattern in RECEIVED_ORDER_PATTERNS)
-    is_price_calculation_query = any(fuzz.ratio(user_query, pattern) > 80 for pattern in PRICE_CALCULATION_PATTERNS)
-    is_price_and_quantity_query = check_user_query_details(user_query)
+def create_dynamic_sql_prompt(user_query: str, customer_id: str, route: ProductRoute = None) -> ChatPromptTemplate:
+    # Reuse the caller's routing decision instead of re-running the fuzzy matching
+    if route is None:
+        route = route_product_query(user_query)
+    is_recent_order_query = route.is_recent_order
+    is_price_calculation_query = route.is_price_calculation
+    is_price_and_quantity_query = route.is_price_and_quantity
 
-    print(f"{is_price_calculation_query}check condition",is_price_and_quantity_query, is_recent_order_query)
+    log.debug("sql_prompt_route", query=user_query, price_calculation=is_price_calculation_query,
+              price_and_quantity=is_price_and_quantity_query, recent_order=is_recent_order_query)
     if is_price_calculation_query:
        dynamic_prompt = get_dynamic_sql_prompt_price()
        return ChatPromptTemplate.from_messages([
@@ -1303,196 +1280,334 @@ def create_dynamic_sql_prompt(user_query: str, customer_id: str) -> ChatPromptTe
     #     ("human", f"{user_query} | customer_id={customer_id}")
     # ])
 
-# Patterns to identify order-related queries
-RECEIVED_ORDER_PATTERNS = [
-    "show me my recent order",
-    "show me order",
-    "show me the last order",
-    "show me the first order",
-    "show me the recent order",
-    "show me my first order",
-    "show my recent orders",
-    "give me my latest order",
-    "display my last order",
-    "tell me about my last order",
-    "show me recent orders",
-    "show my orders",
-    "what is my last order",
-    "what i ordered last", "order price for", "price of the last order", "Show me the details of my order with number",
-    "Show me the details of my order with id",
-    "show me the order details of",
-    "price of my last order", "what is the price of the last order",
-    "price of my first order", "what is the price of the first order",
-    "show me orders from last week.", "show me orders from this week.",
-    "show me order status", "what is my order status", "what is the status of my last order", "what is the status of my order",
-    "show the status of my order", "show the status of last order", "what's status of order"
-]
 
-# Define the chain that processes the input, generates the query, and returns results
-@chain
-def product_chain(x):
-    user_query = x.get("message", "").strip().lower()
-    customer_id = x.get("customer_id", "")
+# Generated SQL keyed by (template, normalized query). Only SQL that returned rows is cached.
+sql_cache = TtlCache(
+    "product_sql",
+    max_size=int(os.getenv('SQL_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('SQL_CACHE_TTL', '3600')),
+    path=os.getenv('SQL_CACHE_PATH') or None,
+)
+# Responses for questions whose SQL was empty, failed or found nothing; kept briefly and
+# per customer, since one customer having no orders says nothing about another
+sql_negative_cache = TtlCache(
+    "product_sql_negative",
+    max_size=int(os.getenv('SQL_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('SQL_NEGATIVE_CACHE_TTL', '60')),
+)
+
+product_sql_source_total = metrics.counter(
+    "product_sql_source_total", "Where product_chain got its answer: order template, price quotes, catalog, SQL cache or llm")
+
+def record_source(source: str, **labels) -> None:
+    product_sql_source_total.inc(source=source, **labels)
+    # The answer source is the request's route label in the stage timings
+    tracing.set_labels(route=source)
+
+# Price tiers parsed once and searched in-process; re-read when product_price_chart changes
+price_quotes = PriceQuoteEngine(execute_query, check_interval=float(os.getenv('PRICE_QUOTES_CHECK_SECONDS', '60')))
+
+# Product rows with text and numeric indexes, so "show me nylon lanyards" needs no ILIKE scan
+catalog_index = CatalogIndex(execute_query, check_interval=float(os.getenv('CATALOG_CHECK_SECONDS', '60')))
+
+@tracing.traced("catalog_lookup")
+def search_catalog(route: ProductRoute):
+    """Rows for a simple product lookup, or None to fall back to SQL."""
+    if route.sql_template != "product":
+        return None
+    try:
+        return catalog_index.search(route.query)
+    except Exception as e:
+        log.warning("catalog_lookup_failed", query=route.query, error=str(e))
+        return None
 
-    greetings = ["hi", "hello", "hey", "greetings", "what's up", "howdy"]
-    if any(greet in user_query for greet in greetings):
+@tracing.traced("price_quote")
+def quote_price(route: ProductRoute):
+    """Quote a fully specified price question from the snapshot, or None to fall back to SQL."""
+    try:
+        return price_quotes.quote_from_query(route.query)
+    except Exception as e:
+        log.warning("price_quote_failed", query=route.query, error=str(e))
+        return None
+
+# The LLM writes this in place of the real customer id, so one SQL shape serves every customer
+CUSTOMER_ID_PLACEHOLDER = "__customer_id__"
+CUSTOMER_ID_LITERAL = re.compile(r"'?" + CUSTOMER_ID_PLACEHOLDER + r"'?")
+
+def bind_customer_id(sql_query: str) -> str:
+    """Turn the placeholder into a psycopg2 named parameter; literal % must be doubled first."""
+    return CUSTOMER_ID_LITERAL.sub("%(customer_id)s", sql_query.replace("%", "%%"))
+
+def sql_generation_chain(route: ProductRoute):
+    sql_prompt_template = create_dynamic_sql_prompt(route.query, CUSTOMER_ID_PLACEHOLDER, route)
+    # Combine the dynamic prompt with the structured model for SQL generation
+    sql_chain = sql_prompt_template | models.gemini_generative_model
+    return sql_chain, {"text": route.query, "user_query": route.query, "customer_id": CUSTOMER_ID_PLACEHOLDER}
+
+def clean_generated_sql(result: str) -> str:
+    log.debug("sql_generated", sql=result)
+    # Clean the query by removing backticks
+    sql_query = result.replace("```sql", "").replace("```", "").strip()
+    return bind_customer_id(sql_query) if sql_query else ""
+
+@tracing.traced("sql_generation")
+def generate_sql(route: ProductRoute) -> str:
+    sql_chain, inputs = sql_generation_chain(route)
+    return clean_generated_sql(sql_chain.invoke(input=inputs))
+
+@tracing.traced("sql_generation")
+async def agenerate_sql(route: ProductRoute) -> str:
+    sql_chain, inputs = sql_generation_chain(route)
+    return clean_generated_sql(await sql_chain.ainvoke(input=inputs))
+
+PRODUCT_ERROR_RESPONSE = "Sorry, there was an error processing your query."
+
+@dataclass
+class ProductPlan:
+    """What product_chain will do for one message, decided without any LLM or SQL round trip.
+
+    `response` is set when the answer is already known (greeting, price quote,
+    cached failure). Otherwise the rows come from `catalog_rows`, or from
+    `sql_query`, which is None until the LLM has written it.
+    """
+    route: ProductRoute
+    customer_id: str
+    response: Any = None
+    sql_query: Optional[str] = None
+    sql_params: dict = field(default_factory=dict)
+    catalog_rows: Optional[list] = None
+    template: Optional[Tuple[str, dict]] = None
+
+    @property
+    def sql_key(self):
+        return (self.route.sql_template, self.route.query)
+
+    @property
+    def negative_key(self):
+        return (self.route.sql_template, self.route.query, self.customer_id if self.route.sql_template == "order" else None)
+
+    @property
+    def needs_sql(self) -> bool:
+        return self.response is None and self.catalog_rows is None and self.sql_query is None
+
+    @property
+    def has_query(self) -> bool:
+        return self.catalog_rows is not None or bool(self.sql_query)
+
+def plan_product_query(x) -> ProductPlan:
+    # Normalize and score the query once; every step below reuses the route
+    route = route_product_query(x.get("message", ""))
+    plan = ProductPlan(route=route, customer_id=x.get("customer_id", ""))
+
+    if route.is_greeting:
+        tracing.set_labels(route="greeting")
         # return "Hello! How can I assist you today?"
-        return {
+        plan.response = {
                           "message": f"Hello! How can I assist you today?",
                           "link": None,
                           "image": None,
                           "type":"TEXT"
                             }
+        return plan
+
+    if route.sql_template == "price_quantity":
+        quote = quote_price(route)
+        if quote:
+            record_source("price_quotes")
+            plan.response = {
+                "message": f"The price for the product Matching your criteria is {quote.price:.2f}",
+                "link": None,
+                "image": None,
+                "type":"PRODUCT"
+            }
+            return plan
+
+    cached_failure = sql_negative_cache.get(plan.negative_key)
+    if cached_failure is not None:
+        plan.response = cached_failure
+        return plan
 
-    is_recent_order_query = any(fuzz.ratio(user_query, pattern) > 80 for pattern in RECEIVED_ORDER_PATTERNS)
-    # Create the dynamic SQL prompt template based on the user query
-    sql_prompt_template = create_dynamic_sql_prompt(user_query, customer_id)
-    
-    # Combine the dynamic prompt with the structured model for SQL generation
-    sql_chain = sql_prompt_template | gemini_generative_model
-    
     try:
-        # Generate the SQL query with user_query
-        result = sql_chain.invoke(input={"text": user_query, "user_query": user_query, "customer_id": customer_id})
-        print(f"Chain Result: {result}")
-
-        # Convert the result into JSON and extract the SQL query
-        # query = json.loads(result.json())
-        # print(f"Generated SQL Query: {query.get('query')}")
-        is_price_calculation_query = any(fuzz.ratio(user_query, pattern) > 80 for pattern in PRICE_CALCULATION_PATTERNS)
-        is_price_and_quantity_query = check_user_query_details(user_query)
-
-        # Ensure the query is not None or empty
-        # sql_query = query.get("query")
-        sql_query = result.replace("```sql", "").replace("```", "").strip() # Clean the query by removing backticks
-        if sql_query:
-            # Execute the generated SQL query and return the result
-            query_result = execute_query(sql_query)
-            print(f"Query Result: {query_result}and{is_price_calculation_query}")
-            
-            # Analyze user query to determine the context of the response
-            if query_result :
-                if is_recent_order_query:
-                    # Prepare the response format for recent orders
-                    if query_result:
-                        recent_order = query_result[0]
-                        title = recent_order['title'].replace(" ","")
-                        order_id = recent_order['id']
-                        product_id = recent_order["product_id"]
-                        status = recent_order["status"]
-                        material = recent_order['material']
-                        color = recent_order['color_name']
-                        total_price = recent_order['total_price']
-                        product_image_url = recent_order['product_image_url']
-                        order_link = f"{os.getenv('DOMAIN_FE')}/pages/product-view?orderId={order_id}"
-                        link = f"{os.getenv('DOMAIN_FE')}/product-details/{product_id}-{title}"
-                        response_prompt_template = create_dynamic_user_response(user_query, title, order_id, total_price, status, product_id)
-                        response_chain = response_prompt_template | gemini_generative_model
-                        user_result = response_chain.invoke(input={"text": user_query, "title": title, "order_id": order_id, "total_price": total_price, "status": status, "product_id": product_id})
-                        print(f"recent_order response: {recent_order} ")
-                        # response_message = f"Hey, your recent order is {title}, with material: {material}, color: {color}, image: {product_image_url}. Here is where you can see more: {link}"
-                        response_message = {
-                          # "message": f"Hey, your recent order is {title}, of id: #{order_id}, total price: {total_price}",
-                          "message": f"{user_result}",
-                          "link": order_link,
-                          "image": product_image_url,
-                          "type":"ORDER"
-                            }
-                    else:
-                        response_message = {
-                           "message": "Sorry, no recent orders found.",
-                           "link": None,
-                           "image": None,
-                           "type":"TEXT"
-                          }
-                elif is_price_calculation_query:
-                    # Price calculation handling code
-                    if query_result:
-                        product_info = query_result[0]
-                        price_chart = product_info['price_chart'][0]
-                        title = product_info['title']
-                        product_id = product_info['id']
-                        product_image=product_info['url']
-                        response_prompt_template = create_dynamic_user_price_response(user_query, title, price_chart['price'], price_chart['quantity'], product_id)
-                        response_chain = response_prompt_template | gemini_generative_model
-                        user_result = response_chain.invoke(input={"text": user_query, "title": title, "price_chart": price_chart['price'], "quantity":  price_chart['quantity'], "product_id": product_id})
-                        print(f"user response: {user_result} ")
-                        response_message = {
-                            "message": f"{user_result}",
-                            "link": None,
-                            "image": product_image,
-                            "type": "PRICE"
-                        }
-                elif is_price_and_quantity_query:
-                     print(f"inside resp gen")
-                     response = query_result[0]
-                     price = response['price']
-                     response_message = {
-                          "message": f"The price for the product Matching your criteria is {price}",
-                          "link": None,
-                          "image": None,
-                          "type":"PRODUCT"
-                            }
-                else:
-                    if query_result:
-                        base_url = os.getenv("BASE_URL")
-                        recent_order = query_result[0]
-                        title = recent_order['title'].replace(" ","")
-                        product_id = recent_order["id"]
-                        # material = recent_order['material']
-                        # color = recent_order['color_name']
-                        product_image_url = recent_order['url']
-                        link = f"{os.getenv('DOMAIN_FE')}/product-details/{product_id}-{title}"
-                        response_prompt_template = create_dynamic_user_product_response(user_query, title, product_id)
-                        response_chain = response_prompt_template | gemini_generative_model
-                        user_result = response_chain.invoke(input={"text": user_query, "title": title, "product_id": product_id})
-                        print(f"user response: {user_result} ")
-                        # response_message = f"Hey, your recent order is {title}, with material: {material}, color: {color}, image: {product_image_url}. Here is where you can see more: {link}"
-                        response_message = {
-                          "message": f"{user_result}",
-                          "link": link,
-                          "image": product_image_url,
-                          "type":"PRODUCT"
-                            }
-                    # product_links = list({
-                    #     f"http://ec2-44-202-158-140.compute-1.amazonaws.com:3000/product-details/{product['id']}"
-                    #     for product in query_result if 'id' in product
-                    # })
-                    # response_message = f"Here are the products matching your criteria: {', '.join(product_links)}"
-                    else:
-                        response_message = {
-                           "message": "Sorry, no recent orders found.",
-                           "link": None,
-                           "image": None,
-                           "type":"TEXT"
-                          }
-            else:
-                response_message = "Sorry, no results found based on your query."
+        plan.sql_params = {"customer_id": plan.customer_id}
+        # Common order questions run a hand-written template; no LLM call at all
+        plan.template = match_order_template(route)
+        # Simple catalog lookups are answered from the in-memory index, with the same row shape
+        plan.catalog_rows = search_catalog(route)
+        if plan.catalog_rows is not None:
+            record_source("catalog")
+        elif plan.template:
+            template_name, template_params = plan.template
+            plan.sql_query = ORDER_TEMPLATES[template_name]
+            plan.sql_params.update(template_params)
+            record_source("template", template=template_name)
         else:
-            response_message = "Generated query was empty or invalid."
-    
-    except Exception as e:
-        print(f"Error executing query: {e}")
-        response_message = "Sorry, there was an error processing your query."
-    
-    # Create the final response structure
-    return response_message
-
-# Example Input for product query
-input_data_product = {
-    "message": "show me product with width more than 10"
-}
-
-# Example Input for order query
-input_data_order = {
-    "message": "what is my last order",
-    "customer_id": "12345"  # Example customer_id
-}
-
-# Run the chain with the input and get the result for products
-result_product = product_chain.invoke(input_data_product)
-print(f"Product Query Result: {result_product}")
+            # Reuse SQL generated for the same question earlier, for any customer
+            plan.sql_query = sql_cache.get(plan.sql_key)
+            if plan.sql_query is None:
+                record_source("llm")
+            else:
+                record_source("cache")
+    except Exception:
+        log.exception("product_plan_failed", query=route.query)
+        plan.response = PRODUCT_ERROR_RESPONSE
+    return plan
+
+def prepare_response(plan: ProductPlan, query_result):
+    """(response, prompt, inputs). When prompt is set, its LLM output becomes response["message"]."""
+    route = plan.route
+    user_query = route.query
+    if not plan.has_query:
+        response_message = "Generated query was empty or invalid."
+        sql_negative_cache.set(plan.negative_key, response_message)
+        return response_message, None, None
+
+    # Rows are clipped to the first few by the logger; sample further with LOG_SAMPLE_RATES=query_result=...
+    log.debug("query_result", query=user_query, rows=query_result,
+              row_count=len(query_result) if query_result else 0, price_calculation=route.is_price_calculation)
+    # Analyze user query to determine the context of the response
+    if not query_result:
+        response_message = "Sorry, no results found based on your query."
+        sql_negative_cache.set(plan.negative_key, response_message)
+        return response_message, None, None
+
+    if plan.sql_query and not plan.template:
+        sql_cache.set(plan.sql_key, plan.sql_query)
+
+    if route.is_recent_order:
+        # Prepare the response format for recent orders
+        recent_order = query_result[0]
+        title = recent_order['title'].replace(" ","")
+        order_id = recent_order['id']
+        product_id = recent_order["product_id"]
+        status = recent_order["status"]
+        total_price = recent_order['total_price']
+        product_image_url = recent_order['product_image_url']
+        order_link = f"{os.getenv('DOMAIN_FE')}/pages/product-view?orderId={order_id}"
+        log.debug("recent_order", order=recent_order)
+        response_prompt_template = create_dynamic_user_response(user_query, title, order_id, total_price, status, product_id)
+        inputs = {"text": user_query, "title": title, "order_id": order_id, "total_price": total_price, "status": status, "product_id": product_id}
+        return {
+            "message": None,
+            "link": order_link,
+            "image": product_image_url,
+            "type":"ORDER"
+        }, response_prompt_template, inputs
+
+    if route.is_price_calculation:
+        # Price calculation handling code
+        product_info = query_result[0]
+        price_chart = product_info['price_chart'][0]
+        title = product_info['title']
+        product_id = product_info['id']
+        product_image=product_info['url']
+        response_prompt_template = create_dynamic_user_price_response(user_query, title, price_chart['price'], price_chart['quantity'], product_id)
+        inputs = {"text": user_query, "title": title, "price_chart": price_chart['price'], "quantity":  price_chart['quantity'], "product_id": product_id}
+        return {
+            "message": None,
+            "link": None,
+            "image": product_image,
+            "type": "PRICE"
+        }, response_prompt_template, inputs
+
+    if route.is_price_and_quantity:
+        price = query_result[0]['price']
+        return {
+            "message": f"The price for the product Matching your criteria is {price}",
+            "link": None,
+            "image": None,
+            "type":"PRODUCT"
+        }, None, None
+
+    product = query_result[0]
+    title = product['title'].replace(" ","")
+    product_id = product["id"]
+    product_image_url = product['url']
+    link = f"{os.getenv('DOMAIN_FE')}/product-details/{product_id}-{title}"
+    response_prompt_template = create_dynamic_user_product_response(user_query, title, product_id)
+    inputs = {"text": user_query, "title": title, "product_id": product_id}
+    return {
+        "message": None,
+        "link": link,
+        "image": product_image_url,
+        "type":"PRODUCT"
+    }, response_prompt_template, inputs
+
+def run_product_query(x):
+    plan = plan_product_query(x)
+    if plan.response is not None:
+        return plan.response
+    try:
+        if plan.needs_sql:
+            plan.sql_query = generate_sql(plan.route)
+        query_result = None
+        if plan.has_query:
+            # Execute the generated SQL query and return the result
+            query_result = plan.catalog_rows if plan.catalog_rows is not None else execute_query(plan.sql_query, plan.sql_params)
+        response_message, prompt, inputs = prepare_response(plan, query_result)
+        if prompt is not None:
+            with tracing.span("response_generation"):
+                user_result = (prompt | models.gemini_generative_model).invoke(input=inputs)
+            log.debug("response_generated", response=user_result)
+            response_message["message"] = f"{user_result}"
+        return response_message
+    except Exception:
+        log.exception("product_query_failed", query=plan.route.query)
+        return PRODUCT_ERROR_RESPONSE
+
+async def aquery_rows(plan: ProductPlan):
+    if plan.needs_sql:
+        plan.sql_query = await agenerate_sql(plan.route)
+    if not plan.has_query:
+        return None
+    if plan.catalog_rows is not None:
+        return plan.catalog_rows
+    return await aexecute_query(plan.sql_query, plan.sql_params)
+
+async def arun_product_query(x):
+    # Routing and snapshot lookups are short CPU work (plus the odd snapshot refresh), so they
+    # borrow a thread briefly; the LLM and Postgres round trips below are awaited natively
+    plan = await asyncio.to_thread(plan_product_query, x)
+    if plan.response is not None:
+        return plan.response
+    try:
+        query_result = await aquery_rows(plan)
+        response_message, prompt, inputs = prepare_response(plan, query_result)
+        if prompt is not None:
+            with tracing.span("response_generation"):
+                user_result = await (prompt | models.gemini_generative_model).ainvoke(input=inputs)
+            log.debug("response_generated", response=user_result)
+            response_message["message"] = f"{user_result}"
+        return response_message
+    except Exception:
+        log.exception("product_query_failed", query=plan.route.query)
+        return PRODUCT_ERROR_RESPONSE
+
+async def astream_product_query(x):
+    """Async generator of (event, data) for one product message.
+
+    ("metadata", {link, image, type}) comes as soon as the rows are known, then
+    ("token", text) for each chunk of the generated sentence, and always a final
+    ("response", ...) holding exactly what product_chain would have returned.
+    """
+    plan = await asyncio.to_thread(plan_product_query, x)
+    if plan.response is None:
+        try:
+            query_result = await aquery_rows(plan)
+            response_message, prompt, inputs = prepare_response(plan, query_result)
+            if prompt is not None:
+                yield "metadata", {key: value for key, value in response_message.items() if key != "message"}
+                chunks = []
+                with tracing.span("response_generation"):
+                    async for chunk in (prompt | models.gemini_generative_model).astream(input=inputs):
+                        chunks.append(chunk)
+                        yield "token", chunk
+                response_message["message"] = "".join(chunks)
+                log.debug("response_generated", response=response_message["message"])
+            plan.response = response_message
+        except Exception:
+            log.exception("product_query_failed", query=plan.route.query)
+            plan.response = PRODUCT_ERROR_RESPONSE
+    yield "response", plan.response
 
-# Run the chain with the input and get the result for orders
-result_order = product_chain.invoke(input_data_order)
-print(f"Order Query Result: {result_order}")
+# Define the chain that processes the input, generates the query, and returns results
+product_chain = RunnableLambda(run_product_query, afunc=arun_product_query, name="product_chain")
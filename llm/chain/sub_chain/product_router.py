@@ -0,0 +1,158 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+from fuzzywuzzy import fuzz
+
+# A pattern list matches when fuzz.ratio against any of its patterns is above this
+FUZZY_MATCH_THRESHOLD = 80
+
+GREETINGS = ["hi", "hello", "hey", "greetings", "what's up", "howdy"]
+# Whole words only, so "shipping" or "they" are not greetings
+GREETING_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(greeting) for greeting in GREETINGS) + r")\b")
+
+PRICE_CALCULATION_PATTERNS = [
+    "calculate price for",
+    "what is the price for",
+    "what is the price of pone with attachment",
+    "price of lanyard",
+    "what is the price of nylon lanyard",
+    "what's the price of nylon lanyard",
+    "show me price for nylon lanyard",
+    "show me price of nylon lanyard",
+    "get me price for nylon lanyard",
+    "get me price of nylon lanyard",
+    "find price of nylon lanyard",
+    "find price for nylon lanyard",
+
+]
+
+# Patterns to identify order-related queries
+RECEIVED_ORDER_PATTERNS = [
+    "show me my recent order",
+    "show me order",
+    "show me the last order",
+    "show me the first order",
+    "show me the recent order",
+    "show me my first order",
+    "show my recent orders",
+    "give me my latest order",
+    "display my last order",
+    "tell me about my last order",
+    "show me recent orders",
+    "show my orders",
+    "what is my last order",
+    "what i ordered last", "order price for", "price of the last order", "Show me the details of my order with number",
+    "Show me the details of my order with id",
+    "show me the order details of",
+    "price of my last order", "what is the price of the last order",
+    "price of my first order", "what is the price of the first order",
+    "show me orders from last week.", "show me orders from this week.",
+    "show me order status", "what is my order status", "what is the status of my last order", "what is the status of my order",
+    "show the status of my order", "show the status of last order", "what's status of order"
+]
+
+# Keywords a price-by-quantity query must contain
+QUERY_DETAIL_PATTERNS = {
+    "product_name": re.compile(r"\b(?:product|item|pone)\b"),  # Including 'pone' directly
+    "width": re.compile(r"\b(?:width)\b"),                     # Match 'width'
+    "attachment_style": re.compile(r"\b(?:attachment|style|clip)\b"),  # Match variations of 'attachment style'
+    "quantity": re.compile(r"\b(?:quantity|amount|number|of\s+\d+)\b"),  # Match 'quantity' and numbers
+}
+NUMBER_PATTERN = re.compile(r'\b\d+\b')
+
+
+def check_user_query_details(user_query: str) -> bool:
+    normalized_query = user_query.lower()
+    # Every keyword plus a numeric quantity has to be present
+    if not all(pattern.search(normalized_query) for pattern in QUERY_DETAIL_PATTERNS.values()):
+        return False
+    return NUMBER_PATTERN.search(normalized_query) is not None
+
+
+class FuzzyPatternMatcher:
+    """Answers "does any pattern in each list fuzz.ratio-match the query?" in one pass.
+
+    fuzz.ratio is 2*M/(len(a)+len(b)) with M <= min(len(a), len(b)), so the
+    length bound is computed for every pattern at once with numpy. Patterns
+    whose bound cannot beat the threshold are never scored, the rest are
+    scored best-bound first, and a list stops being scored at its first match.
+    """
+
+    def __init__(self, pattern_lists: Dict[str, List[str]], threshold: int = FUZZY_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.names = list(pattern_lists)
+        self.patterns = [pattern for patterns in pattern_lists.values() for pattern in patterns]
+        self.groups = np.array([group for group, patterns in enumerate(pattern_lists.values()) for _ in patterns])
+        self.lengths = np.array([len(pattern) for pattern in self.patterns])
+
+    def match(self, query: str) -> Dict[str, int]:
+        """Best score found per list: a matching score, or the highest score seen if none matched."""
+        scores = {name: 0 for name in self.names}
+        query_length = len(query)
+        total = query_length + self.lengths
+        bounds = np.round(100 * 2 * np.minimum(query_length, self.lengths) / np.maximum(total, 1))
+        candidates = np.flatnonzero(bounds > self.threshold)
+        matched = set()
+        for i in candidates[np.argsort(-bounds[candidates], kind="stable")]:
+            group = self.groups[i]
+            if group in matched:
+                continue
+            score = fuzz.ratio(query, self.patterns[i])
+            name = self.names[group]
+            if score > scores[name]:
+                scores[name] = score
+            if score > self.threshold:
+                matched.add(group)
+                if len(matched) == len(self.names):
+                    break
+        return scores
+
+
+pattern_matcher = FuzzyPatternMatcher({
+    "recent_order": RECEIVED_ORDER_PATTERNS,
+    "price_calculation": PRICE_CALCULATION_PATTERNS,
+})
+
+
+@dataclass(frozen=True)
+class ProductRoute:
+    """Everything product_chain needs to know about a query, computed once."""
+    query: str
+    is_greeting: bool
+    is_recent_order: bool = False
+    is_price_calculation: bool = False
+    is_price_and_quantity: bool = False
+    scores: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def sql_template(self) -> str:
+        """Which SQL prompt handles this query, in create_dynamic_sql_prompt's order of precedence."""
+        if self.is_price_calculation:
+            return "price"
+        if self.is_price_and_quantity:
+            return "price_quantity"
+        if self.is_recent_order:
+            return "order"
+        return "product"
+
+
+def normalize_query(user_query: str) -> str:
+    return ' '.join(user_query.lower().strip().split())
+
+
+def route_product_query(user_query: str) -> ProductRoute:
+    query = normalize_query(user_query)
+    if GREETING_PATTERN.search(query):
+        # Greetings get a canned reply, so skip the pattern matching
+        return ProductRoute(query=query, is_greeting=True)
+    scores = pattern_matcher.match(query)
+    return ProductRoute(
+        query=query,
+        is_greeting=False,
+        is_recent_order=scores["recent_order"] > pattern_matcher.threshold,
+        is_price_calculation=scores["price_calculation"] > pattern_matcher.threshold,
+        is_price_and_quantity=check_user_query_details(query),
+        scores=scores,
+    )
@@ -1,26 +1,28 @@
+import asyncio
 import json
-from typing import Union, Dict, Any
-from langchain_core.runnables import RunnablePassthrough, RunnableParallel
-from llm.model import gemini_chat_model
-from langchain_core.runnables import chain
+from typing import List, Optional, Union, Dict, Any
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough, RunnableParallel
 from llm.chain.sub_chain.chat_chain import chat_chain
-from llm.chain.sub_chain.product_chain import product_chain
+from llm.chain.sub_chain.product_chain import astream_product_query, product_chain
 from llm.schema.query_type import QueryType
 from llm.prompts.query_type import query_prompt
 from langchain_core.prompts import PromptTemplate
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import GoogleGenerativeAI
-from llm.model import gemini_generative_model
+from llm import model as models
+from llm.model import model_registry
+from llm.intent_classifier import IntentClassifier, load_examples, parse_prompt_examples
+from llm.chain.sub_chain.default_chain import embed_sentence
+from utils import metrics, tracing
+from utils.logger import get_logger
 import os
 
-# Define the prediction chain
-predict_chain = query_prompt | gemini_chat_model.with_structured_output(QueryType)
+log = get_logger("understand_chain")
+
 # Available chains dictionary
 chains = {
     "faq": chat_chain
 }
 
-llm = GoogleGenerativeAI(model="gemini-pro", temperature=0)
 def get_dynamic_sql_prompt() -> str:
     system_instructions = """
     Type of messages:
@@ -73,69 +75,191 @@ def create_dynamic_sql_prompt(user_query: str) -> ChatPromptTemplate:
 
 # classify_chain = classify_dynamic_prompt | gemini_generative_model
 
+# Extra labelled messages for the local classifier; append misrouted messages here
+INTENT_EXAMPLES_PATH = os.getenv(
+    'INTENT_EXAMPLES_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'intent_examples.jsonl'))
+# Below this confidence the message goes to the LLM classifier instead
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv('INTENT_CONFIDENCE_THRESHOLD', '0.8'))
+LOCAL_INTENT_CLASSIFIER = os.getenv('LOCAL_INTENT_CLASSIFIER', '1') != '0'
+
+intent_classification_total = metrics.counter(
+    "intent_classification_total", "Classified messages by source (local or llm) and label")
+
+# Trained from the prompt's own examples plus the training file, on first use or warm-up
+def load_intent_classifier():
+    examples = parse_prompt_examples(get_dynamic_sql_prompt()) + load_examples(INTENT_EXAMPLES_PATH)
+    return IntentClassifier(embed_sentence, examples)
+
+model_registry.register("intent_classifier", load_intent_classifier, warmup=lambda classifier: classifier.predict("hello"))
+
+def llm_classify(user_query: str) -> str:
+    classify_dynamic_prompt = create_dynamic_sql_prompt(user_query)
+    classify_chain = classify_dynamic_prompt | models.gemini_generative_model
+    return classify_chain.invoke(input={"user_query": user_query}).strip()
+
+async def allm_classify(user_query: str) -> str:
+    classify_dynamic_prompt = create_dynamic_sql_prompt(user_query)
+    classify_chain = classify_dynamic_prompt | models.gemini_generative_model
+    return (await classify_chain.ainvoke(input={"user_query": user_query})).strip()
+
+# The local classifier's label, or None when it is unsure (or disabled)
+def local_classify(user_query: str) -> Optional[str]:
+    if not LOCAL_INTENT_CLASSIFIER:
+        return None
+    label, confidence = model_registry.get("intent_classifier").predict(user_query)
+    if confidence >= INTENT_CONFIDENCE_THRESHOLD:
+        intent_classification_total.inc(source="local", label=label)
+        return label
+    return None
+
+# Local nearest-centroid classifier first; the LLM only sees messages it is unsure about
+@tracing.traced("classification")
+def classify_query(user_query: str) -> str:
+    label = local_classify(user_query)
+    if label is not None:
+        return label
+    classification = llm_classify(user_query)
+    intent_classification_total.inc(source="llm", label=classification)
+    return classification
+
+def classify_queries(user_queries: List[str], max_concurrency: Optional[int] = None) -> List[Optional[str]]:
+    """classify_query for many messages: one batched local pass, then concurrent LLM calls
+    for the uncertain ones. None where the LLM call failed, so the caller can retry per message."""
+    labels: List[Optional[str]] = [None] * len(user_queries)
+    if LOCAL_INTENT_CLASSIFIER and user_queries:
+        predictions = model_registry.get("intent_classifier").predict_batch(user_queries)
+        for i, (label, confidence) in enumerate(predictions):
+            if confidence >= INTENT_CONFIDENCE_THRESHOLD:
+                labels[i] = label
+                intent_classification_total.inc(source="local", label=label)
+    uncertain = [i for i, label in enumerate(labels) if label is None]
+    if uncertain:
+        prompts = [create_dynamic_sql_prompt(user_queries[i]).invoke({"user_query": user_queries[i]}) for i in uncertain]
+        outputs = models.gemini_generative_model.batch(
+            prompts, config={"max_concurrency": max_concurrency}, return_exceptions=True)
+        for i, output in zip(uncertain, outputs):
+            if isinstance(output, Exception):
+                log.warning("batch_classification_failed", query=user_queries[i], error=str(output))
+                continue
+            labels[i] = output.strip()
+            intent_classification_total.inc(source="llm", label=labels[i])
+    return labels
+
+@tracing.traced("classification")
+async def aclassify_query(user_query: str) -> str:
+    # Embedding the message is CPU work; only the LLM fallback is awaited natively
+    label = await asyncio.to_thread(local_classify, user_query)
+    if label is not None:
+        return label
+    classification = await allm_classify(user_query)
+    intent_classification_total.inc(source="llm", label=classification)
+    return classification
+
 # Initialize session store if needed for session-specific data
 session_store = {}
 
-@chain
-def decision_chain(x: Dict[str, Any]) -> Union[Dict[str, Any], None]:
+def faq_decision(result) -> Dict[str, Any]:
+    faq = result.get("context").get("faq", "No relevant FAQ found.")  # Run only product_chain
+    faq_link = os.getenv('DOMAIN_FE').strip().rstrip('/')
+    # Directly return the result
+    if faq.get("has_answer") == True:
+        return {
+            "type": "TEXT",
+            "message": faq.get("message", "No relevant FAQ found."),
+            "has_answer": faq.get("has_answer",False),
+            "link": ""
+        }
+    return {
+            "type": "TEXT",
+            "message": ("I'm sorry, I don’t have that info right now."),
+            "has_answer": faq.get("has_answer",False),
+            "link": faq_link.rstrip('/')+"#faqSection"
+        }
+
+def product_decision(result) -> Dict[str, Any]:
+    log.debug("product_chain_result", result=result)
+    if isinstance(result, dict):
+        return {
+            "type": "PRODUCT",
+            "message": result.get("message", "No relevant Product found."),
+            "has_answer": result.get("has_answer",False),
+            "image": result.get("image", ""),
+            "link": result.get("link", "")
+        }
+    return {
+             "type": "PRODUCT",
+            "message": ("Sorry! couldn't find the product you're looking for, please checkout our product page from below link."),
+            "has_answer": False,
+            "image": "",
+            "link": f"{os.getenv('DOMAIN_FE')}/collections/no-sidebar"
+        }
+
+def greeting_decision() -> Dict[str, Any]:
+    return {
+        "message": f"Hello! How can I assist you today?",
+        "link": None,
+        "image": None,
+        "type":"TEXT"
+        }
+
+def decide(x: Dict[str, Any]) -> Union[Dict[str, Any], None]:
     try:
         # Extract and sanitize user query
         user_query = x.get("message", "").strip().lower()
-        classify_dynamic_prompt = create_dynamic_sql_prompt(user_query)
-        classify_chain = classify_dynamic_prompt | gemini_generative_model
-        classification = classify_chain.invoke(input={"user_query": user_query})
-        print("Received query and classification:", user_query, classification)  # Debugging input query
+        # Batch runs classify every message up front and pass the label along
+        classification = x.get("classification") or classify_query(user_query)
+        log.info("classified", query=user_query, classification=classification)
+        tracing.set_labels(intent=classification)
 
-        # Check if query starts with "need" to decide which chain to run
         if classification == "FAQ":
-            print("Running FAQ chain only")  # Log specific chain use
-            result = chat_chain.invoke(x)
-            faq = result.get("context").get("faq", "No relevant FAQ found.")  # Run only product_chain
-            faq_link = os.getenv('DOMAIN_FE').strip().rstrip('/')
-            # Directly return the result
-            if faq.get("has_answer") == True:
-                return {
-                    "type": "TEXT",
-                    "message": faq.get("message", "No relevant FAQ found."),
-                    "has_answer": faq.get("has_answer",False),
-                    "link": ""
-                }
-            return {
-                    "type": "TEXT",
-                    "message": ("I'm sorry, I don’t have that info right now."),
-                    "has_answer": faq.get("has_answer",False),
-                    "link": faq_link.rstrip('/')+"#faqSection"
-                }
+            return faq_decision(chat_chain.invoke(x))
         elif classification == "Product":
-            print("Running Product chain")  # Log product chain execution
-            result = product_chain.invoke(x)  # Instantiate and invoke product_chain
-            print("result Product chain", result)
-            if isinstance(result, dict):
-                return {
-                    "type": "PRODUCT",
-                    "message": result.get("message", "No relevant Product found."),
-                    "has_answer": result.get("has_answer",False),
-                    "image": result.get("image", ""),
-                    "link": result.get("link", "")
-                }
-            return {
-                     "type": "PRODUCT",
-                    "message": ("Sorry! couldn't find the product you're looking for, please checkout our product page from below link."),
-                    "has_answer": False,
-                    "image": "",
-                    "link": f"{os.getenv('DOMAIN_FE')}/collections/no-sidebar"
-                }
-        else :
-            return {
-                "message": f"Hello! How can I assist you today?",
-                "link": None,
-                "image": None,
-                "type":"TEXT"
-                }
-
-        print("Result:", result)  # Output the result for debugging
-        return None
+            return product_decision(product_chain.invoke(x))
+        return greeting_decision()
 
-    except Exception as e:
-        print("Error in decision_chain:", e)  # Log the error
+    except Exception:
+        log.exception("decision_chain_failed", query=x.get("message", ""))
         raise  # Re-raise the exception for visibility in server logs
+
+async def adecide(x: Dict[str, Any]) -> Union[Dict[str, Any], None]:
+    try:
+        user_query = x.get("message", "").strip().lower()
+        classification = x.get("classification") or await aclassify_query(user_query)
+        log.info("classified", query=user_query, classification=classification)
+        tracing.set_labels(intent=classification)
+
+        if classification == "FAQ":
+            return faq_decision(await chat_chain.ainvoke(x))
+        elif classification == "Product":
+            return product_decision(await product_chain.ainvoke(x))
+        return greeting_decision()
+
+    except Exception:
+        log.exception("decision_chain_failed", query=x.get("message", ""))
+        raise
+
+async def astream_decision(x: Dict[str, Any]):
+    """Async generator of (event, data): ("decision", {classification}) as soon as the
+    message is routed, the product chain's "metadata" and "token" events while an
+    answer is generated, then ("result", decision) with what decision_chain returns."""
+    user_query = x.get("message", "").strip().lower()
+    classification = await aclassify_query(user_query)
+    log.info("classified", query=user_query, classification=classification)
+    tracing.set_labels(intent=classification)
+    yield "decision", {"classification": classification}
+
+    if classification == "FAQ":
+        decision = faq_decision(await chat_chain.ainvoke(x))
+    elif classification == "Product":
+        decision = None
+        async for event, data in astream_product_query(x):
+            if event == "response":
+                decision = product_decision(data)
+            else:
+                yield event, data
+    else:
+        decision = greeting_decision()
+    yield "result", decision
+
+# invoke and ainvoke take the same route; ainvoke awaits the LLM and Postgres instead of blocking a thread
+decision_chain = RunnableLambda(decide, afunc=adecide, name="decision_chain")
@@ -0,0 +1,110 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Callable, List
+
+import numpy as np
+
+from utils import metrics
+
+queue_depth = metrics.gauge("embedding_batcher_queue_depth", "Query texts waiting for the next embedding batch")
+batch_size = metrics.histogram(
+    "embedding_batcher_batch_size", "Texts encoded per model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+wait_seconds = metrics.histogram("embedding_batcher_wait_seconds", "Time a text waited in the queue before encoding")
+encode_seconds = metrics.histogram("embedding_batcher_encode_seconds", "Duration of one batched encode call")
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text embedding calls into batched encodes.
+
+    Callers block on (or await) a future while a single background thread
+    collects texts for up to `window_ms` after the first one arrives, or until
+    `max_batch_size` are pending, and then makes one `encode` call for all of them.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], window_ms: float = 5, max_batch_size: int = 32):
+        self.encode = encode
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((text, future, time.perf_counter()))
+        queue_depth.set(self._queue.qsize())
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    async def aembed(self, text: str) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> list:
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            queue_depth.set(self._queue.qsize())
+            # A cancelled caller (a dropped stream, a cancelled task) no longer wants its text encoded
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                wait_seconds.observe(started - enqueued_at)
+            batch_size.observe(len(batch))
+
+            try:
+                embeddings = self.encode([text for text, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    _resolve(future, exception=e)
+                continue
+            finally:
+                encode_seconds.observe(time.perf_counter() - started)
+
+            for (_, future, _), embedding in zip(batch, embeddings):
+                _resolve(future, result=embedding)
+            # encode returned fewer rows than texts: never leave a caller waiting on the rest
+            for _, future, _ in batch[len(embeddings):]:
+                _resolve(future, exception=RuntimeError(
+                    f"encode returned {len(embeddings)} embeddings for {len(batch)} texts"))
+
+
+def _resolve(future: Future, result=None, exception: BaseException = None) -> None:
+    if future.done():
+        return
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        # Cancelled between the check and the set
+        pass
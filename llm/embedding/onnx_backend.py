@@ -0,0 +1,127 @@
+import fcntl
+import inspect
+import os
+from typing import List, Union
+
+import numpy as np
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+
+class OnnxEmbeddingBackend:
+    """Serves sentence embeddings from an ONNX export of a sentence-transformers model.
+
+    The model is exported once into `cache_dir` (optionally with dynamic int8
+    weight quantization) and shared by every worker afterwards. `encode` mirrors
+    the `SentenceTransformer.encode` calls this repo makes: mean pooling over the
+    attention mask followed by L2 normalization, like the MiniLM pipeline.
+
+    onnxruntime and onnx are optional: `poetry install -E onnx`, or
+    `pip install -r requirements-onnx.txt` next to dependencies.txt.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str, quantize: bool = True):
+        try:
+            import onnxruntime
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise RuntimeError("The ONNX embedding backend needs `onnxruntime` and `transformers` installed "
+                               "(pip install -r requirements-onnx.txt)") from e
+
+        self.model_name = model_name
+        self.model_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        self.directory = os.path.join(cache_dir, self.model_id.replace("/", "__"))
+        self.quantize = quantize
+        model_path = self.export()
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(self.directory)
+
+    @property
+    def fp32_path(self) -> str:
+        return os.path.join(self.directory, "model.onnx")
+
+    @property
+    def int8_path(self) -> str:
+        return os.path.join(self.directory, "model.int8.onnx")
+
+    def export(self) -> str:
+        """Export (and quantize) the model unless a previous run already did."""
+        target = self.int8_path if self.quantize else self.fp32_path
+        if os.path.exists(target):
+            return target
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "export.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not os.path.exists(self.fp32_path):
+                self._export_fp32()
+            if self.quantize and not os.path.exists(self.int8_path):
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+                tmp_path = self.int8_path + ".tmp"
+                quantize_dynamic(self.fp32_path, tmp_path, weight_type=QuantType.QInt8)
+                os.replace(tmp_path, self.int8_path)
+        return target
+
+    def _export_fp32(self) -> None:
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+        model = AutoModel.from_pretrained(self.model_id)
+        model.eval()
+        tokenizer.save_pretrained(self.directory)
+
+        class LastHiddenState(torch.nn.Module):
+            # Keyword arguments keep the export independent of forward()'s positional order
+            def __init__(self, encoder):
+                super().__init__()
+                self.encoder = encoder
+
+            def forward(self, input_ids, attention_mask, token_type_ids):
+                return self.encoder(input_ids=input_ids, attention_mask=attention_mask,
+                                    token_type_ids=token_type_ids).last_hidden_state
+
+        sample = tokenizer(["warm up export"], return_tensors="pt")
+        input_names = ["input_ids", "attention_mask", "token_type_ids"]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        tmp_path = self.fp32_path + ".tmp"
+        # Newer torch defaults to the dynamo exporter; the TorchScript one needs no extra deps
+        export_kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+        with torch.no_grad():
+            torch.onnx.export(
+                LastHiddenState(model),
+                (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+                tmp_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                **export_kwargs,
+            )
+        os.replace(tmp_path, self.fp32_path)
+
+    def encode(self, sentences: Union[str, List[str]], convert_to_numpy: bool = True, batch_size: int = 32) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        chunks = [self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        embeddings = np.vstack(chunks) if chunks else np.empty((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(texts, padding=True, truncation=True, max_length=MAX_SEQ_LENGTH, return_tensors="np")
+        feeds = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+        hidden = self.session.run(None, feeds)[0]
+
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
@@ -0,0 +1,101 @@
+import json
+import os
+import re
+from typing import Callable, Iterable, List, Tuple
+
+import numpy as np
+
+from llm.retriever.faq_search import normalize_rows
+
+LABELS = ("FAQ", "Product", "Greeting")
+
+# Section headers of the intent prompt and the label each one stands for
+PROMPT_SECTIONS = {"Product": "Product", "FAQ": "FAQ", "Greetings": "Greeting"}
+
+
+def parse_prompt_examples(prompt: str) -> List[Tuple[str, str]]:
+    """(text, label) pairs from the "Examples:" lists and quoted greetings of the intent prompt."""
+    examples = []
+    label = None
+    in_examples = False
+    for raw_line in prompt.splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith("---"):
+            in_examples = False
+            continue
+        if line.endswith(":") and line[:-1] in PROMPT_SECTIONS:
+            label = PROMPT_SECTIONS[line[:-1]]
+            in_examples = False
+            continue
+        if label is None:
+            continue
+        if line.startswith("Description:"):
+            if label == "Greeting":
+                examples.extend((greeting, label) for greeting in re.findall(r'"([^"]+)"', line))
+            continue
+        if line.startswith("Examples:"):
+            in_examples = True
+            line = line[len("Examples:"):].strip()
+        if in_examples and line:
+            examples.append((line.lower(), label))
+    return examples
+
+
+def load_examples(path: str) -> List[Tuple[str, str]]:
+    """Labelled examples from a JSON-lines file of {"text": ..., "label": ...}; missing file is empty."""
+    if not os.path.exists(path):
+        return []
+    examples = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                examples.append((record["text"].lower(), record["label"]))
+    return examples
+
+
+def append_examples(path: str, examples: Iterable[Tuple[str, str]]) -> None:
+    with open(path, "a") as f:
+        for text, label in examples:
+            if label not in LABELS:
+                raise ValueError(f"Unknown intent label: {label}")
+            f.write(json.dumps({"text": text, "label": label}) + "\n")
+
+
+class IntentClassifier:
+    """Nearest-centroid intent classifier over sentence embeddings.
+
+    Each label's centroid is the normalized mean of its example embeddings.
+    Confidence is a softmax over the cosine scores to every centroid, so a
+    message that sits between two intents gets a low confidence and can be
+    handed to the LLM instead.
+    """
+
+    def __init__(self, embed: Callable, examples: List[Tuple[str, str]], temperature: float = 0.05):
+        if not examples:
+            raise ValueError("IntentClassifier needs at least one example")
+        self.embed = embed
+        self.temperature = temperature
+        self.labels = [label for label in LABELS if any(l == label for _, l in examples)]
+        texts = [text for text, _ in examples]
+        example_labels = np.array([label for _, label in examples])
+        vectors = normalize_rows(embed(texts))
+        self.centroids = normalize_rows(np.stack([vectors[example_labels == label].mean(axis=0)
+                                                  for label in self.labels]))
+        self.size = len(examples)
+
+    def _decide(self, query_embeddings: np.ndarray) -> List[Tuple[str, float]]:
+        logits = (normalize_rows(query_embeddings) @ self.centroids.T) / self.temperature
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[i], float(probabilities[row, i])) for row, i in enumerate(best)]
+
+    def predict_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """(label, confidence) per text, from one batched encode."""
+        if not texts:
+            return []
+        return self._decide(self.embed(list(texts)))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        return self._decide(self.embed(text))[0]
@@ -1,28 +1,89 @@
 import os
 from dotenv import load_dotenv
 
+from llm.model_registry import ModelRegistry
+from utils.startup_profiler import startup_profiler
+
 load_dotenv()
 
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings, GoogleGenerativeAI
-from langchain_groq import ChatGroq
+# Sentence embedding model used for FAQ retrieval
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# "torch" (fp32 SentenceTransformer), "onnx" (fp32 ONNX Runtime) or "onnx-int8"
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+
+# Every model is built on first use (or during warm-up), never at import time
+model_registry = ModelRegistry()
+
+
+def _gemini_chat_model():
+    startup_profiler.import_module("langchain_google_genai")
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model="gemini-pro",
+        api_key=os.environ["GOOGLE_API_KEY"],
+        temperature=0
+        )
+
+
+def _gemini_embedding_model():
+    startup_profiler.import_module("langchain_google_genai")
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+
+
+def _gemini_generative_model():
+    startup_profiler.import_module("langchain_google_genai")
+    from langchain_google_genai import GoogleGenerativeAI
+    return GoogleGenerativeAI(
+        model="gemini-pro",
+        api_key=os.environ["GOOGLE_API_KEY"],
+        temperature=0
+        )
+
+
+def _groq_mixtral_model():
+    startup_profiler.import_module("langchain_groq")
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        temperature=0,
+        model_name="mixtral-8x7b-32768",
+        api_key=os.environ["GROQ_API_KEY"]
+        )
+
 
+def _sentence_embedding_model():
+    if EMBEDDING_BACKEND in ('onnx', 'onnx-int8'):
+        startup_profiler.import_module("onnxruntime")
+        from llm.embedding.onnx_backend import OnnxEmbeddingBackend
+        return OnnxEmbeddingBackend(
+            EMBEDDING_MODEL_NAME,
+            os.getenv('ONNX_MODEL_DIR', '.cache/onnx'),
+            quantize=EMBEDDING_BACKEND == 'onnx-int8',
+        )
+    if EMBEDDING_BACKEND != 'torch':
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {EMBEDDING_BACKEND}")
+    # Timed one by one so the startup report shows where the load time goes
+    for module in ("torch", "transformers", "sentence_transformers"):
+        startup_profiler.import_module(module)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
 
-gemini_chat_model = ChatGoogleGenerativeAI(
-    model="gemini-pro",
-    api_key=os.environ["GOOGLE_API_KEY"],
-    temperature=0
-    )
 
-gemini_embedding_model = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+model_registry.register("gemini_chat_model", _gemini_chat_model)
+model_registry.register("gemini_embedding_model", _gemini_embedding_model)
+model_registry.register("gemini_generative_model", _gemini_generative_model)
+model_registry.register("groq_mixtral_model", _groq_mixtral_model)
+model_registry.register(
+    "sentence_embedding_model",
+    _sentence_embedding_model,
+    # A dummy encode pays for lazy weight init and kernel selection before real traffic
+    warmup=lambda model: model.encode(["warm up"], convert_to_numpy=True),
+)
 
-gemini_generative_model = GoogleGenerativeAI(
-    model="gemini-pro",
-    api_key=os.environ["GOOGLE_API_KEY"],
-    temperature=0
-    )
 
-groq_mixtral_model = ChatGroq(
-    temperature=0,
-    model_name="mixtral-8x7b-32768",
-    api_key=os.environ["GROQ_API_KEY"]
-    )
\ No newline at end of file
+# `from llm import model as models; models.gemini_generative_model` resolves lazily
+def __getattr__(name):
+    if name in model_registry:
+        return model_registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from utils.startup_profiler import startup_profiler
+
+UNLOADED = "unloaded"
+LOADING = "loading"
+LOADED = "loaded"
+WARM = "warm"
+FAILED = "failed"
+
+
+class ModelRegistry:
+    """Loads each registered model on first use, or during an explicit warm-up.
+
+    Loaders run at most once per model even when several request threads ask
+    for the same model concurrently; models nobody asks for are never loaded.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._warmups: Dict[str, Optional[Callable[[Any], None]]] = {}
+        self._models: Dict[str, Any] = {}
+        self._state: Dict[str, str] = {}
+        self._errors: Dict[str, str] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None) -> None:
+        self._loaders[name] = loader
+        self._warmups[name] = warmup
+        self._state[name] = UNLOADED
+        self._locks[name] = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._loaders
+
+    def get(self, name: str) -> Any:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+            self._state[name] = LOADING
+            started = time.perf_counter()
+            try:
+                with startup_profiler.phase("model", name):
+                    model = self._loaders[name]()
+            except Exception as e:
+                self._state[name] = FAILED
+                self._errors[name] = str(e)
+                raise
+            self._load_seconds[name] = time.perf_counter() - started
+            self._models[name] = model
+            self._state[name] = LOADED
+            self._errors.pop(name, None)
+            return model
+
+    def override(self, name: str, model: Any) -> None:
+        """Serve `model` for `name` without running its loader (offline benchmarks, fakes)."""
+        if name not in self._loaders:
+            self.register(name, lambda: model)
+        with self._locks[name]:
+            self._models[name] = model
+            self._state[name] = WARM
+            self._errors.pop(name, None)
+
+    def warm_up(self, names: Iterable[str]) -> None:
+        """Load `names` and run their warm-up hook (e.g. a dummy encode)."""
+        for name in names:
+            model = self.get(name)
+            warmup = self._warmups.get(name)
+            if warmup is not None:
+                try:
+                    with startup_profiler.phase("warmup", name):
+                        warmup(model)
+                except Exception as e:
+                    self._state[name] = FAILED
+                    self._errors[name] = str(e)
+                    raise
+            self._state[name] = WARM
+
+    def state(self, name: str) -> str:
+        return self._state.get(name, UNLOADED)
+
+    def status(self) -> dict:
+        return {
+            name: {
+                "state": self._state[name],
+                "load_seconds": self._load_seconds.get(name),
+                "error": self._errors.get(name),
+            }
+            for name in self._loaders
+        }
@@ -0,0 +1,143 @@
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+from llm.retriever.faq_search import normalize_rows, top_k
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids for unit-norm `vectors`, clustered by cosine similarity."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = ~sums.any(axis=1)
+        if empty.any():
+            # Re-seed empty clusters instead of letting them collapse to zero
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IvfFlatIndex:
+    """Approximate cosine search with an inverted file over k-means cells.
+
+    Vectors are assigned to their nearest centroid; a query scores the
+    centroids, then exactly scores only the vectors in its `nprobe` best
+    cells. Row ids match insertion order, so results index straight into the
+    FAQ list like `FaqSearchEngine` results do.
+    """
+
+    def __init__(self, centroids: np.ndarray, nprobe: int = 8):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.nprobe = nprobe
+        self.vectors = np.empty((0, self.centroids.shape[1]), dtype=np.float32)
+        self.assignments = np.empty(0, dtype=np.int64)
+        self._order = None
+        self._offsets = None
+
+    @classmethod
+    def train(cls, embeddings: np.ndarray, n_lists: Optional[int] = None, nprobe: int = 8,
+              sample_size: int = 50000, normalized: bool = False, seed: int = 0) -> "IvfFlatIndex":
+        vectors = np.asarray(embeddings, dtype=np.float32) if normalized else normalize_rows(embeddings)
+        if n_lists is None:
+            n_lists = max(1, int(math.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        rng = np.random.default_rng(seed)
+        sample = vectors
+        if len(vectors) > sample_size:
+            sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+        index = cls(spherical_kmeans(np.asarray(sample), n_lists, seed=seed), nprobe=nprobe)
+        index.add(vectors, normalized=True)
+        return index
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.centroids.shape[1]
+
+    def add(self, embeddings: np.ndarray, normalized: bool = False) -> None:
+        """Insert vectors without retraining; they get the next row ids."""
+        vectors = np.asarray(embeddings, dtype=np.float32) if normalized else normalize_rows(embeddings)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        assignments = np.argmax(vectors @ self.centroids.T, axis=1)
+        if len(self):
+            self.vectors = np.vstack([self.vectors, vectors])
+            self.assignments = np.concatenate([self.assignments, assignments])
+        else:
+            self.vectors = vectors
+            self.assignments = assignments
+        # Cell layout is rebuilt lazily on the next search
+        self._order = None
+
+    def _layout(self) -> Tuple[np.ndarray, np.ndarray]:
+        order, offsets = self._order, self._offsets
+        if order is None:
+            order = np.argsort(self.assignments, kind="stable")
+            counts = np.bincount(self.assignments, minlength=len(self.centroids))
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            self._order, self._offsets = order, offsets
+        return order, offsets
+
+    def score_rows(self, query_embedding: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Exact cosine scores of one query against selected rows, whichever cells they are in."""
+        return self.vectors[np.asarray(rows, dtype=np.int64)] @ normalize_rows(query_embedding)[0]
+
+    def search(self, query_embedding: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        indices, scores = self.search_batch(query_embedding, k)
+        return indices[0], scores[0]
+
+    def search_batch(self, query_embeddings: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        queries = normalize_rows(query_embeddings)
+        if len(self) == 0:
+            return top_k(np.empty((len(queries), 0), dtype=np.float32), k)
+        order, offsets = self._layout()
+        nprobe = min(self.nprobe, len(self.centroids))
+        cells, _ = top_k(queries @ self.centroids.T, nprobe)
+
+        all_indices = np.full((len(queries), k), -1, dtype=np.int64)
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for row, (query, query_cells) in enumerate(zip(queries, cells)):
+            candidates = np.concatenate([order[offsets[cell]:offsets[cell + 1]] for cell in query_cells])
+            if not len(candidates):
+                continue
+            local, scores = top_k((self.vectors[candidates] @ query).reshape(1, -1), k)
+            found = local.shape[1]
+            all_indices[row, :found] = candidates[local[0]]
+            all_scores[row, :found] = scores[0]
+        # Drop padding columns when fewer than k candidates were probed for every query
+        width = int((all_indices >= 0).sum(axis=1).max())
+        return all_indices[:, :width], all_scores[:, :width]
+
+    def save(self, path: str, include_vectors: bool = True) -> None:
+        """Write the index as .npz; skip the vectors when they already live in a store artifact."""
+        arrays = {"centroids": self.centroids, "assignments": self.assignments, "nprobe": np.array(self.nprobe)}
+        if include_vectors:
+            arrays["vectors"] = self.vectors
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str, vectors: Optional[np.ndarray] = None) -> "IvfFlatIndex":
+        """Load a saved index; `vectors` supplies the rows if they were saved separately."""
+        with np.load(path) as data:
+            index = cls(data["centroids"], nprobe=int(data["nprobe"]))
+            index.assignments = data["assignments"]
+            index.vectors = data["vectors"] if vectors is None else np.asarray(vectors, dtype=np.float32)
+        if len(index.vectors) != len(index.assignments):
+            raise ValueError(f"{path} has {len(index.assignments)} assignments for {len(index.vectors)} vectors")
+        return index
+
+
+def recall_at_k(exact, approximate, query_embeddings: np.ndarray, k: int = 10) -> float:
+    """Share of the exact top-k neighbours that the approximate search also returns."""
+    exact_indices, _ = exact.search_batch(query_embeddings, k)
+    approx_indices, _ = approximate.search_batch(query_embeddings, k)
+    hits = sum(len(set(e) & set(a)) for e, a in zip(exact_indices.tolist(), approx_indices.tolist()))
+    return hits / exact_indices.size if exact_indices.size else 1.0
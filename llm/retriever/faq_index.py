@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from llm.retriever.ann_index import IvfFlatIndex
+from llm.retriever.faq_lexical import FaqLexicalIndex
+from llm.retriever.faq_search import FaqSearchEngine
+
+# "exact", "approximate", or "auto" (approximate once the corpus reaches FAQ_ANN_MIN_SIZE)
+FAQ_SEARCH_MODE = os.getenv('FAQ_SEARCH_MODE', 'auto')
+FAQ_ANN_MIN_SIZE = int(os.getenv('FAQ_ANN_MIN_SIZE', '20000'))
+FAQ_ANN_NPROBE = int(os.getenv('FAQ_ANN_NPROBE', '8'))
+# How close a lexical match must be to answer without the embedding model
+FAQ_LEXICAL_MIN_OVERLAP = float(os.getenv('FAQ_LEXICAL_MIN_OVERLAP', '0.8'))
+FAQ_LEXICAL_MIN_MARGIN = float(os.getenv('FAQ_LEXICAL_MIN_MARGIN', '1.5'))
+
+
+def make_search_engine(embeddings: np.ndarray, normalized: bool = False):
+    """Exact search for small corpora, IVF-flat for large ones.
+
+    When `embeddings` is a memory-mapped store artifact, the trained IVF index is
+    persisted next to it and reused by the other workers and later restarts.
+    """
+    approximate = FAQ_SEARCH_MODE == 'approximate' or (
+        FAQ_SEARCH_MODE == 'auto' and len(embeddings) >= FAQ_ANN_MIN_SIZE)
+    if not approximate or len(embeddings) == 0:
+        return FaqSearchEngine(embeddings, normalized=normalized)
+
+    cache_path = None
+    if isinstance(embeddings, np.memmap) and embeddings.filename:
+        cache_path = f"{embeddings.filename}.ivf.npz"
+        if os.path.exists(cache_path):
+            try:
+                index = IvfFlatIndex.load(cache_path, vectors=embeddings)
+                index.nprobe = FAQ_ANN_NPROBE
+                return index
+            except ValueError:
+                pass
+
+    index = IvfFlatIndex.train(embeddings, nprobe=FAQ_ANN_NPROBE, normalized=normalized)
+    if cache_path:
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        # The vectors are the memory-mapped artifact itself; only the cells are saved
+        index.save(tmp_path, include_vectors=False)
+        os.replace(tmp_path, cache_path)
+    return index
+
+
+class FaqIndex:
+    """Immutable snapshot of the FAQ table with its precomputed embeddings.
+
+    A new index is built off to the side and published with `publish_faq_index`,
+    so requests always see a complete snapshot and never a half-built one.
+    """
+
+    def __init__(self, faqs: List[dict], engine, version: int, lexical: Optional[FaqLexicalIndex] = None):
+        self.faqs = faqs
+        self.engine = engine
+        self.lexical = lexical
+        self.version = version
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self.faqs)
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "size": len(self.faqs),
+            "built_at": self.built_at,
+            "search": type(self.engine).__name__,
+        }
+
+
+_current_index: Optional[FaqIndex] = None
+_version = 0
+# Serializes builds so concurrent callers don't all re-embed the FAQ table
+_build_lock = threading.RLock()
+
+
+def current_faq_index() -> Optional[FaqIndex]:
+    return _current_index
+
+
+def publish_faq_index(faqs: List[dict], embeddings: np.ndarray, normalized: bool = False,
+                      normalize: Optional[Callable[[str], str]] = None) -> FaqIndex:
+    """Swap in a new index; with `normalize`, also build the exact/BM25 lexical index."""
+    global _current_index, _version
+    with _build_lock:
+        _version += 1
+        lexical = None
+        if normalize is not None:
+            lexical = FaqLexicalIndex(faqs, normalize, min_overlap=FAQ_LEXICAL_MIN_OVERLAP,
+                                      min_margin=FAQ_LEXICAL_MIN_MARGIN)
+        index = FaqIndex(faqs, make_search_engine(embeddings, normalized=normalized), _version, lexical)
+        # A single reference assignment, so readers see either the old or the new index
+        _current_index = index
+    return index
+
+
+def build_faq_index(load_faqs: Callable[[], List[dict]],
+                    embed_faqs: Callable[[List[dict]], np.ndarray],
+                    normalize: Optional[Callable[[str], str]] = None) -> FaqIndex:
+    """Rebuild the index from `load_faqs` and swap it in.
+
+    `embed_faqs` returns one L2-normalized embedding row per FAQ, in order.
+    """
+    with _build_lock:
+        faqs = load_faqs()
+        return publish_faq_index(faqs, embed_faqs(faqs), normalized=True, normalize=normalize)
+
+
+def get_faq_index(build: Callable[[], FaqIndex]) -> FaqIndex:
+    """Return the resident index, calling `build` on first use if startup didn't."""
+    index = _current_index
+    if index is not None:
+        return index
+    with _build_lock:
+        if _current_index is not None:
+            return _current_index
+        return build()
@@ -0,0 +1,109 @@
+import math
+import re
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from llm.retriever.faq_search import top_k
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Words that say nothing about which FAQ is meant
+STOPWORDS = frozenset("""
+a an the is are was were be been do does did i me my we our you your it its of to in on for
+and or with at by from as can could would should will what whats what's how when where which
+who why this that these those there any some have has had please tell about
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def content_terms(text: str) -> set:
+    return {token for token in tokenize(text) if token not in STOPWORDS}
+
+
+class Bm25Index:
+    """Okapi BM25 over an inverted index, scoring every document in one pass per query term."""
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        postings = {}
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for doc_id, document in enumerate(documents):
+            tokens = [token for token in tokenize(document) if token not in STOPWORDS]
+            lengths[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((doc_id, count))
+
+        avg_length = float(lengths.mean()) if self.size and lengths.mean() > 0 else 1.0
+        self._norm = k1 * (1 - b + b * lengths / avg_length)
+        self._postings = {}
+        for token, entries in postings.items():
+            doc_ids = np.array([doc_id for doc_id, _ in entries], dtype=np.int64)
+            freqs = np.array([count for _, count in entries], dtype=np.float32)
+            idf = math.log(1 + (self.size - len(entries) + 0.5) / (len(entries) + 0.5))
+            self._postings[token] = (doc_ids, freqs, idf)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(tokenize(query)) - STOPWORDS:
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            doc_ids, freqs, idf = posting
+            scores[doc_ids] += idf * freqs * (self.k1 + 1) / (freqs + self._norm[doc_ids])
+        return scores
+
+
+class FaqLexicalIndex:
+    """Exact-question lookup plus BM25 over FAQ questions and answers.
+
+    Lets near-verbatim FAQ questions be answered without running the
+    embedding model, and supplies the lexical half of hybrid ranking.
+    """
+
+    def __init__(self, faqs: List[dict], normalize: Callable[[str], str],
+                 min_overlap: float = 0.8, min_margin: float = 1.5):
+        self.normalize = normalize
+        self.min_overlap = min_overlap
+        self.min_margin = min_margin
+        self._exact = {}
+        for i, faq in enumerate(faqs):
+            self._exact.setdefault(self.exact_key(faq['question']), i)
+        self._question_terms = [content_terms(faq['question']) for faq in faqs]
+        # Questions are repeated so they outweigh the (much longer) answers
+        self.bm25 = Bm25Index([f"{faq['question']} {faq['question']} {faq['answer'] or ''}" for faq in faqs])
+
+    def exact_key(self, text: str) -> str:
+        return self.normalize(text).rstrip(" ?.!")
+
+    def exact_match(self, query: str) -> Optional[int]:
+        return self._exact.get(self.exact_key(query))
+
+    def search(self, query: str, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.bm25.scores(query)
+        indices, top_scores = top_k(scores.reshape(1, -1), k)
+        keep = top_scores[0] > 0
+        return indices[0][keep], top_scores[0][keep]
+
+    def confident_match(self, query: str) -> Tuple[Optional[int], np.ndarray, np.ndarray]:
+        """The best BM25 FAQ if it is an unambiguous near-copy of the query, plus the BM25 hits."""
+        indices, scores = self.search(query)
+        if not len(indices):
+            return None, indices, scores
+        best = int(indices[0])
+        query_terms = content_terms(query)
+        question_terms = self._question_terms[best]
+        union = query_terms | question_terms
+        overlap = len(query_terms & question_terms) / len(union) if union else 0.0
+        runner_up = scores[1] if len(scores) > 1 else 0.0
+        if overlap >= self.min_overlap and scores[0] >= self.min_margin * runner_up:
+            return best, indices, scores
+        return None, indices, scores
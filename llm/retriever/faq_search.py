@@ -0,0 +1,80 @@
+from typing import Tuple
+
+import numpy as np
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Zero vectors stay zero instead of turning into NaNs
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best `k` columns of each row of `scores`, highest first.
+
+    Uses a partial selection so only the k winners get sorted.
+    """
+    n = scores.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(n), (scores.shape[0], 1))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    indices = np.take_along_axis(candidates, order, axis=1)
+    return indices, np.take_along_axis(candidate_scores, order, axis=1)
+
+
+class FaqSearchEngine:
+    """Exact cosine search over one contiguous float32 matrix of FAQ embeddings.
+
+    Rows are L2-normalized once at build time so scoring is a single matrix
+    product. The engine never mutates the FAQ dicts; scores come back as arrays.
+    """
+
+    def __init__(self, embeddings: np.ndarray, normalized: bool = False):
+        if normalized:
+            self.matrix = np.asarray(embeddings, dtype=np.float32)
+        else:
+            self.matrix = np.ascontiguousarray(normalize_rows(embeddings))
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def add(self, embeddings: np.ndarray, normalized: bool = False) -> None:
+        vectors = np.asarray(embeddings, dtype=np.float32) if normalized else normalize_rows(embeddings)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        self.matrix = vectors if len(self) == 0 else np.ascontiguousarray(np.vstack([self.matrix, vectors]))
+
+    def scores(self, query_embeddings: np.ndarray) -> np.ndarray:
+        return normalize_rows(query_embeddings) @ self.matrix.T
+
+    def score_rows(self, query_embedding: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Cosine scores of one query against selected FAQ rows only."""
+        return self.matrix[np.asarray(rows, dtype=np.int64)] @ normalize_rows(query_embedding)[0]
+
+    def search(self, query_embedding: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        indices, scores = self.search_batch(query_embedding, k)
+        return indices[0], scores[0]
+
+    def search_batch(self, query_embeddings: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k FAQ row indices and cosine scores, one row per query."""
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        if query_embeddings.ndim == 1:
+            query_embeddings = query_embeddings.reshape(1, -1)
+        if len(self) == 0:
+            return top_k(np.empty((query_embeddings.shape[0], 0), dtype=np.float32), k)
+        return top_k(self.scores(query_embeddings), k)
@@ -0,0 +1,130 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from llm.retriever.faq_search import normalize_rows
+
+METADATA_FILE = "faq_embeddings.json"
+LOCK_FILE = "faq_embeddings.lock"
+
+
+class FaqEmbeddingStore:
+    """On-disk FAQ embedding matrix shared by every worker on the host.
+
+    The matrix is an `.npy` file of L2-normalized float32 rows that workers
+    memory-map read-only, so the OS shares its pages between processes. A JSON
+    sidecar records the model name and one key per row (a hash of the model
+    name and the normalized question); on sync only questions whose key is
+    missing get re-encoded.
+    """
+
+    def __init__(self, directory: str, model_name: str,
+                 embed: Callable[[List[str]], np.ndarray],
+                 normalize: Callable[[str], str]):
+        self.directory = directory
+        self.model_name = model_name
+        self.embed = embed
+        self.normalize = normalize
+
+    def question_key(self, question: str) -> str:
+        payload = f"{self.model_name}\n{self.normalize(question)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_metadata(self) -> Optional[dict]:
+        try:
+            with open(self._path(METADATA_FILE)) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if metadata.get("model") != self.model_name:
+            return None
+        if not os.path.exists(self._path(metadata.get("matrix", ""))):
+            return None
+        return metadata
+
+    def _open_matrix(self, metadata: dict) -> np.ndarray:
+        return np.load(self._path(metadata["matrix"]), mmap_mode="r")
+
+    def load(self) -> Optional[np.ndarray]:
+        """Memory-map the current artifact, or None if there isn't a usable one."""
+        metadata = self._read_metadata()
+        return self._open_matrix(metadata) if metadata else None
+
+    def sync(self, questions: List[str]) -> np.ndarray:
+        """Return a read-only matrix with one row per question, in order.
+
+        Rows for questions already in the artifact are copied over; only new
+        or edited questions go through `embed`.
+        """
+        if not questions:
+            return np.empty((0, 0), dtype=np.float32)
+
+        keys = [self.question_key(question) for question in questions]
+        metadata = self._read_metadata()
+        if metadata and metadata["keys"] == keys:
+            return self._open_matrix(metadata)
+
+        os.makedirs(self.directory, exist_ok=True)
+        # Only one worker rebuilds; the others wait and then take the fast path
+        with open(self._path(LOCK_FILE), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            metadata = self._read_metadata()
+            if metadata and metadata["keys"] == keys:
+                return self._open_matrix(metadata)
+            return self._rebuild(questions, keys, metadata)
+
+    def _rebuild(self, questions: List[str], keys: List[str], metadata: Optional[dict]) -> np.ndarray:
+        existing_rows = {}
+        old_matrix = None
+        if metadata:
+            old_matrix = self._open_matrix(metadata)
+            existing_rows = {key: row for row, key in enumerate(metadata["keys"])}
+
+        missing = [i for i, key in enumerate(keys) if key not in existing_rows]
+        encoded = None
+        if missing:
+            encoded = normalize_rows(self.embed([self.normalize(questions[i]) for i in missing]))
+
+        dim = encoded.shape[1] if encoded is not None else old_matrix.shape[1]
+        matrix = np.empty((len(keys), dim), dtype=np.float32)
+        for row, key in enumerate(keys):
+            if key in existing_rows:
+                matrix[row] = old_matrix[existing_rows[key]]
+        if missing:
+            matrix[missing] = encoded
+
+        # Content-addressed file name, so a worker holding the old mapping is never
+        # handed a matrix that doesn't match the sidecar it read
+        digest = hashlib.sha256("".join(keys).encode("utf-8")).hexdigest()[:16]
+        matrix_name = f"faq_embeddings-{digest}.npy"
+        self._atomic_write(matrix_name, lambda f: np.save(f, matrix))
+        new_metadata = {"model": self.model_name, "dim": dim, "matrix": matrix_name, "keys": keys}
+        self._atomic_write(METADATA_FILE, lambda f: f.write(json.dumps(new_metadata).encode("utf-8")))
+        self._remove_stale(matrix_name)
+        return self._open_matrix(new_metadata)
+
+    def _atomic_write(self, name: str, write: Callable) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, self._path(name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _remove_stale(self, keep: str) -> None:
+        # Workers that still map an old file keep their pages until they remap.
+        # Files derived from the matrix (like a trained ANN index) share its name prefix.
+        for name in os.listdir(self.directory):
+            if name.startswith("faq_embeddings-") and not name.startswith(keep):
+                os.remove(self._path(name))
@@ -0,0 +1,53 @@
+import hashlib
+import os
+
+import numpy as np
+
+from llm.retriever.faq_store import METADATA_FILE, FaqEmbeddingStore
+
+
+class FakeEmbedder:
+    """Deterministic vectors per text; records every batch it is asked to encode."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        seeds = [int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) for text in texts]
+        return np.stack([np.random.default_rng(seed).standard_normal(8) for seed in seeds]).astype(np.float32)
+
+
+def matrix_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.startswith("faq_embeddings-"))
+
+
+def test_sync_reencodes_only_the_edited_question(tmp_path):
+    embed = FakeEmbedder()
+    store = FaqEmbeddingStore(str(tmp_path), "fake-model", embed, normalize=lambda text: text.strip().lower())
+    questions = ["How do I reset my password?", "What is your return policy?", "Do you ship abroad?"]
+
+    first = np.array(store.sync(questions))
+    assert embed.calls == [[question.lower() for question in questions]]
+    [old_matrix] = matrix_files(tmp_path)
+    # A file derived from the old matrix (like a trained ANN index) goes with it
+    derived = old_matrix + ".ivf.npz"
+    (tmp_path / derived).write_bytes(b"index")
+
+    edited = questions[:1] + ["What is your refund policy?"] + questions[2:]
+    second = np.array(store.sync(edited))
+
+    assert embed.calls[1:] == [["what is your refund policy?"]]
+    np.testing.assert_array_equal(second[0], first[0])
+    np.testing.assert_array_equal(second[2], first[2])
+    assert not np.allclose(second[1], first[1])
+
+    [new_matrix] = matrix_files(tmp_path)
+    assert new_matrix != old_matrix
+    assert not (tmp_path / derived).exists()
+    assert (tmp_path / METADATA_FILE).exists()
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".tmp-")]
+
+    # Unchanged questions take the fast path and encode nothing
+    np.testing.assert_array_equal(np.array(store.sync(edited)), second)
+    assert len(embed.calls) == 2
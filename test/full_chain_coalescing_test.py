@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm.chain import full_chain as chain_module
+
+MESSAGES = ("What is your Return Policy?", "  what is your return policy? ")
+
+
+class FakeChain:
+    """Stands in for full_chain: counts runs and holds each one until released."""
+
+    def __init__(self):
+        self.runs = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def _answer(self, input):
+        return {"message": input["message"], "response": "30 days", "customer_id": input.get("customer_id")}
+
+    def invoke(self, input):
+        self.runs += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return self._answer(input)
+
+    async def ainvoke(self, input):
+        self.runs += 1
+        self.started.set()
+        while not self.release.is_set():
+            await asyncio.sleep(0.001)
+        return self._answer(input)
+
+
+@pytest.fixture
+def fake_chain(monkeypatch):
+    fake = FakeChain()
+    monkeypatch.setattr(chain_module, "full_chain", fake)
+    monkeypatch.setattr(chain_module, "SINGLE_FLIGHT", True)
+    return fake
+
+
+def wait_for_followers(count):
+    flight = chain_module.full_chain_flight
+    deadline = time.monotonic() + 5
+    while flight._counts["follower"] < count:
+        assert time.monotonic() < deadline, "the second caller never joined the flight"
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_run_and_keep_their_message(fake_chain):
+    assert chain_module.coalesce_key({"message": MESSAGES[0]}) == chain_module.coalesce_key({"message": MESSAGES[1]})
+    followers = chain_module.full_chain_flight._counts["follower"]
+    results = {}
+
+    def call(message):
+        results[message] = chain_module.invoke_coalesced({"message": message, "customer_id": "42"})
+
+    leader = threading.Thread(target=call, args=(MESSAGES[0],))
+    leader.start()
+    assert fake_chain.started.wait(5)
+    follower = threading.Thread(target=call, args=(MESSAGES[1],))
+    follower.start()
+    wait_for_followers(followers + 1)
+    fake_chain.release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert fake_chain.runs == 1
+    for message in MESSAGES:
+        assert results[message] == {"message": message, "response": "30 days", "customer_id": "42"}
+
+
+def test_async_callers_share_one_run_and_keep_their_message(fake_chain):
+    followers = chain_module.full_chain_flight._counts["follower"]
+
+    async def main():
+        leader = asyncio.ensure_future(chain_module.ainvoke_coalesced({"message": MESSAGES[0], "customer_id": "42"}))
+        while not fake_chain.started.is_set():
+            await asyncio.sleep(0.001)
+        follower = asyncio.ensure_future(chain_module.ainvoke_coalesced({"message": MESSAGES[1], "customer_id": "42"}))
+        while chain_module.full_chain_flight._counts["follower"] < followers + 1:
+            await asyncio.sleep(0.001)
+        fake_chain.release.set()
+        return await asyncio.gather(leader, follower)
+
+    results = asyncio.run(asyncio.wait_for(main(), 5))
+
+    assert fake_chain.runs == 1
+    assert [result["message"] for result in results] == list(MESSAGES)
+    assert all(result["response"] == "30 days" for result in results)
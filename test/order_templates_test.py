@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from llm.chain.sub_chain.order_templates import match_order_template
+from llm.chain.sub_chain.product_router import ProductRoute
+
+NOW = datetime(2024, 6, 15, 12, 0)
+
+
+def route(query, recent_order_score=0):
+    return ProductRoute(query=query, is_greeting=False, is_recent_order=True,
+                        scores={"recent_order": recent_order_score})
+
+
+def test_order_id_phrasings():
+    for query in ("what is the status of order number 1042", "order no. 1042", "order no 1042",
+                  "where is my order #1042", "order id 1042", "my order, id # 1042"):
+        assert match_order_template(route(query), NOW) == ("order_by_id", {"order_id": 1042}), query
+
+
+def test_order_id_keywords_inside_other_words():
+    # "mid", "video", "nothing" contain id / no but are not order numbers
+    for query in ("show me the order details of mid 2023", "order video 5 lanyards", "order nothing 12"):
+        assert match_order_template(route(query), NOW) is None, query
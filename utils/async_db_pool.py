@@ -0,0 +1,103 @@
+import asyncio
+import contextlib
+import importlib.util
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from config.db import get_db_params, get_pool_config
+from utils import metrics
+
+wait_seconds = metrics.histogram(
+    "db_async_pool_wait_seconds", "Time spent waiting to check out a connection from the async pool")
+
+_pool = None
+_opening: Optional[asyncio.Future] = None
+_available: Optional[bool] = None
+
+
+async def _configure(conn) -> None:
+    # Same session as the threaded pool: read-only, so nothing a query does is ever committed
+    await conn.set_read_only(True)
+
+
+def available() -> bool:
+    """Whether the optional psycopg 3 extra ('async') is installed."""
+    global _available
+    if _available is None:
+        _available = all(importlib.util.find_spec(name) is not None for name in ("psycopg", "psycopg_pool"))
+    return _available
+
+
+def _create_pool():
+    # psycopg 3 keeps psycopg2's %(name)s parameter style, so every SQL string works unchanged
+    try:
+        from psycopg.rows import dict_row
+        from psycopg_pool import AsyncConnectionPool
+    except ImportError as e:
+        raise ImportError("The async pipeline needs psycopg 3: pip install -r requirements-async.txt") from e
+    config = get_pool_config()
+    return AsyncConnectionPool(
+        kwargs={
+            **get_db_params(),
+            "options": f"-c statement_timeout={config['statement_timeout_ms']}",
+            "row_factory": dict_row,
+        },
+        min_size=config["min_size"],
+        max_size=config["max_size"],
+        timeout=config["checkout_timeout"],
+        max_lifetime=config["max_lifetime"],
+        configure=_configure,
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+    )
+
+
+async def get_async_pool():
+    """The event loop's pool, created from config/db.py settings and opened on first use."""
+    global _pool, _opening
+    if _pool is None:
+        _pool = _create_pool()
+        _opening = asyncio.ensure_future(_pool.open())
+    pool, opening = _pool, _opening
+    # Callers that arrive while the pool is opening wait for the same open; shielded, so
+    # one cancelled caller does not cancel it for the others
+    try:
+        await asyncio.shield(opening)
+    except Exception:
+        # A failed open (Postgres not up yet, say) is not kept: the next caller builds a new pool and retries
+        if _pool is pool:
+            _pool, _opening = None, None
+        with contextlib.suppress(Exception):
+            await pool.close()
+        raise
+    return pool
+
+
+async def close_async_pool() -> None:
+    global _pool, _opening
+    if _pool is not None:
+        pool, _pool, _opening = _pool, None, None
+        await pool.close()
+
+
+def async_pool_status() -> Optional[dict]:
+    if _pool is None:
+        return None
+    stats = _pool.get_stats()
+    return {
+        "size": stats.get("pool_size", 0),
+        "idle": stats.get("pool_available", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "max_size": _pool.max_size,
+    }
+
+
+@asynccontextmanager
+async def connection():
+    """`async with connection() as conn`; the read-only transaction ends and the connection goes back to the pool on exit."""
+    pool = await get_async_pool()
+    started = time.monotonic()
+    async with pool.connection() as conn:
+        wait_seconds.observe(time.monotonic() - started)
+        yield conn
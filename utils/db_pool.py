@@ -0,0 +1,226 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import psycopg2
+
+from config.db import get_db_params, get_pool_config
+from utils import metrics
+
+wait_seconds = metrics.histogram("db_pool_wait_seconds", "Time spent waiting to check out a database connection")
+in_use = metrics.gauge("db_pool_in_use", "Database connections currently checked out")
+pool_size = metrics.gauge("db_pool_size", "Open database connections, idle or in use")
+connections_opened = metrics.counter("db_pool_connections_opened_total", "Database connections opened by the pool")
+pool_errors = metrics.counter("db_pool_errors_total", "Pool errors by kind (connect, health_check, timeout, broken)")
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections.
+
+    Connections are opened lazily up to `max_size`, pinged on checkout when
+    they have been idle a while, and closed once older than `max_lifetime`.
+    Every connection is read-only with a session `statement_timeout`, and is
+    rolled back when returned, so nothing a query does is ever committed;
+    the same effect the old connect/close per query had.
+    """
+
+    def __init__(self, connect: Callable[[], "psycopg2.extensions.connection"], min_size: int = 1,
+                 max_size: int = 10, checkout_timeout: float = 10, max_lifetime: float = 1800,
+                 health_check_idle: float = 30, connect_retries: int = 3, connect_backoff: float = 0.2):
+        self._connect_once = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_idle = health_check_idle
+        self.connect_retries = connect_retries
+        self.connect_backoff = connect_backoff
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+
+    def _open(self) -> _PooledConnection:
+        """Connect with exponential backoff and jitter; the last failure is raised."""
+        for attempt in range(self.connect_retries + 1):
+            try:
+                conn = self._connect_once()
+                connections_opened.inc()
+                return _PooledConnection(conn)
+            except psycopg2.OperationalError:
+                pool_errors.inc(kind="connect")
+                if attempt == self.connect_retries:
+                    raise
+                delay = self.connect_backoff * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay))
+
+    def _expired(self, pooled: _PooledConnection) -> bool:
+        return pooled.conn.closed or time.monotonic() - pooled.created_at > self.max_lifetime
+
+    def _healthy(self, pooled: _PooledConnection) -> bool:
+        if time.monotonic() - pooled.last_used < self.health_check_idle:
+            return True
+        try:
+            with pooled.conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            pooled.conn.rollback()
+            return True
+        except psycopg2.Error:
+            pool_errors.inc(kind="health_check")
+            return False
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        try:
+            pooled.conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            pool_size.set(self._size)
+            self._cond.notify()
+
+    def _check_fork(self) -> None:
+        # A forked worker must not share the parent's sockets; start from an empty pool
+        if os.getpid() != self._pid:
+            with self._cond:
+                self._idle.clear()
+                self._size = self._in_use = 0
+                self._pid = os.getpid()
+
+    def acquire(self) -> _PooledConnection:
+        self._check_fork()
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        pool_errors.inc(kind="timeout")
+                        raise PoolTimeout(f"No database connection free after {self.checkout_timeout}s")
+                    self._cond.wait(remaining)
+                pooled = self._idle.pop() if self._idle else None
+                if pooled is None:
+                    # Reserve the slot, then connect outside the lock
+                    self._size += 1
+                    pool_size.set(self._size)
+                self._in_use += 1
+                in_use.set(self._in_use)
+
+            if pooled is None:
+                try:
+                    pooled = self._open()
+                except Exception:
+                    self._release_slot()
+                    raise
+            elif self._expired(pooled) or not self._healthy(pooled):
+                self._release_slot(pooled)
+                continue
+            wait_seconds.observe(time.monotonic() - started)
+            return pooled
+
+    def _release_slot(self, pooled: Optional[_PooledConnection] = None) -> None:
+        with self._cond:
+            self._in_use -= 1
+            in_use.set(self._in_use)
+        if pooled is not None:
+            self._discard(pooled)
+        else:
+            with self._cond:
+                self._size -= 1
+                pool_size.set(self._size)
+                self._cond.notify()
+
+    def release(self, pooled: _PooledConnection, broken: bool = False) -> None:
+        if not broken and not pooled.conn.closed:
+            try:
+                pooled.conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        if broken or self._expired(pooled) or os.getpid() != self._pid:
+            if broken:
+                pool_errors.inc(kind="broken")
+            self._release_slot(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            in_use.set(self._in_use)
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        pooled = self.acquire()
+        broken = False
+        try:
+            yield pooled.conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # The server went away mid-query; don't hand this connection out again
+            broken = True
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def fill(self) -> None:
+        """Open connections up to `min_size` ahead of the first request."""
+        opened = []
+        try:
+            while self._size < self.min_size:
+                opened.append(self.acquire())
+        finally:
+            for pooled in opened:
+                self.release(pooled)
+
+    def close(self) -> None:
+        with self._cond:
+            while self._idle:
+                pooled = self._idle.pop()
+                pooled.conn.close()
+                self._size -= 1
+            pool_size.set(self._size)
+
+    def status(self) -> dict:
+        return {"size": self._size, "in_use": self._in_use, "idle": len(self._idle), "max_size": self.max_size}
+
+
+def _connect_with_defaults(statement_timeout_ms: int):
+    def connect():
+        conn = psycopg2.connect(**get_db_params(), options=f"-c statement_timeout={statement_timeout_ms}")
+        conn.set_session(readonly=True)
+        return conn
+    return connect
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """The process-wide pool, created from config/db.py settings on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = get_pool_config()
+                statement_timeout_ms = config.pop("statement_timeout_ms")
+                _pool = ConnectionPool(_connect_with_defaults(statement_timeout_ms), **config)
+    return _pool
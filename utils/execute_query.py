@@ -1,34 +1,77 @@
-import psycopg2
+import asyncio
 import json
-from config.db import get_db_params
+from utils import async_db_pool
+from utils.db_pool import get_pool
 from utils.serialize_result import serialize_result
+from utils.logger import get_logger
+from utils.tracing import traced
 
-def execute_query(query):
+log = get_logger("execute_query")
 
-    db_params = get_db_params()
-    print(db_params,'par')
-    conn = psycopg2.connect(**db_params)
-    cursor = conn.cursor()
+# Offline benchmarks install an in-process stand-in here (execute/aexecute); None means Postgres
+query_backend = None
 
-    try:
-        cursor.execute(query)
+def set_query_backend(backend):
+    global query_backend
+    query_backend = backend
 
-        if cursor.description:
-            columns = [desc[0] for desc in cursor.description]
-            rows = cursor.fetchall()
-            result = [dict(zip(columns, row)) for row in rows]
-        else:
-            result = None
+def rows_to_dicts(columns, rows):
+    return [dict(zip(columns, row)) for row in rows]
+
+@traced("execute_query")
+def execute_query(query, params=None):
+
+    if query_backend is not None:
+        return query_backend.execute(query, params)
+
+    # Connections come from the process-wide pool instead of a new connect per query
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            # With params, psycopg2 binds %(name)s placeholders and expects literal % as %%
+            cursor.execute(query, params)
 
-    except Exception as e:
-        print(f"Error executing query: {e}")
-        result = None
+            if cursor.description:
+                columns = [desc[0] for desc in cursor.description]
+                result = rows_to_dicts(columns, cursor.fetchall())
+            else:
+                result = None
 
-    finally:
-        cursor.close()
-        conn.close()
+        except Exception as e:
+            log.error("query_failed", error=str(e), query=query)
+            result = None
+
+        finally:
+            cursor.close()
     
     if result:
         result = serialize_result(result)
     
     return result
+
+@traced("execute_query")
+async def aexecute_query(query, params=None):
+
+    if query_backend is not None:
+        return await query_backend.aexecute(query, params)
+
+    if not async_db_pool.available():
+        # Without the optional psycopg 3 extra, the threaded psycopg2 pool answers here too
+        return await asyncio.to_thread(execute_query.__wrapped__, query, params)
+
+    # Same contract as execute_query, on the async psycopg pool; rows come back as dicts
+    async with async_db_pool.connection() as conn:
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, params)
+                result = await cursor.fetchall() if cursor.description else None
+
+        except Exception as e:
+            log.error("query_failed", error=str(e), query=query)
+            result = None
+
+    if result:
+        result = serialize_result(result)
+
+    return result
@@ -0,0 +1,188 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+
+from utils import metrics
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# "json" (one object per line) or "text" (event then key=value pairs, for a terminal)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+# Longest string kept per field, and most items kept per list or dict, before truncating
+LOG_MAX_FIELD_CHARS = int(os.getenv('LOG_MAX_FIELD_CHARS', '300'))
+LOG_MAX_ITEMS = int(os.getenv('LOG_MAX_ITEMS', '5'))
+# Records waiting for the writer thread; past this, new records are dropped rather than blocking a request
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+log_events_total = metrics.counter(
+    "log_events_total", "Log events by level and outcome: queued, sampled_out, or dropped when the queue is full")
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """"query_result=0.01,faq_result=0.1" -> {event: fraction of events kept}."""
+    rates = {}
+    for item in spec.split(','):
+        event, _, rate = item.partition('=')
+        if event.strip():
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+# Per-event overrides of the sample rate given at the call site
+LOG_SAMPLE_RATES = parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', ''))
+
+
+def truncate(value: Any, max_chars: Optional[int] = LOG_MAX_FIELD_CHARS, max_items: int = LOG_MAX_ITEMS,
+             depth: int = 0) -> Any:
+    """A bounded copy of `value`: long strings cut, lists and dicts clipped to their first items.
+
+    Runs on the calling thread, so it only ever touches the items it keeps; whatever
+    else the value holds (thousands of rows, say) is counted but never formatted.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        if max_chars is None or len(value) <= max_chars:
+            return value
+        return f"{value[:max_chars]}...(+{len(value) - max_chars} chars)"
+    if depth < 3 and isinstance(value, dict):
+        clipped = {str(key): truncate(item, max_chars, max_items, depth + 1)
+                   for key, item in itertools.islice(value.items(), max_items)}
+        if len(value) > max_items:
+            clipped["..."] = f"+{len(value) - max_items} keys"
+        return clipped
+    if depth < 3 and isinstance(value, (list, tuple, set, frozenset)):
+        clipped = [truncate(item, max_chars, max_items, depth + 1) for item in itertools.islice(value, max_items)]
+        if len(value) > max_items:
+            clipped.append(f"...(+{len(value) - max_items} items)")
+        return clipped
+    return truncate(str(value), max_chars, max_items, depth)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records on the writer thread; request threads only hand over the fields."""
+
+    def __init__(self, kind: str = LOG_FORMAT):
+        super().__init__()
+        self.kind = kind
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", {})
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}"
+        if self.kind == "text":
+            line = " ".join([timestamp, record.levelname, record.name, record.getMessage()]
+                            + [f"{key}={value!r}" for key, value in fields.items()])
+            return line + ("\n" + record.exc_text if record.exc_text else "")
+        payload = {"ts": timestamp, "level": record.levelname.lower(), "logger": record.name,
+                   "event": record.getMessage(), **fields}
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Fields are already bounded; only a traceback has to be rendered before its frames go away
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_events_total.inc(level=record.levelname.lower(), outcome="dropped")
+            return
+        log_events_total.inc(level=record.levelname.lower(), outcome="queued")
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+def _start() -> None:
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        records = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        writer = logging.StreamHandler(sys.stdout)
+        writer.setFormatter(StructuredFormatter())
+        root = logging.getLogger("lanyard")
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(NonBlockingQueueHandler(records))
+        # Kept apart from uvicorn's and the libraries' loggers
+        root.propagate = False
+        _listener = logging.handlers.QueueListener(records, writer)
+        _listener.start()
+        atexit.register(shutdown)
+
+
+def shutdown() -> None:
+    """Write out whatever is still queued and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+class EventLogger:
+    """log.info("event_name", key=value, ...) with levels, sampling and truncation.
+
+    Disabled levels cost one check. `sample_rate` keeps that fraction of an event
+    (LOG_SAMPLE_RATES can override it per event name). Field values are truncated
+    with `max_chars` (None keeps strings whole) and queued for a background writer,
+    so a request thread never waits on stdout.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def enabled(self, level: Union[int, str]) -> bool:
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+        return self._logger.isEnabledFor(level)
+
+    def log(self, level: int, event: str, sample_rate: float = 1.0, max_chars: Optional[int] = LOG_MAX_FIELD_CHARS,
+            exc_info=None, **fields) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        rate = LOG_SAMPLE_RATES.get(event, sample_rate)
+        if rate < 1.0:
+            if random.random() >= rate:
+                log_events_total.inc(level=logging.getLevelName(level).lower(), outcome="sampled_out")
+                return
+            fields["sample_rate"] = rate
+        fields = {key: truncate(value, max_chars) for key, value in fields.items()}
+        self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, event: str, **fields) -> None:
+        self.log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields) -> None:
+        self.log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields) -> None:
+        self.log(logging.WARNING, event, **fields)
+
+    def error(self, event: str, **fields) -> None:
+        self.log(logging.ERROR, event, **fields)
+
+    def exception(self, event: str, **fields) -> None:
+        """error() with the traceback of the exception being handled."""
+        self.log(logging.ERROR, event, exc_info=True, **fields)
+
+
+def get_logger(name: str) -> EventLogger:
+    _start()
+    return EventLogger(logging.getLogger(f"lanyard.{name}"))
@@ -0,0 +1,156 @@
+import bisect
+import threading
+from typing import Dict, Iterable, Tuple
+
+# Seconds; tuned for in-process stages from sub-millisecond up to LLM round trips
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels: dict) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> Dict[Tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def snapshot(self):
+        return {_format_labels(key): value for key, value in self.samples().items()}
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def count(self, **labels) -> int:
+        counts = self._values.get(_label_key(labels))
+        return sum(counts[:-1]) if counts else 0
+
+    def samples(self) -> Dict[Tuple, list]:
+        with self._lock:
+            return {key: list(counts) for key, counts in self._values.items()}
+
+    def snapshot(self):
+        result = {}
+        for key, counts in self.samples().items():
+            total = sum(counts[:-1])
+            result[_format_labels(key)] = {
+                "count": total,
+                "sum": counts[-1],
+                "avg": counts[-1] / total if total else 0.0,
+            }
+        return result
+
+
+def _format_labels(key: Tuple) -> str:
+    return ",".join(f"{name}={value}" for name, value in key)
+
+
+_registry: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name: str, help: str, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, help, **kwargs)
+        return metric
+
+
+def counter(name: str, help: str) -> Counter:
+    return _get_or_create(Counter, name, help)
+
+
+def gauge(name: str, help: str) -> Gauge:
+    return _get_or_create(Gauge, name, help)
+
+
+def histogram(name: str, help: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, help, buckets=buckets)
+
+
+def all_metrics():
+    with _registry_lock:
+        return list(_registry.values())
+
+
+def snapshot() -> dict:
+    return {metric.name: metric.snapshot() for metric in all_metrics()}
+
+
+def _prometheus_labels(key: Tuple, extra: Tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _prometheus_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in sorted(all_metrics(), key=lambda metric: metric.name):
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in sorted(metric.samples().items()):
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_prometheus_labels(key)} {_prometheus_number(value)}")
+                continue
+            # Our buckets hold per-bucket counts; Prometheus wants cumulative ones
+            cumulative = 0
+            for bound, count in zip(list(metric.buckets) + ["+Inf"], value[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _prometheus_number(bound)
+                lines.append(f"{metric.name}_bucket{_prometheus_labels(key, (('le', le),))} {cumulative}")
+            lines.append(f"{metric.name}_sum{_prometheus_labels(key)} {_prometheus_number(value[-1])}")
+            lines.append(f"{metric.name}_count{_prometheus_labels(key)} {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from utils import metrics
+
+calls_total = metrics.counter(
+    "single_flight_calls_total",
+    "Calls by flight and role; coalesce ratio = role=follower / all roles")
+in_flight = metrics.gauge("single_flight_in_flight", "Distinct keys currently being computed, by flight")
+coalesce_ratio = metrics.gauge("single_flight_coalesce_ratio", "Share of calls that joined a run already in progress, by flight")
+
+
+class SingleFlight:
+    """Runs one computation per key at a time and shares its outcome.
+
+    The first caller for a key (the leader) runs it; callers that arrive with
+    the same key while it is running (followers) wait and get the same result,
+    or the same exception. Thread and asyncio callers share one map, so a
+    threaded request can follow an async one and vice versa. Nothing is
+    cached: once the computation finishes, the next caller starts a new one.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._counts = {"leader": 0, "follower": 0}
+        # Async leaders run as tasks; keep them referenced until they finish
+        self._tasks = set()
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                in_flight.set(len(self._calls), flight=self.name)
+            role = "leader" if leader else "follower"
+            self._counts[role] += 1
+            coalesce_ratio.set(self._counts["follower"] / (self._counts["leader"] + self._counts["follower"]),
+                               flight=self.name)
+        calls_total.inc(flight=self.name, role=role)
+        return future, leader
+
+    def _finish(self, key: Hashable) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+            in_flight.set(len(self._calls), flight=self.name)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key)
+
+    async def _run(self, key: Hashable, future: Future, fn: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            future.set_result(await fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            self._finish(key)
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future, leader = self._join(key)
+        if leader:
+            task = asyncio.ensure_future(self._run(key, future, fn))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        # A caller that goes away (client disconnect) must not cancel the run the others wait on
+        return await asyncio.shield(asyncio.wrap_future(future))
@@ -0,0 +1,79 @@
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+class StartupProfiler:
+    """Records how long each startup phase (module import, model load) takes.
+
+    Phases are kept in the order they finished so the report reads like a boot
+    timeline, and `over_budget` turns the numbers into a pass/fail check.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: List[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases.append({"kind": kind, "name": name, "seconds": seconds})
+
+    @contextmanager
+    def phase(self, kind: str, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - started)
+
+    def import_module(self, name: str):
+        """Import `name`, timing it unless something already imported it."""
+        if name in sys.modules:
+            return sys.modules[name]
+        with self.phase("import", name):
+            return importlib.import_module(name)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def timings(self) -> Dict[str, float]:
+        with self._lock:
+            result = {}
+            for phase in self.phases:
+                result[phase["name"]] = result.get(phase["name"], 0.0) + phase["seconds"]
+        result["total"] = self.elapsed()
+        return result
+
+    def over_budget(self, budgets: Dict[str, float]) -> List[str]:
+        """Describe every phase (or "total") that took longer than its budget in seconds.
+
+        A budget for a phase that never ran counts as a violation too, so a
+        misspelled name fails the check instead of passing unmeasured.
+        """
+        timings = self.timings()
+        violations = []
+        for name, budget in budgets.items():
+            seconds = timings.get(name)
+            if seconds is None:
+                violations.append(f"{name}: no startup phase by that name (recorded: {', '.join(timings)})")
+            elif seconds > budget:
+                violations.append(f"{name}: {seconds:.2f}s > budget {budget:.2f}s")
+        return violations
+
+    def report(self) -> str:
+        with self._lock:
+            phases = list(self.phases)
+        width = max([len(phase["name"]) for phase in phases] + [5])
+        lines = ["Startup profile:"]
+        for phase in phases:
+            lines.append(f"  {phase['kind']:<7} {phase['name']:<{width}} {phase['seconds'] * 1000:10.1f} ms")
+        lines.append(f"  {'':<7} {'total':<{width}} {self.elapsed() * 1000:10.1f} ms")
+        return "\n".join(lines)
+
+
+# Created on first import, which app.server does before anything heavy
+startup_profiler = StartupProfiler()
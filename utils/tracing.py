@@ -0,0 +1,116 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from utils import metrics
+
+stage_seconds = metrics.histogram(
+    "pipeline_stage_seconds", "Duration of one pipeline stage, by stage, route and intent")
+request_seconds = metrics.histogram(
+    "pipeline_request_seconds", "End-to-end duration of a traced request, by route and intent")
+
+UNKNOWN = "unknown"
+
+
+class Trace:
+    """Spans recorded for one request.
+
+    Stage histograms are observed when the trace finishes, so every span carries
+    the request's final route and intent labels even though those are only
+    known part-way through (intent after classification, route once a FAQ path
+    or SQL source is picked).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.labels = {"route": UNKNOWN, "intent": UNKNOWN}
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, started: float, seconds: float, parent: Optional[str]) -> None:
+        with self._lock:
+            self.spans.append({
+                "stage": stage,
+                "parent": parent,
+                "start_ms": round((started - self.started) * 1000, 3),
+                "duration_ms": round(seconds * 1000, 3),
+            })
+
+    def breakdown(self) -> dict:
+        return {
+            **self.labels,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "stages": sorted(self.spans, key=lambda span: span["start_ms"]),
+        }
+
+    def finish(self) -> None:
+        for span in self.spans:
+            stage_seconds.observe(span["duration_ms"] / 1000, stage=span["stage"], **self.labels)
+        request_seconds.observe(time.perf_counter() - self.started, **self.labels)
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+@contextmanager
+def trace_request():
+    """Collect spans for everything run in this context (including to_thread and chain executor threads)."""
+    trace = Trace()
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+        trace.finish()
+
+
+def set_labels(**labels) -> None:
+    """Label the current request, e.g. set_labels(intent="FAQ") or set_labels(route="lexical")."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.labels.update({name: str(value) for name, value in labels.items()})
+
+
+@contextmanager
+def span(stage: str):
+    parent = _span.get()
+    token = _span.set(stage)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        _span.reset(token)
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(stage, started, seconds, parent)
+        else:
+            # Outside a request (startup, reloads, snapshot refreshes): no route or intent to wait for
+            stage_seconds.observe(seconds, stage=stage, route=UNKNOWN, intent=UNKNOWN)
+
+
+def traced(stage: str):
+    """Decorator form of span() for plain and async functions."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from utils import metrics
+
+cache_requests_total = metrics.counter("cache_requests_total", "Cache lookups by cache name and result (hit or miss)")
+
+
+class TtlCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL.
+
+    With `path`, entries are written to a JSON file on every change and read
+    back on start, so they survive restarts. Keys must then be tuples of
+    JSON-serializable values, and values JSON-serializable too. Expiry uses
+    wall-clock time so persisted deadlines stay meaningful across processes.
+    """
+
+    def __init__(self, name: str, max_size: int = 1024, ttl: float = 3600, path: Optional[str] = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                cache_requests_total.inc(cache=self.name, result="miss")
+                return None
+            self._entries.move_to_end(key)
+        cache_requests_total.inc(cache=self.name, result="hit")
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() + (self.ttl if ttl is None else ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            if self.path:
+                self._save()
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None and self.path:
+                self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._save()
+
+    def _save(self) -> None:
+        now = time.time()
+        records = [[list(key), value, expires_at]
+                   for key, (value, expires_at) in self._entries.items() if expires_at > now]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(records, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        # Oldest first, so the most recently used entries survive a smaller max_size
+        for key, value, expires_at in records[-self.max_size:]:
+            if expires_at > now:
+                self._entries[tuple(key)] = (value, expires_at)